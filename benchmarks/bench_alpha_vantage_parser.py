@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对比 Alpha Vantage 日线响应的旧解析方式 (from_dict + rename + to_datetime + sort_index + astype)
+与共享解析器 data_fetchers.alpha_vantage_parser 的耗时
+
+用法:
+    python -m benchmarks.bench_alpha_vantage_parser [--payload recorded.json] [--days 6500] [--repeat 20]
+
+不指定 --payload 时生成与 outputsize=full 同样结构的模拟响应 (按日期降序)。
+"""
+
+import json
+import time
+import argparse
+import statistics
+from datetime import date, timedelta
+
+import pandas as pd
+
+from data_fetchers.alpha_vantage_parser import TIME_SERIES_KEY, loads, orjson, parse_daily_payload
+
+
+def synthetic_payload(days: int, adjusted: bool = False) -> bytes:
+    """生成 days 个交易日的模拟 TIME_SERIES_DAILY(_ADJUSTED) 响应"""
+    series = {}
+    day = date(2025, 1, 3)
+    price = 100.0
+    while len(series) < days:
+        if day.weekday() < 5:
+            price *= 1.0 + ((len(series) * 7919) % 200 - 100) / 10000.0
+            record = {
+                "1. open": f"{price:.4f}",
+                "2. high": f"{price * 1.01:.4f}",
+                "3. low": f"{price * 0.99:.4f}",
+                "4. close": f"{price * 1.002:.4f}",
+            }
+            if adjusted:
+                record.update({
+                    "5. adjusted close": f"{price * 1.002:.4f}",
+                    "6. volume": str(1000000 + len(series)),
+                    "7. dividend amount": "0.0000",
+                    "8. split coefficient": "1.0",
+                })
+            else:
+                record["5. volume"] = str(1000000 + len(series))
+            series[day.isoformat()] = record
+        day -= timedelta(days=1)
+    payload = {"Meta Data": {"2. Symbol": "BENCH"}, TIME_SERIES_KEY: series}
+    return json.dumps(payload).encode("utf-8")
+
+
+def legacy_parse(content: bytes) -> pd.DataFrame:
+    """改造前 fetcher 中的解析方式"""
+    data = json.loads(content)
+    df = pd.DataFrame.from_dict(data[TIME_SERIES_KEY], orient="index")
+    df = df.rename(columns={
+        "1. open": "open",
+        "2. high": "high",
+        "3. low": "low",
+        "4. close": "close",
+        "5. volume": "volume"
+    })
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+    df = df.astype(float)
+    return df.reset_index().rename(columns={"index": "date"})
+
+
+def shared_parse(content: bytes) -> pd.DataFrame:
+    return parse_daily_payload(loads(content))
+
+
+def _timeit(fn, content: bytes, repeat: int) -> list:
+    fn(content)  # 预热
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(content)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alpha Vantage 响应解析基准测试")
+    parser.add_argument("--payload", default=None, help="录制的完整响应 JSON 文件")
+    parser.add_argument("--days", type=int, default=6500, help="模拟响应的交易日数")
+    parser.add_argument("--adjusted", action="store_true", help="模拟 TIME_SERIES_DAILY_ADJUSTED 响应")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数")
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            content = f.read()
+    else:
+        content = synthetic_payload(args.days, adjusted=args.adjusted)
+
+    legacy_df = legacy_parse(content)
+    shared_df = shared_parse(content)
+    common = [c for c in ["open", "high", "low", "close"] if c in legacy_df.columns]
+    pd.testing.assert_frame_equal(legacy_df[["date"] + common], shared_df[["date"] + common], check_dtype=False)
+
+    print(f"payload: {len(content) / 1024:.0f} KiB, {len(shared_df)} rows, orjson: {'yes' if orjson is not None else 'no'}")
+    results = {}
+    for name, fn in (("legacy", legacy_parse), ("shared", shared_parse)):
+        timings = _timeit(fn, content, args.repeat)
+        results[name] = statistics.median(timings)
+        print(f"{name:>7}: median {results[name]:8.2f} ms, min {min(timings):8.2f} ms")
+    print(f"speedup: {results['legacy'] / results['shared']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+导入耗时基准与回归检查 (基于 python -X importtime)
+
+每个入口模块在独立的子进程中导入, 统计累计导入耗时, 并检查不应被提前导入的重量级依赖
+(yfinance / matplotlib / mplfinance / IPython)。超出预算或导入了禁止的模块时退出码为 1,
+可以放进 CI 防止回退。
+
+用法:
+    python -m benchmarks.bench_import_time [--config config/config.json] [--repeat 3] [--budget-ms 1500]
+"""
+
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+# 入口模块 -> 导入该模块时不应出现的模块
+ENTRY_POINTS = {
+    "data_fetchers.data_factory": ["yfinance", "matplotlib", "mplfinance", "IPython"],
+    "superrich.app": ["yfinance", "matplotlib", "mplfinance", "IPython"],
+    "views.base_stock_visualizer": ["matplotlib", "mplfinance", "IPython"],
+    "views.style.get_chinese_style": ["matplotlib", "mplfinance"],
+}
+
+# 数据模块在导入时获取 logger, 需要先初始化
+_SNIPPET = (
+    "from utils.file_reader import FileReader;"
+    "from utils.logger_manager import init_logger_from_dict;"
+    "init_logger_from_dict(FileReader.load_config(path={config!r}));"
+    "import {module}"
+)
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str, config_path: str) -> tuple:
+    """在子进程中导入 module
+
+    Returns:
+        tuple: (module 的累计导入耗时 ms, 导入的全部模块名集合)
+    """
+    code = _SNIPPET.format(config=config_path, module=module)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+    cumulative_us = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(match.group(2))
+    return (cumulative_us or 0) / 1000.0, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入口模块导入耗时基准")
+    parser.add_argument("--config", default="config/config.json", help="配置文件路径")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块重复次数, 取中位数")
+    parser.add_argument("--budget-ms", type=float, default=None, help="单个入口模块的导入耗时上限")
+    parser.add_argument("--modules", default=None, help="逗号分隔的模块, 默认检查全部入口")
+    args = parser.parse_args()
+
+    modules = args.modules.split(",") if args.modules else list(ENTRY_POINTS)
+    failed = False
+    for module in modules:
+        timings = []
+        imported = set()
+        for _ in range(args.repeat):
+            elapsed, imported = measure(module, args.config)
+            timings.append(elapsed)
+        median = statistics.median(timings)
+        forbidden = sorted(
+            name for name in ENTRY_POINTS.get(module, [])
+            if name in imported or any(m.startswith(name + ".") for m in imported)
+        )
+        status = "ok"
+        if forbidden:
+            status = f"FAIL 提前导入了 {forbidden}"
+            failed = True
+        elif args.budget_ms is not None and median > args.budget_ms:
+            status = f"FAIL 超出预算 {args.budget_ms:.0f} ms"
+            failed = True
+        print(f"{module:<32} {median:9.1f} ms  {len(imported):5d} modules  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
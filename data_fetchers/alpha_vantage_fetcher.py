@@ -6,20 +6,56 @@ import pandas as pd
 import requests
 from datetime import datetime, timedelta
 from utils.logger_manager import get_logger
+from utils import metrics
 from .base_fetcher import BaseFetcher
+from .cache_backends import BaseCacheBackend, CsvCacheBackend
+from .http_session import get_shared_session
+from .alpha_vantage_parser import TIME_SERIES_KEY, loads, parse_daily_payload
+
+
+ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
+
+
+class AlphaVantageRateLimitError(Exception):
+    """Alpha Vantage 返回调用频率或每日额度限制提示"""
+    pass
+
+
+def is_rate_limited_response(data: dict) -> bool:
+    """判断响应是否为调用频率或每日额度限制提示 (Note / Information 字段)"""
+    if not isinstance(data, dict):
+        return False
+    message = str(data.get("Note", "") or data.get("Information", "")).lower()
+    return any(word in message for word in ("call frequency", "rate limit", "requests per day", "requests per minute"))
 
 
 class AlphaVantageFetcher(BaseFetcher):
     """Alpha Vantage 数据源驱动"""
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        cache_dir: str = "data_cache",
+        cache_backend: BaseCacheBackend = None,
+        on_saved=None,
+        session: requests.Session = None,
+        base_url: str = None,
+        timeout: float = 30,
+    ):
         self.api_key = api_key
         self.logger = get_logger()
-        self.base_url = "https://www.alphavantage.co/query"
-        self.logger.warning(f"AlphaVantageFetcher 初始化完成; Alpha Vantage API Key [{self.api_key[-6:]}]")
+        self.base_url = base_url or ALPHA_VANTAGE_BASE_URL
+        # 默认复用进程内共享的连接池会话 (keep-alive + 重试退避)
+        self.session = session if session is not None else get_shared_session("Alpha Vantage")
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.cache_backend = cache_backend if cache_backend is not None else CsvCacheBackend()
+        # 保存成功后的回调 on_saved(STOCK_CODE, file_path, df), 用于通知缓存索引等
+        self.on_saved = on_saved
+        self.logger.warning("AlphaVantageFetcher 初始化完成; Alpha Vantage API Key [%s]", self.api_key[-6:])
 
     def fetch_data(self, ticker: str, years: int) -> pd.DataFrame:
-        self.logger.info(f"[AlphaVantage] Fetching {years} years of data for {ticker}...")
+        self.logger.info("[AlphaVantage] Fetching %s years of data for %s...", years, ticker)
 
         # url = f"https://www.alphavantage.co/query"
         params = {
@@ -29,32 +65,21 @@ class AlphaVantageFetcher(BaseFetcher):
             "apikey": self.api_key
         }
 
-        resp = requests.get(self.base_url, params=params)
-        data = resp.json()
+        with metrics.span("alpha_vantage.http_get"):
+            resp = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        with metrics.span("alpha_vantage.json_parse"):
+            data = loads(resp.content)
 
-        if "Time Series (Daily)" not in data:
-            self.logger.error(f"Alpha Vantage API error: {data}")
+        if TIME_SERIES_KEY not in data:
+            self.logger.error("Alpha Vantage API error: %s", data)
             return pd.DataFrame()
 
-        df = pd.DataFrame.from_dict(data["Time Series (Daily)"], orient="index", dtype=float)
-        df.index = pd.to_datetime(df.index)
-        df = df.rename(columns={
-            "1. open": "open",
-            "2. high": "high",
-            "3. low": "low",
-            "4. close": "close",
-            "5. volume": "volume"
-        })
-        df = df[["open", "high", "low", "close", "volume"]].sort_index()
-
         # 过滤N年数据
-        start_date = datetime.now() - timedelta(days=years * 365)
-        df = df[df.index >= start_date]
+        start_date = (datetime.now() - timedelta(days=years * 365)).strftime("%Y-%m-%d")
+        with metrics.span("alpha_vantage.frame_parse"):
+            df = parse_daily_payload(data, start_date=start_date)
 
-        df.reset_index(inplace=True)
-        df.rename(columns={"index": "date"}, inplace=True)
-
-        self.logger.info(f"[AlphaVantage] Got {len(df)} rows for {ticker}.")
+        self.logger.info("[AlphaVantage] Got %s rows for %s.", len(df), ticker)
         return df
 
     def GET_STOCK_DATA_BY_DATE_WINDOWS(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
@@ -68,7 +93,7 @@ class AlphaVantageFetcher(BaseFetcher):
         Returns:
             pd.DataFrame: 包含日期、开盘价、最高价、最低价、收盘价和成交量的 DataFrame。
         """
-        self.logger.info(f"[AlphaVantage] Fetching data for {STOCK_CODE} from {START_DATE} to {END_DATE}...")
+        self.logger.info("[AlphaVantage] Fetching data for %s from %s to %s...", STOCK_CODE, START_DATE, END_DATE)
 
         params = {
             "function": "TIME_SERIES_DAILY_ADJUSTED",
@@ -78,41 +103,41 @@ class AlphaVantageFetcher(BaseFetcher):
         }
 
         try:
-            self.logger.debug(f"[AlphaVantage] Request params: {params}")
-            response = requests.get(self.base_url, params=params, timeout=30)
+            self.logger.debug("[AlphaVantage] Request params: %s", params)
+            with metrics.span("alpha_vantage.http_get"):
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
 
             if response.status_code != 200:
-                self.logger.error(f"[AlphaVantage] Request failed with status {response.status_code}")
+                self.logger.error("[AlphaVantage] Request failed with status %s", response.status_code)
                 response.raise_for_status()
 
-            data = response.json()
+            with metrics.span("alpha_vantage.json_parse"):
+                data = loads(response.content)
+
+            if is_rate_limited_response(data):
+                self.logger.error("[AlphaVantage] API Key [%s] rate limited: %s", self.api_key[-6:], data)
+                metrics.inc("rate_limited", driver="alpha_vantage")
+                raise AlphaVantageRateLimitError(str(data))
 
-            if "Time Series (Daily)" not in data:
-                self.logger.error(f"[AlphaVantage] Invalid response: {data}")
+            if TIME_SERIES_KEY not in data:
+                self.logger.error("[AlphaVantage] Invalid response: %s", data)
                 raise ValueError(f"Unexpected API response: {data}")
 
             self.logger.info("[AlphaVantage] Parsing data into DataFrame...")
 
-            df = pd.DataFrame.from_dict(data["Time Series (Daily)"], orient="index")
-            df = df.rename(columns={
-                "1. open": "open",
-                "2. high": "high",
-                "3. low": "low",
-                "4. close": "close",
-                "5. volume": "volume"
-            })
-            df.index = pd.to_datetime(df.index)
-            df = df.sort_index()  # 时间升序
-            df = df.loc[START_DATE:END_DATE]  # 截取日期范围
-            df = df.astype(float)
+            with metrics.span("alpha_vantage.frame_parse"):
+                df = parse_daily_payload(data, start_date=START_DATE, end_date=END_DATE)  # 截取日期范围
 
-            self.logger.info(f"[AlphaVantage] Successfully fetched {len(df)} rows for {STOCK_CODE}.")
-            self.logger.debug(f"[AlphaVantage] Sample data:\n{df.head()}")
+            self.logger.info("[AlphaVantage] Successfully fetched %s rows for %s.", len(df), STOCK_CODE)
+            self.logger.debug("[AlphaVantage] Sample data:\n%s", df.head())
 
-            return df.reset_index().rename(columns={"index": "date"})
+            return df
 
+        except AlphaVantageRateLimitError:
+            # 额度用尽交给调用方切换 API Key
+            raise
         except Exception as e:
-            self.logger.exception(f"[AlphaVantage] Failed to fetch stock data for {STOCK_CODE}: {e}")
+            self.logger.exception("[AlphaVantage] Failed to fetch stock data for %s: %s", STOCK_CODE, e)
             return pd.DataFrame()
 
 
@@ -125,50 +150,74 @@ class AlphaVantageFetcher(BaseFetcher):
         Returns:
             pd.DataFrame: 包含日期、开盘价、最高价、最低价、收盘价和成交量的 DataFrame。
         """
-        self.logger.info(f"[AlphaVantage] Fetching full data for {STOCK_CODE}...")
+        return self._GET_DAILY_STOCK_DATA(STOCK_CODE, outputsize="full")
+
+    def GET_COMPACT_STOCK_DATA(self, STOCK_CODE: str) -> pd.DataFrame:
+        """获取指定股票最近约 100 个交易日的数据 (outputsize=compact), 用于增量刷新
+
+        Args:
+            STOCK_CODE (str): 股票代码
+
+        Returns:
+            pd.DataFrame: 包含日期、开盘价、最高价、最低价、收盘价和成交量的 DataFrame。
+        """
+        return self._GET_DAILY_STOCK_DATA(STOCK_CODE, outputsize="compact")
+
+    def _GET_DAILY_STOCK_DATA(self, STOCK_CODE: str, outputsize: str = "full") -> pd.DataFrame:
+        """请求 TIME_SERIES_DAILY 日线数据
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            outputsize (str, optional): full 为全部历史数据, compact 为最近约 100 个交易日. Defaults to "full".
+
+        Returns:
+            pd.DataFrame: 包含日期、开盘价、最高价、最低价、收盘价和成交量的 DataFrame。
+        """
+        self.logger.info("[AlphaVantage] Fetching %s data for %s...", outputsize, STOCK_CODE)
 
         params = {
             "function": "TIME_SERIES_DAILY",
             "symbol": STOCK_CODE,
-            "outputsize": "full",  # 获取全部历史数据
+            "outputsize": outputsize,
             "apikey": self.api_key,
         }
 
         try:
-            self.logger.debug(f"[AlphaVantage] Request params: {params}")
-            response = requests.get(self.base_url, params=params, timeout=30)
+            self.logger.debug("[AlphaVantage] Request params: %s", params)
+            with metrics.span("alpha_vantage.http_get"):
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
 
             if response.status_code != 200:
-                self.logger.error(f"[AlphaVantage] Request failed with status {response.status_code}")
+                self.logger.error("[AlphaVantage] Request failed with status %s", response.status_code)
                 response.raise_for_status()
 
-            data = response.json()
+            with metrics.span("alpha_vantage.json_parse"):
+                data = loads(response.content)
+
+            if is_rate_limited_response(data):
+                self.logger.error("[AlphaVantage] API Key [%s] rate limited: %s", self.api_key[-6:], data)
+                metrics.inc("rate_limited", driver="alpha_vantage")
+                raise AlphaVantageRateLimitError(str(data))
 
-            if "Time Series (Daily)" not in data:
-                self.logger.error(f"[AlphaVantage] Invalid response: {data}")
+            if TIME_SERIES_KEY not in data:
+                self.logger.error("[AlphaVantage] Invalid response: %s", data)
                 raise ValueError(f"Unexpected API response: {data}")
 
             self.logger.info("[AlphaVantage] Parsing data into DataFrame...")
 
-            df = pd.DataFrame.from_dict(data["Time Series (Daily)"], orient="index")
-            df = df.rename(columns={
-                "1. open": "open",
-                "2. high": "high",
-                "3. low": "low",
-                "4. close": "close",
-                "5. volume": "volume"
-            })
-            df.index = pd.to_datetime(df.index)
-            df = df.sort_index()  # 时间升序
-            df = df.astype(float)
+            with metrics.span("alpha_vantage.frame_parse"):
+                df = parse_daily_payload(data)
 
-            self.logger.info(f"[AlphaVantage] Successfully fetched {len(df)} rows for {STOCK_CODE}.")
-            self.logger.debug(f"[AlphaVantage] Sample data:\n{df.head()}")
+            self.logger.info("[AlphaVantage] Successfully fetched %s rows for %s.", len(df), STOCK_CODE)
+            self.logger.debug("[AlphaVantage] Sample data:\n%s", df.head())
 
-            return df.reset_index().rename(columns={"index": "date"})
+            return df
 
+        except AlphaVantageRateLimitError:
+            # 额度用尽交给调用方切换 API Key
+            raise
         except Exception as e:
-            self.logger.exception(f"[AlphaVantage] Failed to fetch stock data for {STOCK_CODE}: {e}")
+            self.logger.exception("[AlphaVantage] Failed to fetch stock data for %s: %s", STOCK_CODE, e)
             return pd.DataFrame()   
         
     def get_date_info_from_df(self, df: pd.DataFrame) -> tuple:
@@ -187,15 +236,16 @@ class AlphaVantageFetcher(BaseFetcher):
         start_date = df["date"].min().strftime("%Y-%m-%d")
         end_date = df["date"].max().strftime("%Y-%m-%d")
 
-        self.logger.info(f"[AlphaVantage] Data date range: {start_date} to {end_date}")
+        self.logger.info("[AlphaVantage] Data date range: %s to %s", start_date, end_date)
         return start_date, end_date
     
-    def gen_cache_file_name(self, STOCK_CODE: str, DATES: tuple) -> str:
+    def gen_cache_file_name(self, STOCK_CODE: str, DATES: tuple, extension: str = "csv") -> str:
         """生成缓存文件名
 
         Args:
             STOCK_CODE (str): 股票代码
             DATES (tuple): (start_date, end_date) 格式为 (YYYY-MM-DD, YYYY-MM-DD)
+            extension (str, optional): 文件扩展名, 由缓存后端决定. Defaults to "csv".
 
         Returns:
             str: 缓存文件名，例如 "AAPL_2020-01-01_2025-01-01.csv"
@@ -205,8 +255,8 @@ class AlphaVantageFetcher(BaseFetcher):
             self.logger.error("[AlphaVantage] Invalid dates provided for cache file name generation.")
             start_date = "unknown_start"
             end_date = "unknown_end"
-        file_name = f"{STOCK_CODE}_{start_date}_{end_date}.csv"
-        self.logger.info(f"[AlphaVantage] Generated cache file name: {file_name}")
+        file_name = f"{STOCK_CODE}_{start_date}_{end_date}.{extension}"
+        self.logger.info("[AlphaVantage] Generated cache file name: %s", file_name)
         return file_name
        
     
@@ -217,14 +267,31 @@ class AlphaVantageFetcher(BaseFetcher):
             df (pd.DataFrame): 要保存的数据
             file_path (str): 保存的文件路径
         """
-        self.logger.info(f"[AlphaVantage] Saving data to {file_path}...")
+        self.logger.info("[AlphaVantage] Saving data to %s...", file_path)
         try:
-            df.to_csv(file_path, index=False)
-            self.logger.info(f"[AlphaVantage] Data saved to {file_path}")
+            with metrics.span("alpha_vantage.save", format="csv"):
+                df.to_csv(file_path, index=False)
+            self.logger.info("[AlphaVantage] Data saved to %s", file_path)
         except Exception as e:
-            self.logger.exception(f"[AlphaVantage] Failed to save data to {file_path}: {e}")
+            self.logger.exception("[AlphaVantage] Failed to save data to %s: %s", file_path, e)
         # 检查是否保存成功，通过文件是否存在判断    
         return os.path.exists(file_path)
+
+    def save_data_to_cache(self, df: pd.DataFrame, file_path: str) -> bool:
+        """使用配置的缓存后端 (csv / parquet / feather / npz) 保存数据
+
+        Args:
+            df (pd.DataFrame): 要保存的数据
+            file_path (str): 保存的文件路径
+        """
+        self.logger.info("[AlphaVantage] Saving data to %s (%s)...", file_path, self.cache_backend.name)
+        try:
+            with metrics.span("alpha_vantage.save", format=self.cache_backend.name):
+                self.cache_backend.write(df, file_path)
+            self.logger.info("[AlphaVantage] Data saved to %s", file_path)
+        except Exception as e:
+            self.logger.exception("[AlphaVantage] Failed to save data to %s: %s", file_path, e)
+        return os.path.exists(file_path)
             
         
             
@@ -236,18 +303,20 @@ class AlphaVantageFetcher(BaseFetcher):
             df (pd.DataFrame): 要保存的数据
         """
         
-        self.logger.info(f"[AlphaVantage] Saving data for {STOCK_CODE}...")
+        self.logger.info("[AlphaVantage] Saving data for %s...", STOCK_CODE)
         if df.empty:
-            self.logger.warning(f"[AlphaVantage] No data to save for {STOCK_CODE}.")
+            self.logger.warning("[AlphaVantage] No data to save for %s.", STOCK_CODE)
             return
 
         start_date, end_date = self.get_date_info_from_df(df)
-        cache_file_name = self.gen_cache_file_name(STOCK_CODE, (start_date, end_date))
-        cache_dir = "data_cache"
+        cache_file_name = self.gen_cache_file_name(STOCK_CODE, (start_date, end_date), self.cache_backend.extension)
+        cache_dir = self.cache_dir
         
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
         file_path = os.path.join(cache_dir, cache_file_name)
-        save_status = self.save_data_to_csv(df, file_path)
+        save_status = self.save_data_to_cache(df, file_path)
+        if save_status and self.on_saved is not None:
+            self.on_saved(STOCK_CODE, file_path, df)
         return save_status
         
\ No newline at end of file
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Alpha Vantage 日线响应的共享解析器
+
+直接把 "Time Series (Daily)" 解析为按日期升序、类型化的 float64 列, 不经过
+DataFrame.from_dict(orient="index") 的逐行字符串表, 也不再做 rename / sort_index / astype 的多次整表复制。
+"""
+
+import re
+import json
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson 可选, 没有安装时退回标准库 json
+    orjson = None
+
+
+TIME_SERIES_KEY = "Time Series (Daily)"
+# 基础列的输出顺序, 复权接口额外的列 (adjusted_close / dividend_amount / split_coefficient) 排在后面
+BASE_COLUMNS = ["open", "high", "low", "close", "volume"]
+_FIELD_PREFIX = re.compile(r"^\d+\.\s*")
+
+
+def loads(content) -> dict:
+    """解码 JSON 响应, 安装了 orjson 时使用 orjson
+
+    Args:
+        content (bytes | str): 响应内容
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def field_name(key: str) -> str:
+    """按名称映射字段: "1. open" -> "open", "5. adjusted close" -> "adjusted_close" """
+    return _FIELD_PREFIX.sub("", key).strip().lower().replace(" ", "_")
+
+
+def parse_daily_series(series: dict, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    """将 "Time Series (Daily)" 解析为带 date 列、按日期升序的 DataFrame
+
+    Args:
+        series (dict): {"YYYY-MM-DD": {"1. open": "...", ...}}
+        start_date (str, optional): 只保留不早于该日期的行 (YYYY-MM-DD)
+        end_date (str, optional): 只保留不晚于该日期的行 (YYYY-MM-DD)
+
+    Returns:
+        pd.DataFrame: date 列为 datetime64, 其余列为 float64
+    """
+    keys = list(series.keys())
+    if not keys:
+        return pd.DataFrame(columns=["date"] + BASE_COLUMNS)
+
+    # ISO 日期由 numpy 直接解析, 不经过 pd.to_datetime 的格式推断
+    dates = np.array(keys, dtype="datetime64[D]")
+    # Alpha Vantage 按日期降序返回, 这种情况下反转即可, 否则排序
+    if len(dates) > 1 and (dates[:-1] > dates[1:]).all():
+        order = np.arange(len(dates) - 1, -1, -1)
+    elif len(dates) > 1 and not (dates[:-1] <= dates[1:]).all():
+        order = np.argsort(dates, kind="stable")
+    else:
+        order = np.arange(len(dates))
+    dates = dates[order]
+
+    lo = 0 if start_date is None else int(np.searchsorted(dates, np.datetime64(start_date, "D"), side="left"))
+    hi = len(dates) if end_date is None else int(np.searchsorted(dates, np.datetime64(end_date, "D"), side="right"))
+    order = order[lo:hi]
+    dates = dates[lo:hi]
+
+    first = series[keys[0]]
+    fields = {field_name(key): key for key in first}
+    names = [name for name in BASE_COLUMNS if name in fields] + [name for name in fields if name not in BASE_COLUMNS]
+
+    records = [series[keys[i]] for i in order]
+    columns = {"date": dates.astype("datetime64[ns]")}
+    for name in names:
+        raw_key = fields[name]
+        # 数值字符串由 numpy 一次性转换为 float64 列 (按行数一次分配)
+        columns[name] = np.array([record[raw_key] for record in records], dtype=np.float64)
+    return pd.DataFrame(columns, copy=False)
+
+
+def parse_daily_payload(data, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    """解析 TIME_SERIES_DAILY / TIME_SERIES_DAILY_ADJUSTED 响应
+
+    Args:
+        data (dict | bytes | str): 已解码的响应 JSON 或原始响应内容
+        start_date (str, optional): 起始日期 (YYYY-MM-DD)
+        end_date (str, optional): 结束日期 (YYYY-MM-DD)
+
+    Returns:
+        pd.DataFrame: 包含日期、开盘价、最高价、最低价、收盘价和成交量的 DataFrame。
+    """
+    if isinstance(data, (bytes, bytearray, str)):
+        data = loads(data)
+    return parse_daily_series(data[TIME_SERIES_KEY], start_date, end_date)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import glob
+import json
+import time
+import atexit
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+from utils.logger_manager import get_logger
+
+
+logger = get_logger()
+
+
+def _key_id(api_key: str) -> str:
+    """API Key 的摘要, 状态文件中不保存明文 Key"""
+    return hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def _utc_today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class _KeyBucket:
+    """单个 API Key 的令牌桶 (每分钟) 和当日用量"""
+
+    def __init__(self, api_key: str, per_minute: int):
+        self.api_key = api_key
+        self.key_id = _key_id(api_key)
+        self.capacity = float(per_minute) if per_minute and per_minute > 0 else float("inf")
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.day_used = 0  # 当日总用量 (本进程 + 其它进程)
+        self.own_used = 0  # 本进程当日用量, 只有这部分写入本进程的状态文件
+
+    def refill(self, now: float):
+        if self.capacity != float("inf"):
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def seconds_until_token(self) -> float:
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ApiKeyScheduler:
+    """Alpha Vantage API Key 调度器
+
+    每个 Key 一个令牌桶 (requests_per_minute) 和当日额度 (requests_per_day),
+    每次请求分配给余量最多的 Key; 所有 Key 暂时没有余量时排队等待而不是直接失败。
+
+    当日用量按进程保存: 每个进程只写自己的 <state_path 去掉扩展名>.<pid>-<启动时间>.json,
+    读取时把当天所有进程文件的用量相加, 因此多个 uvicorn worker / 进程池不会互相覆盖。
+    用量在请求时只记在内存, 每 flush_seconds 秒 (以及 Key 额度用尽和进程退出时) 在锁外写一次文件,
+    写文件时顺便重新读取其它进程的用量; 按 UTC 日期重置。
+    """
+
+    def __init__(self, api_keys: list, requests_per_minute: int = 5, requests_per_day: int = 25, state_path: str = None, flush_seconds: float = 30.0):
+        self.per_day = requests_per_day if requests_per_day and requests_per_day > 0 else None
+        self.state_path = state_path
+        self.flush_seconds = flush_seconds
+        self._buckets = [_KeyBucket(key, requests_per_minute) for key in dict.fromkeys(api_keys) if key]
+        self._day = _utc_today()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._process_tag = f"{os.getpid()}-{int(time.time())}"
+        self._load_state()
+        if self.state_path:
+            atexit.register(self.flush)
+        logger.info("API Key 调度器初始化完成: %s 个 Key, 每分钟 %s 次, 每天 %s 次", len(self._buckets), requests_per_minute, requests_per_day)
+
+    @classmethod
+    def from_config(cls, api_keys: list, api_key_info: dict) -> "ApiKeyScheduler":
+        """根据 data_source.alpha_vantage_api_key_info 配置创建调度器"""
+        return cls(
+            api_keys,
+            requests_per_minute=api_key_info.get("requests_per_minute", 5),
+            requests_per_day=api_key_info.get("requests_per_day", 25),
+            state_path=api_key_info.get("usage_state_path"),
+            flush_seconds=api_key_info.get("usage_flush_seconds", 30),
+        )
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _state_files(self) -> tuple:
+        """(本进程的状态文件, 同一 state_path 下所有进程状态文件的 glob 模式)"""
+        stem, ext = os.path.splitext(self.state_path)
+        ext = ext or ".json"
+        return f"{stem}.{self._process_tag}{ext}", f"{glob.escape(stem)}.*{ext}"
+
+    def _read_other_usage(self) -> dict:
+        """读取其它进程当天的用量之和 {key_id: 次数}, 顺便删除过期日期的状态文件"""
+        own_file, pattern = self._state_files()
+        usage = {}
+        for path in glob.glob(pattern):
+            if os.path.abspath(path) == os.path.abspath(own_file):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except Exception as e:
+                logger.debug("读取 API Key 用量文件 %s 时出错: %s", path, e)
+                continue
+            if state.get("day") != self._day:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            for key_id, used in state.get("usage", {}).items():
+                usage[key_id] = usage.get(key_id, 0) + int(used)
+        return usage
+
+    def _apply_other_usage(self, usage: dict):
+        for bucket in self._buckets:
+            bucket.day_used = max(bucket.day_used, bucket.own_used + usage.get(bucket.key_id, 0))
+
+    def _load_state(self):
+        if not self.state_path:
+            return
+        usage = self._read_other_usage()
+        if usage:
+            self._apply_other_usage(usage)
+            logger.info("从 %s 恢复 API Key 当日用量", self.state_path)
+
+    def flush(self):
+        """把本进程的用量写入状态文件, 并合并其它进程的最新用量; 文件 I/O 不持有调度锁"""
+        if not self.state_path or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._cond:
+                self._dirty = False
+                self._last_flush = time.monotonic()
+                day = self._day
+                state = {"day": day, "usage": {bucket.key_id: bucket.own_used for bucket in self._buckets}}
+            own_file, _ = self._state_files()
+            state_dir = os.path.dirname(own_file)
+            if state_dir:
+                os.makedirs(state_dir, exist_ok=True)
+            tmp_path = own_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, own_file)
+            usage = self._read_other_usage()
+            with self._cond:
+                if self._day == day:
+                    self._apply_other_usage(usage)
+        except Exception as e:
+            logger.error("保存 API Key 用量文件 %s 时出错: %s", self.state_path, e)
+        finally:
+            self._flush_lock.release()
+
+    def _maybe_flush(self):
+        """距上次写文件超过 flush_seconds 且有新用量时写一次 (在调度锁外调用)"""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def _roll_day(self):
+        today = _utc_today()
+        if today != self._day:
+            self._day = today
+            for bucket in self._buckets:
+                bucket.day_used = 0
+                bucket.own_used = 0
+            self._dirty = True
+            logger.info("API Key 当日用量已重置: %s", today)
+
+    def _day_left(self, bucket: _KeyBucket) -> float:
+        return float("inf") if self.per_day is None else self.per_day - bucket.day_used
+
+    def acquire(self, timeout: float = None) -> str:
+        """获取一个可以立即发起请求的 API Key, 没有余量时排队等待
+
+        Args:
+            timeout (float, optional): 最长等待秒数, None 表示一直等待
+
+        Returns:
+            str: API Key, 等待超时或没有配置任何 Key 时返回 None
+        """
+        if not self._buckets:
+            logger.error("没有可调度的 Alpha Vantage API Key")
+            return None
+        api_key = self._acquire(timeout)
+        self._maybe_flush()
+        return api_key
+
+    def _acquire(self, timeout: float = None) -> str:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._roll_day()
+                best, best_headroom, wait = None, None, None
+                for bucket in self._buckets:
+                    bucket.refill(now)
+                    day_left = self._day_left(bucket)
+                    if day_left < 1:
+                        continue
+                    if bucket.tokens >= 1:
+                        headroom = (min(bucket.tokens, day_left), day_left)
+                        if best_headroom is None or headroom > best_headroom:
+                            best, best_headroom = bucket, headroom
+                    else:
+                        key_wait = bucket.seconds_until_token()
+                        wait = key_wait if wait is None else min(wait, key_wait)
+
+                if best is not None:
+                    best.tokens -= 1
+                    best.day_used += 1
+                    best.own_used += 1
+                    self._dirty = True
+                    return best.api_key
+
+                if wait is None:
+                    # 所有 Key 的当日额度都已用完, 等到下一个 UTC 日
+                    tomorrow = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+                    wait = (tomorrow - datetime.now(timezone.utc)).total_seconds()
+                    logger.warning("所有 API Key 的当日额度已用完，请求进入排队")
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        logger.error("等待 API Key 额度超时")
+                        return None
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    def report_exhausted(self, api_key: str):
+        """服务端提示额度用尽时调用: 将该 Key 标记为当日不可用 (未配置每日额度时清空当前令牌)"""
+        with self._cond:
+            for bucket in self._buckets:
+                if bucket.api_key == api_key:
+                    if self.per_day is not None:
+                        # 记为本进程的用量, 其它进程读取状态文件后也会认为该 Key 当日不可用
+                        bucket.own_used += max(0, self.per_day - bucket.day_used)
+                        bucket.day_used = max(bucket.day_used, self.per_day)
+                    else:
+                        bucket.tokens = 0
+                    logger.warning("API Key [%s] 额度已用尽", api_key[-6:])
+            self._dirty = True
+            self._cond.notify_all()
+        self.flush()
+
+    def usage(self) -> dict:
+        """获取各 Key 的当前用量
+
+        Returns:
+            dict: {Key 后 6 位: {"day_used": int, "day_left": int / None, "tokens": float}}
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._roll_day()
+            result = {}
+            for bucket in self._buckets:
+                bucket.refill(now)
+                day_left = self._day_left(bucket)
+                result[bucket.api_key[-6:]] = {
+                    "day_used": bucket.day_used,
+                    "day_left": None if day_left == float("inf") else int(day_left),
+                    "tokens": None if bucket.tokens == float("inf") else round(bucket.tokens, 3),
+                }
+            return result
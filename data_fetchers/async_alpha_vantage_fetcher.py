@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import httpx
+import pandas as pd
+from datetime import datetime, timedelta
+from utils.logger_manager import get_logger
+from .base_fetcher import BaseFetcher
+from .alpha_vantage_fetcher import (
+    ALPHA_VANTAGE_BASE_URL,
+    AlphaVantageRateLimitError,
+    is_rate_limited_response,
+)
+from .alpha_vantage_parser import TIME_SERIES_KEY, loads, parse_daily_payload
+from .http_session import RETRY_STATUS_CODES
+
+
+class AsyncAlphaVantageFetcher(BaseFetcher):
+    """Alpha Vantage 异步数据源驱动
+
+    使用 httpx.AsyncClient 连接池 (keep-alive), 在事件循环中并发获取多只股票而不占用工作线程。
+    一个实例的连接池绑定在创建它的事件循环上, 建议在应用 lifespan 中创建并在退出时 aclose()。
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = None,
+        timeout: float = 30,
+        retry_attempts: int = 3,
+        backoff_factor: float = 0.5,
+        max_connections: int = 10,
+    ):
+        self.api_key = api_key
+        self.logger = get_logger()
+        self.base_url = base_url or ALPHA_VANTAGE_BASE_URL
+        self.timeout = timeout
+        self.retry_attempts = retry_attempts
+        self.backoff_factor = backoff_factor
+        self.max_connections = max_connections
+        self._client = None
+
+    @classmethod
+    def from_http_config(cls, api_key: str, http_config: dict) -> "AsyncAlphaVantageFetcher":
+        """根据 get_driver_http_config 的结果创建异步驱动"""
+        return cls(
+            api_key,
+            base_url=http_config.get("base_url"),
+            timeout=http_config.get("timeout", 30),
+            retry_attempts=http_config.get("retry_attempts", 3),
+            backoff_factor=http_config.get("backoff_factor", 0.5),
+            max_connections=http_config.get("pool_maxsize", 10),
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+        return self._client
+
+    async def aclose(self):
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def _request_json(self, params: dict) -> dict:
+        """发送 GET 请求, 对连接错误和 429/5xx 按指数退避重试"""
+        client = self._get_client()
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                response = await client.get(self.base_url, params=params)
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.retry_attempts:
+                    self.logger.warning("[AlphaVantageAsync] Status %s, retry %s/%s", response.status_code, attempt + 1, self.retry_attempts)
+                    await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                    continue
+                response.raise_for_status()
+                return loads(response.content)
+            except httpx.TransportError as e:
+                if attempt >= self.retry_attempts:
+                    raise
+                self.logger.warning("[AlphaVantageAsync] %r, retry %s/%s", e, attempt + 1, self.retry_attempts)
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def GET_DAILY_STOCK_DATA_ASYNC(self, STOCK_CODE: str, outputsize: str = "full") -> pd.DataFrame:
+        """异步获取 TIME_SERIES_DAILY 日线数据
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            outputsize (str, optional): full 为全部历史数据, compact 为最近约 100 个交易日. Defaults to "full".
+
+        Returns:
+            pd.DataFrame: 包含日期、开盘价、最高价、最低价、收盘价和成交量的 DataFrame。
+        """
+        self.logger.info("[AlphaVantageAsync] Fetching %s data for %s...", outputsize, STOCK_CODE)
+        params = {
+            "function": "TIME_SERIES_DAILY",
+            "symbol": STOCK_CODE,
+            "outputsize": outputsize,
+            "apikey": self.api_key,
+        }
+        try:
+            data = await self._request_json(params)
+
+            if is_rate_limited_response(data):
+                self.logger.error("[AlphaVantageAsync] API Key [%s] rate limited: %s", self.api_key[-6:], data)
+                raise AlphaVantageRateLimitError(str(data))
+
+            if TIME_SERIES_KEY not in data:
+                self.logger.error("[AlphaVantageAsync] Invalid response: %s", data)
+                raise ValueError(f"Unexpected API response: {data}")
+
+            # 解析是 CPU 密集的, 放到线程中执行, 不阻塞事件循环
+            df = await asyncio.to_thread(parse_daily_payload, data)
+            self.logger.info("[AlphaVantageAsync] Successfully fetched %s rows for %s.", len(df), STOCK_CODE)
+            return df
+
+        except AlphaVantageRateLimitError:
+            raise
+        except Exception as e:
+            self.logger.exception("[AlphaVantageAsync] Failed to fetch stock data for %s: %s", STOCK_CODE, e)
+            return pd.DataFrame()
+
+    async def fetch_many(self, tickers: list, outputsize: str = "full", concurrency: int = 5) -> dict:
+        """并发获取多只股票的日线数据
+
+        Args:
+            tickers (list): 股票代码列表
+            outputsize (str, optional): full / compact. Defaults to "full".
+            concurrency (int, optional): 最大并发请求数. Defaults to 5.
+
+        Returns:
+            dict: {股票代码: DataFrame 或异常对象}
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(ticker):
+            async with semaphore:
+                return await self.GET_DAILY_STOCK_DATA_ASYNC(ticker, outputsize=outputsize)
+
+        tickers = list(dict.fromkeys(tickers))
+        results = await asyncio.gather(*(fetch_one(ticker) for ticker in tickers), return_exceptions=True)
+        return dict(zip(tickers, results))
+
+    async def fetch_data_async(self, ticker: str, years: int) -> pd.DataFrame:
+        """异步获取最近 N 年的数据"""
+        df = await self.GET_DAILY_STOCK_DATA_ASYNC(ticker, outputsize="full")
+        if df.empty:
+            return df
+        start_date = datetime.now() - timedelta(days=years * 365)
+        return df[df["date"] >= start_date].reset_index(drop=True)
+
+    def fetch_data(self, ticker: str, years: int) -> pd.DataFrame:
+        """同步接口: 在新的事件循环中执行 fetch_data_async (不能在已运行的事件循环中调用)"""
+        async def run():
+            async with AsyncAlphaVantageFetcher(
+                self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                retry_attempts=self.retry_attempts,
+                backoff_factor=self.backoff_factor,
+                max_connections=self.max_connections,
+            ) as fetcher:
+                return await fetcher.fetch_data_async(ticker, years)
+
+        return asyncio.run(run())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+import pandas as pd
+from abc import ABC, abstractmethod
+
+from utils.logger_manager import get_logger
+
+
+logger = get_logger()
+
+# 缓存文件中统一保存的列 (date 之外)
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def to_columns_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """将数据统一为带 date 列、默认整数索引的 DataFrame, 便于写入各种缓存格式
+
+    Args:
+        df (pd.DataFrame): date 为列或 DatetimeIndex 的股票数据
+
+    Returns:
+        pd.DataFrame: 带 date 列的 DataFrame
+    """
+    if "date" in df.columns:
+        return df.reset_index(drop=True)
+    if isinstance(df.index, pd.DatetimeIndex):
+        out = df.reset_index()
+        return out.rename(columns={out.columns[0]: "date"})
+    raise ValueError("DataFrame 缺少 date 列, 且 index 不是 DatetimeIndex")
+
+
+class BaseCacheBackend(ABC):
+    """所有缓存存储后端的抽象基类
+
+    读取时统一返回以 date 为 DatetimeIndex 的 DataFrame, 与原 CSV 缓存的读取结果一致。
+    """
+
+    name = ""
+    extension = ""
+
+    @abstractmethod
+    def write(self, df: pd.DataFrame, file_path: str) -> bool:
+        """
+        将数据写入缓存文件
+        Args:
+            df (pd.DataFrame): 要保存的数据 (date 列或 DatetimeIndex)
+            file_path (str): 缓存文件路径
+        Returns:
+            bool: 是否保存成功
+        """
+        pass
+
+    @abstractmethod
+    def read(self, file_path: str, columns: list = None) -> pd.DataFrame:
+        """
+        读取缓存文件
+        Args:
+            file_path (str): 缓存文件路径
+            columns (list, optional): 需要读取的列 (不含 date), None 表示全部列
+        Returns:
+            pd.DataFrame: 以 date 为 DatetimeIndex 的数据
+        """
+        pass
+
+    @staticmethod
+    def _finish(df: pd.DataFrame) -> pd.DataFrame:
+        """设置 date 索引并确认索引类型"""
+        if "date" in df.columns:
+            df = df.set_index("date")
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df.index = pd.to_datetime(df.index)
+        df.index.name = "date"
+        return df
+
+
+class CsvCacheBackend(BaseCacheBackend):
+    """CSV 缓存 (原有格式, 可读性好但解析慢)"""
+
+    name = "csv"
+    extension = "csv"
+
+    def write(self, df: pd.DataFrame, file_path: str) -> bool:
+        to_columns_frame(df).to_csv(file_path, index=False)
+        return os.path.exists(file_path)
+
+    def read(self, file_path: str, columns: list = None) -> pd.DataFrame:
+        usecols = None if columns is None else ["date"] + [c for c in columns if c != "date"]
+        df = pd.read_csv(file_path, usecols=usecols, parse_dates=["date"])
+        return self._finish(df)
+
+
+class ParquetCacheBackend(BaseCacheBackend):
+    """Parquet 列式缓存 (需要 pyarrow)"""
+
+    name = "parquet"
+    extension = "parquet"
+
+    def write(self, df: pd.DataFrame, file_path: str) -> bool:
+        to_columns_frame(df).to_parquet(file_path, index=False)
+        return os.path.exists(file_path)
+
+    def read(self, file_path: str, columns: list = None) -> pd.DataFrame:
+        cols = None if columns is None else ["date"] + [c for c in columns if c != "date"]
+        return self._finish(pd.read_parquet(file_path, columns=cols))
+
+
+class FeatherCacheBackend(BaseCacheBackend):
+    """Feather (Arrow IPC) 列式缓存 (需要 pyarrow)"""
+
+    name = "feather"
+    extension = "feather"
+
+    def write(self, df: pd.DataFrame, file_path: str) -> bool:
+        to_columns_frame(df).to_feather(file_path)
+        return os.path.exists(file_path)
+
+    def read(self, file_path: str, columns: list = None) -> pd.DataFrame:
+        cols = None if columns is None else ["date"] + [c for c in columns if c != "date"]
+        return self._finish(pd.read_feather(file_path, columns=cols))
+
+
+class NpzCacheBackend(BaseCacheBackend):
+    """NumPy .npz 缓存: 每列一个数组, date 以 int64 纳秒时间戳保存
+
+    np.load 对 .npz 是按需解压单个数组, 因此只读取请求的列。
+    """
+
+    name = "npz"
+    extension = "npz"
+
+    def __init__(self, compress: bool = False):
+        self.compress = compress
+
+    def write(self, df: pd.DataFrame, file_path: str) -> bool:
+        df = to_columns_frame(df)
+        arrays = {"date": pd.to_datetime(df["date"]).values.astype("datetime64[ns]").view("i8")}
+        for col in df.columns:
+            if col != "date":
+                arrays[col] = df[col].to_numpy(dtype=np.float64)
+        # np.savez 在文件名没有 .npz 后缀时会自动追加, 这里用文件对象写入保持路径不变
+        with open(file_path, "wb") as f:
+            if self.compress:
+                np.savez_compressed(f, **arrays)
+            else:
+                np.savez(f, **arrays)
+        return os.path.exists(file_path)
+
+    def read(self, file_path: str, columns: list = None) -> pd.DataFrame:
+        with np.load(file_path) as npz:
+            names = [c for c in npz.files if c != "date"] if columns is None else [c for c in columns if c != "date"]
+            index = pd.DatetimeIndex(npz["date"].view("datetime64[ns]"), name="date")
+            data = {name: npz[name] for name in names}
+        return pd.DataFrame(data, index=index)
+
+
+CACHE_BACKENDS = {
+    CsvCacheBackend.name: CsvCacheBackend,
+    ParquetCacheBackend.name: ParquetCacheBackend,
+    FeatherCacheBackend.name: FeatherCacheBackend,
+    NpzCacheBackend.name: NpzCacheBackend,
+}
+
+
+def get_cache_backend(cache_config: dict) -> BaseCacheBackend:
+    """根据 data_source.data_cache 配置创建缓存后端
+
+    Args:
+        cache_config (dict): data_cache 配置, 读取 format / compress 字段
+
+    Returns:
+        BaseCacheBackend: 缓存后端, 未知格式或缺少依赖时回退到 CSV
+    """
+    backend_name = str(cache_config.get("format", "csv")).lower()
+    if backend_name not in CACHE_BACKENDS:
+        logger.error("未知的缓存格式: %s, 可选: %s; 回退到 csv", backend_name, list(CACHE_BACKENDS.keys()))
+        return CsvCacheBackend()
+
+    if backend_name in ("parquet", "feather"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logger.error("缓存格式 %s 需要安装 pyarrow; 回退到 csv", backend_name)
+            return CsvCacheBackend()
+
+    if backend_name == "npz":
+        return NpzCacheBackend(compress=cache_config.get("compress", False))
+    return CACHE_BACKENDS[backend_name]()
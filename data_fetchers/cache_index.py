@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import threading
+from bisect import bisect_right, insort
+
+from utils.logger_manager import get_logger
+
+
+logger = get_logger()
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def parse_cache_file_name(file_name: str, extension: str = None) -> tuple:
+    """解析缓存文件名 "<TICKER>_<start>_<end>.<ext>"
+
+    Args:
+        file_name (str): 缓存文件名
+        extension (str, optional): 只接受该扩展名, None 表示不限制
+
+    Returns:
+        tuple: (ticker, start_date, end_date), 格式不正确时返回 None
+    """
+    stem, ext = os.path.splitext(file_name)
+    if extension is not None and ext.lstrip(".") != extension:
+        return None
+    # 从右边切分, 允许股票代码本身包含下划线
+    parts = stem.rsplit("_", 2)
+    if len(parts) != 3:
+        return None
+    ticker, start_date, end_date = parts
+    if not ticker or not _DATE_RE.match(start_date) or not _DATE_RE.match(end_date):
+        return None
+    return ticker, start_date, end_date
+
+
+class _TickerIntervals:
+    """单只股票的缓存区间: 按起始日期排序, 并维护前缀最大结束日期"""
+
+    def __init__(self):
+        self.entries = []   # [(start_date, end_date, file_name)], 按 start_date 排序
+        self.starts = []    # 与 entries 对应的 start_date, 用于二分查找
+        self.best = []      # best[i]: entries[0..i] 中 end_date 最大的下标
+
+    def _rebuild(self):
+        self.starts = [entry[0] for entry in self.entries]
+        self.best = []
+        best_index = 0
+        for i, entry in enumerate(self.entries):
+            if entry[1] > self.entries[best_index][1]:
+                best_index = i
+            self.best.append(best_index)
+
+    def add(self, entry: tuple):
+        if entry in self.entries:
+            return
+        insort(self.entries, entry)
+        self._rebuild()
+
+    def remove(self, file_name: str) -> bool:
+        before = len(self.entries)
+        self.entries = [entry for entry in self.entries if entry[2] != file_name]
+        if len(self.entries) == before:
+            return False
+        self._rebuild()
+        return True
+
+    def find(self, start_date: str, end_date: str):
+        """O(log n): 在 start <= start_date 的区间里取 end 最大的一个, 判断是否覆盖 end_date"""
+        i = bisect_right(self.starts, start_date) - 1
+        if i < 0:
+            return None
+        entry = self.entries[self.best[i]]
+        return entry if entry[1] >= end_date else None
+
+    def latest(self):
+        if not self.entries:
+            return None
+        return self.entries[self.best[-1]]
+
+
+class CacheIndex:
+    """缓存覆盖区间的内存索引
+
+    首次使用时扫描一次缓存目录, 之后由数据驱动保存缓存时调用 add() 增量更新,
+    查询 "哪个文件覆盖 [start, end]" 为 O(log n), 股票代码精确匹配。
+    """
+
+    def __init__(self, cache_dir: str, extension: str):
+        self.cache_dir = cache_dir
+        self.extension = extension
+        self._tickers = {}
+        self._built = False
+        self._lock = threading.RLock()
+
+    def build(self) -> int:
+        """扫描缓存目录, 重建索引
+
+        Returns:
+            int: 索引中的缓存文件数
+        """
+        with self._lock:
+            self._tickers = {}
+            count = 0
+            if os.path.isdir(self.cache_dir):
+                for file_name in os.listdir(self.cache_dir):
+                    if self._add(file_name):
+                        count += 1
+            else:
+                logger.warning("缓存目录 %s 不存在", self.cache_dir)
+            self._built = True
+            logger.info("缓存索引构建完成: %s 只股票, %s 个缓存文件", len(self._tickers), count)
+            return count
+
+    def _ensure_built(self):
+        if not self._built:
+            self.build()
+
+    def _add(self, file_name: str) -> bool:
+        parsed = parse_cache_file_name(file_name, self.extension)
+        if parsed is None:
+            return False
+        ticker, start_date, end_date = parsed
+        self._tickers.setdefault(ticker, _TickerIntervals()).add((start_date, end_date, file_name))
+        return True
+
+    def add(self, file_name: str) -> bool:
+        """登记一个新保存的缓存文件
+
+        Args:
+            file_name (str): 缓存文件名 (或完整路径)
+
+        Returns:
+            bool: 文件名格式正确并已登记返回 True
+        """
+        with self._lock:
+            self._ensure_built()
+            return self._add(os.path.basename(file_name))
+
+    def remove(self, file_name: str) -> bool:
+        """从索引中移除一个缓存文件
+
+        Args:
+            file_name (str): 缓存文件名 (或完整路径)
+
+        Returns:
+            bool: 是否移除成功
+        """
+        file_name = os.path.basename(file_name)
+        parsed = parse_cache_file_name(file_name, self.extension)
+        if parsed is None:
+            return False
+        with self._lock:
+            intervals = self._tickers.get(parsed[0])
+            if intervals is None or not intervals.remove(file_name):
+                return False
+            if not intervals.entries:
+                del self._tickers[parsed[0]]
+            return True
+
+    def find(self, ticker: str, start_date: str, end_date: str) -> str:
+        """查找覆盖 [start_date, end_date] 的缓存文件
+
+        Args:
+            ticker (str): 股票代码
+            start_date (str): 起始日期 (YYYY-MM-DD)
+            end_date (str): 结束日期 (YYYY-MM-DD)
+
+        Returns:
+            str: 缓存文件名, 没有覆盖的文件时返回 None
+        """
+        with self._lock:
+            self._ensure_built()
+            while True:
+                intervals = self._tickers.get(ticker)
+                entry = intervals.find(start_date, end_date) if intervals else None
+                if entry is None:
+                    return None
+                # 文件可能已被外部删除, 删除过期条目后重新查找
+                if os.path.exists(os.path.join(self.cache_dir, entry[2])):
+                    return entry[2]
+                logger.warning("缓存文件已不存在, 从索引移除: %s", entry[2])
+                self.remove(entry[2])
+
+    def latest(self, ticker: str) -> tuple:
+        """获取指定股票结束日期最新的缓存条目
+
+        Args:
+            ticker (str): 股票代码
+
+        Returns:
+            tuple: (start_date, end_date, file_name), 没有缓存时返回 None
+        """
+        with self._lock:
+            self._ensure_built()
+            intervals = self._tickers.get(ticker)
+            return intervals.latest() if intervals else None
+
+    def files(self, ticker: str) -> list:
+        """获取指定股票的全部缓存文件名 (按起始日期排序)"""
+        with self._lock:
+            self._ensure_built()
+            intervals = self._tickers.get(ticker)
+            return [entry[2] for entry in intervals.entries] if intervals else []
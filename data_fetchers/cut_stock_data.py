@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import numpy as np
 import pandas as pd
 
 from utils.logger_manager import get_logger
@@ -8,20 +9,45 @@ from utils.logger_manager import get_logger
 
 logger = get_logger()
 
+
+def _sorted_index(df: pd.DataFrame) -> pd.DataFrame:
+    """二分查找要求 index 升序; 已升序时原样返回, 否则排序一次 (会产生复制)"""
+    if not df.index.is_monotonic_increasing:
+        logger.warning("DataFrame.index 不是升序, 先排序 (会复制数据)")
+        df = df.sort_index()
+    return df
+
+
+def _window_bounds(index: pd.DatetimeIndex, last_n: int = None, start_date: str = None, end_date: str = None) -> tuple:
+    """在升序的 DatetimeIndex 上二分查找窗口的行范围 [lo, hi)
+
+    last_n 优先于日期范围, 与 filter_stock_data 一致。
+    """
+    if last_n is not None:
+        return max(len(index) - last_n, 0), len(index)
+    lo = 0 if start_date is None else int(index.searchsorted(pd.Timestamp(start_date), side="left"))
+    hi = len(index) if end_date is None else int(index.searchsorted(pd.Timestamp(end_date), side="right"))
+    return lo, max(lo, hi)
+
+
 def filter_stock_data(
     df: pd.DataFrame,
     last_n: int = None,
     start_date: str = None,
-    end_date: str = None
+    end_date: str = None,
+    copy: bool = False
 ) -> pd.DataFrame:
     """
     根据指定条件过滤股票数据 (支持最近N个交易日 或者 指定日期范围)
 
+    在升序的 DatetimeIndex 上二分查找后按位置切片, 默认返回视图, 不复制整段历史。
+
     Args:
         df (pd.DataFrame): 股票历史数据，index 必须是 DatetimeIndex
         last_n (int, optional): 最近的 N 个交易日，例如 5, 10, 20...
         start_date (str, optional): 起始日期 (YYYY-MM-DD)
         end_date (str, optional): 结束日期 (YYYY-MM-DD)
+        copy (bool, optional): True 返回独立的副本; 默认返回视图, 修改前请先复制. Defaults to False.
 
     Returns:
         pd.DataFrame: 过滤后的股票数据
@@ -34,27 +60,81 @@ def filter_stock_data(
         logger.error("DataFrame.index 必须是 DatetimeIndex，请检查数据")
         return pd.DataFrame()
 
-    result = df.copy()
-
     try:
-        if last_n is not None:
-            result = result.tail(last_n)
-            logger.info(f"已获取最近 {last_n} 个交易日的数据，共 {len(result)} 行")
+        df = _sorted_index(df)
+        lo, hi = _window_bounds(df.index, last_n, start_date, end_date)
+        result = df.iloc[lo:hi]
 
+        if last_n is not None:
+            logger.info("已获取最近 %s 个交易日的数据，共 %s 行", last_n, len(result))
         elif start_date is not None or end_date is not None:
-            if start_date:
-                start_date = pd.to_datetime(start_date)
-            if end_date:
-                end_date = pd.to_datetime(end_date)
-
-            result = result.loc[start_date:end_date]
-            logger.info(f"已获取 {start_date} 到 {end_date} 之间的数据，共 {len(result)} 行")
-
+            logger.info("已获取 %s 到 %s 之间的数据，共 %s 行", start_date, end_date, len(result))
         else:
             logger.info("未指定过滤条件，返回完整数据")
 
     except Exception as e:
-        logger.error(f"过滤股票数据时出错: {e}")
+        logger.error("过滤股票数据时出错: %s", e)
         return pd.DataFrame()
 
-    return result
+    return result.copy() if copy else result
+
+
+def filter_stock_data_windows(df: pd.DataFrame, windows: list, copy: bool = False) -> list:
+    """对同一只股票一次截取多个日期窗口
+
+    所有窗口的起止日期在 index 上一次向量化二分查找。
+
+    Args:
+        df (pd.DataFrame): 股票历史数据，index 必须是 DatetimeIndex
+        windows (list): [(start_date, end_date), ...], 任一端为 None 表示不限
+        copy (bool, optional): True 返回独立的副本. Defaults to False.
+
+    Returns:
+        list: 与 windows 一一对应的 DataFrame
+    """
+    if df.empty or not windows:
+        return [df.iloc[0:0] for _ in windows]
+    if not isinstance(df.index, pd.DatetimeIndex):
+        logger.error("DataFrame.index 必须是 DatetimeIndex，请检查数据")
+        return [pd.DataFrame() for _ in windows]
+
+    df = _sorted_index(df)
+    index = df.index
+    starts = pd.DatetimeIndex([pd.NaT if s is None else pd.Timestamp(s) for s, _ in windows])
+    ends = pd.DatetimeIndex([pd.NaT if e is None else pd.Timestamp(e) for _, e in windows])
+    lo = np.where(starts.isna(), 0, index.searchsorted(starts.fillna(index[0]), side="left"))
+    hi = np.where(ends.isna(), len(index), index.searchsorted(ends.fillna(index[-1]), side="right"))
+    hi = np.maximum(lo, hi)
+    results = [df.iloc[int(l):int(h)] for l, h in zip(lo, hi)]
+    return [r.copy() for r in results] if copy else results
+
+
+def filter_stock_data_batch(
+    frames: dict,
+    last_n: int = None,
+    start_date: str = None,
+    end_date: str = None,
+    copy: bool = False
+) -> dict:
+    """对多只股票截取同一个窗口
+
+    Args:
+        frames (dict): {股票代码: DataFrame}, 值为 None 或空表的原样保留
+        last_n (int, optional): 最近的 N 个交易日
+        start_date (str, optional): 起始日期 (YYYY-MM-DD)
+        end_date (str, optional): 结束日期 (YYYY-MM-DD)
+        copy (bool, optional): True 返回独立的副本. Defaults to False.
+
+    Returns:
+        dict: {股票代码: 过滤后的 DataFrame}
+    """
+    results = {}
+    for ticker, df in frames.items():
+        if df is None or df.empty or not isinstance(df.index, pd.DatetimeIndex):
+            results[ticker] = df
+            continue
+        df = _sorted_index(df)
+        lo, hi = _window_bounds(df.index, last_n, start_date, end_date)
+        results[ticker] = df.iloc[lo:hi].copy() if copy else df.iloc[lo:hi]
+    logger.info("已截取 %s 只股票的数据窗口", len(results))
+    return results
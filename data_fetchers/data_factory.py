@@ -4,12 +4,24 @@
 
 import os
 import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import pandas as pd
 
 from utils.logger_manager import get_logger
-from data_fetchers.alpha_vantage_fetcher import AlphaVantageFetcher
-from data_fetchers.yahoo_fetcher import YahooFetcher
+from utils.single_flight import SingleFlight
+from utils import metrics
+from data_fetchers.alpha_vantage_fetcher import AlphaVantageRateLimitError
+from data_fetchers.api_key_scheduler import ApiKeyScheduler
+from data_fetchers.http_session import get_driver_http_config, get_shared_session
+from data_fetchers.driver_registry import create_driver, registered_drivers
+from data_fetchers.cache_backends import get_cache_backend
+from data_fetchers.cache_index import CacheIndex, parse_cache_file_name
+from data_fetchers.memmap_store import MemmapOHLCVStore
+from data_fetchers.frame_cache import FrameLRUCache
 
 
 logger = get_logger()
@@ -30,7 +42,34 @@ class DataFactory:
         self.data_drivers = self.config.get("data_drivers", [])
         self.first_data_drive = self.config.get("frist_data_drive", "data_cache")
         self.years = self.config.get("years", 5)
+        # 数据驱动由注册表按需导入和创建, 未使用的驱动 (例如 yfinance) 不会被导入
+        if self.data_driver not in registered_drivers(self.data_drivers):
+            logger.error("数据驱动 %s 未注册或不在 data_drivers 中; 可以支持的配置有: %s", self.data_driver, registered_drivers(self.data_drivers))
         self.alpha_vantage_api_keys = self.get_alpha_vantage_api_keys()
+        # API Key 调度器: 每个 Key 按分钟/每日额度限流, 请求分配给余量最多的 Key
+        api_key_info = self.config.get("alpha_vantage_api_key_info", {})
+        self.api_key_scheduler = ApiKeyScheduler.from_config(self.alpha_vantage_api_keys, api_key_info)
+        self.api_key_wait_seconds = api_key_info.get("max_wait_seconds", None)
+        # HTTP 配置 (timeout / retry_attempts) 来自 data_driven_configeration, 所有 Key 共享一个连接池会话
+        self.alpha_vantage_http_config = get_driver_http_config(config, "Alpha Vantage")
+        self._alpha_vantage_fetchers = {}
+        self._fetchers_lock = threading.Lock()
+        # 合并并发的相同请求: 同一 (驱动, 股票, 日期范围) 只向上游请求一次
+        self._single_flight = SingleFlight()
+        self.cache_backend = get_cache_backend(self.cache_config)
+        self.cache_dir = self.cache_config.get("cache_dir", "data_cache")
+        # 缓存覆盖区间索引: 首次查询时扫描一次缓存目录, 之后随数据驱动保存增量更新
+        self.cache_index = CacheIndex(self.cache_dir, self.cache_backend.extension)
+        # 进程内 DataFrame LRU 缓存, 按总字节数淘汰, 数据驱动保存新数据时按股票失效
+        self.frame_cache = FrameLRUCache(int(self.cache_config.get("memory_cache_max_mb", 256) * 1024 * 1024))
+        # 存储引擎: files 为按文件缓存; memmap 额外维护按股票只追加的 memmap 列存储, 读取日期窗口不解析不复制
+        self.storage_engine = self.cache_config.get("storage_engine", "files")
+        self.ohlcv_store = None
+        if self.storage_engine == "memmap":
+            self.ohlcv_store = MemmapOHLCVStore(self.cache_config.get("memmap_dir", os.path.join(self.cache_dir, "ohlcv")))
+        # 在线指标状态 (<cache_dir>/<TICKER>.indicators.json): 保存新数据后只对新增K线做 O(1) 更新
+        self.online_indicators = self.cache_config.get("online_indicators", True)
+        self._indicator_store = None
 
         logger.info("DataFactory 初始化完成")
 
@@ -42,8 +81,8 @@ class DataFactory:
         :param end_date: 结束日期
         :return: 缓存文件完整路径
         """
-        file_name_style = self.cache_config.get("file_name_style", "{ticker}_{start}_{end}.csv")
-        file_name = file_name_style.format(ticker=ticker, start_date=start_date, end_date=end_date)
+        file_name_style = self.cache_config.get("file_name_style", "{ticker}_{start_date}_{end_date}.{ext}")
+        file_name = file_name_style.format(ticker=ticker, start_date=start_date, end_date=end_date, ext=self.cache_backend.extension)
         cache_dir = self.cache_config.get("cache_dir", "data_cache")
         os.makedirs(cache_dir, exist_ok=True)
         return os.path.join(cache_dir, file_name)
@@ -60,9 +99,9 @@ class DataFactory:
         expiration_days = self.cache_config.get("expiration_days", 7)
         file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
         if datetime.now() - file_mtime > timedelta(days=expiration_days):
-            logger.info(f"缓存文件 {file_path} 已过期")
+            logger.info("缓存文件 %s 已过期", file_path)
             return False
-        logger.info(f"缓存文件 {file_path} 有效，直接使用")
+        logger.info("缓存文件 %s 有效，直接使用", file_path)
         return True
 
     def info(self) -> str:
@@ -74,7 +113,9 @@ class DataFactory:
         info_str = info_str + f"数据优先级 (frist_data_drive): {self.first_data_drive}" + "\n"
         info_str = info_str + f"当前使用的数据驱动: {self.data_driver}" + "\n"
         info_str = info_str + f"可选数据驱动列表: {self.data_drivers}" + "\n"
+        info_str = info_str + f"缓存格式: {self.cache_backend.name}, 存储引擎: {self.storage_engine}" + "\n"
         info_str = info_str + f"缓存配置: {json.dumps(self.cache_config, indent=4, ensure_ascii=False)}" + "\n"
+        info_str = info_str + f"内存缓存: {self.frame_cache.stats()}" + "\n"
         info_str = info_str + f"默认获取数据年限: {self.years} 年" + "\n"
         info_str = info_str + "=======================" + "\n"
         print(info_str)
@@ -90,10 +131,10 @@ class DataFactory:
         logger.info("获取所有缓存文件名")
         cache_dir = self.cache_config.get("cache_dir", "data_cache")
         if not os.path.exists(cache_dir):
-            logger.warning(f"缓存目录 {cache_dir} 不存在")
+            logger.warning("缓存目录 %s 不存在", cache_dir)
             return []
         all_stock_cache_file_names = [f for f in os.listdir(cache_dir) if os.path.isfile(os.path.join(cache_dir, f))]
-        logger.info(f"找到 {len(all_stock_cache_file_names)} 个缓存文件")
+        logger.info("找到 %s 个缓存文件", len(all_stock_cache_file_names))
         return all_stock_cache_file_names
     
     def get_target_cache_files_name(self, STOCK_CODE: str) -> list:
@@ -106,10 +147,9 @@ class DataFactory:
             list: 缓存文件名列表
         """
         
-        logger.info(f"获取 {STOCK_CODE} 的缓存文件列表")
-        all_cache_files = self.get_all_cache_files_name()
-        target_cache_files = [f for f in all_cache_files if f.startswith(STOCK_CODE)]
-        logger.info(f"找到 {len(target_cache_files)} 个 {STOCK_CODE} 的缓存文件")
+        logger.info("获取 %s 的缓存文件列表", STOCK_CODE)
+        target_cache_files = self.cache_index.files(STOCK_CODE)
+        logger.info("找到 %s 个 %s 的缓存文件", len(target_cache_files), STOCK_CODE)
         return target_cache_files
     
     def check_date_windows(self, START_DATE: str, END_DATE: str) -> bool:
@@ -123,7 +163,7 @@ class DataFactory:
             bool: True 合法, False 不合法
         """
         check_status = False
-        logger.info(f"检查日期范围是否合法: {START_DATE} 到 {END_DATE}")
+        logger.info("检查日期范围是否合法: %s 到 %s", START_DATE, END_DATE)
         try:
             today_dt = datetime.now()
             start_dt = datetime.strptime(START_DATE, "%Y-%m-%d")
@@ -136,7 +176,7 @@ class DataFactory:
                 return check_status
             check_status = True
         except ValueError as ve:
-            logger.error(f"日期格式错误: {ve}")
+            logger.error("日期格式错误: %s", ve)
         return check_status
     
     def check_cache_data(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, cache_files: list=[]) -> bool:
@@ -151,29 +191,40 @@ class DataFactory:
         Returns:
             bool: True 有效缓存, False 无效缓存
         """
-        check_status = False
-        logger.info(f"检查 {STOCK_CODE} 在 {START_DATE} 到 {END_DATE} 之间是否有有效的缓存数据")
+        logger.info("检查 %s 在 %s 到 %s 之间是否有有效的缓存数据", STOCK_CODE, START_DATE, END_DATE)
+        return self.find_cache_file_name(STOCK_CODE, START_DATE, END_DATE, cache_files) is not None
+
+    def find_cache_file_name(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, cache_files: list=[]) -> str:
+        """在缓存文件名列表中查找覆盖指定日期范围的缓存文件 (只考虑当前缓存格式的文件)
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            START_DATE (str): 开始日期
+            END_DATE (str): 结束日期
+            cache_files (list, optional): 缓存文件名列表. Defaults to [].
+
+        Returns:
+            str: 缓存文件名, 没有找到时返回 None
+        """
         for index, cache_file_name in enumerate(cache_files):
-            if not cache_file_name.startswith(STOCK_CODE):
+            parsed = parse_cache_file_name(cache_file_name, self.cache_backend.extension)
+            if parsed is None:
+                logger.debug("%s. 缓存文件名格式不正确: %s", index, cache_file_name)
                 continue
-            parts = cache_file_name.replace(".csv", "").split("_")
-            if len(parts) < 3:
-                logger.warning(f"{str(index)}. 缓存文件名格式不正确: {cache_file_name}")
+            file_ticker, file_start_date, file_end_date = parsed
+            if file_ticker != STOCK_CODE:
                 continue
             try:
-                file_start_date = parts[1]
-                file_end_date = parts[2]
                 if file_start_date <= START_DATE and file_end_date >= END_DATE:
-                    file_path = os.path.join(self.cache_config.get("cache_dir", "data_cache"), cache_file_name)
+                    file_path = os.path.join(self.cache_dir, cache_file_name)
                     if os.path.exists(file_path):
-                        logger.info(f"{str(index)}. 找到有效缓存文件: {cache_file_name}")
-                        check_status = True
-                        break
+                        logger.info("%s. 找到有效缓存文件: %s", index, cache_file_name)
+                        return cache_file_name
                     else:
-                        logger.warning(f"{str(index)}. 缓存文件不存在: {cache_file_name}")
+                        logger.warning("%s. 缓存文件不存在: %s", index, cache_file_name)
             except Exception as e:
-                logger.error(f"{str(index)}. 解析缓存文件名时出错: {e}")
-        return check_status
+                logger.error("%s. 解析缓存文件名时出错: %s", index, e)
+        return None
     
     def get_alpha_vantage_api_keys(self) -> list:
         """获取 Alpha Vantage API Key 列表
@@ -197,9 +248,9 @@ class DataFactory:
                                     api_keys.append(key)
                     elif isinstance(data, list):
                         api_keys = data
-                logger.info(f"从文件 {api_key_file_path} 读取到 {len(api_keys)} 个 API Key")
+                logger.info("从文件 %s 读取到 %s 个 API Key", api_key_file_path, len(api_keys))
             except Exception as e:
-                logger.error(f"读取 API Key 文件时出错: {e}")
+                logger.error("读取 API Key 文件时出错: %s", e)
         else:
             single_api_key = api_key_info.get("api_key", "")
             if single_api_key:
@@ -210,38 +261,317 @@ class DataFactory:
         return api_keys
     
     
-    def GET_STOCK_DATA(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
-        
-        logger.info(f"请求股票数据: {STOCK_CODE}, 从 {START_DATE} 到 {END_DATE}")
-        logger.info(f"先检查数据优先级: {self.first_data_drive}")
-        used_api_get_data = False
-        if self.first_data_drive == "data_cache" and self.cache_config.get("enabled", False):
-            logger.info("优先使用缓存数据")
-            # 获取指定股票的缓存文件名
-            target_cache_files_name = self.get_target_cache_files_name(STOCK_CODE)
-            # 查看缓存是否存在且有效
-            if self.check_cache_data(STOCK_CODE, START_DATE, END_DATE, target_cache_files_name):
-                logger.info("找到有效缓存，使用缓存数据")
-                return self.GET_STOCK_DATA_FROM_CACHE(STOCK_CODE, START_DATE, END_DATE)
-            else:
-                logger.warning("未找到有效缓存，使用API数据驱动")
-                used_api_get_data = True
+    def cache_stats(self) -> dict:
+        """内存缓存的命中/未命中/淘汰计数
+
+        Returns:
+            dict: FrameLRUCache.stats()
+        """
+        return self.frame_cache.stats()
+
+    def GET_CACHE_ENTRY_INFO(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> dict:
+        """获取覆盖指定日期范围的缓存条目的版本信息 (不读取数据), 用于 HTTP ETag / Last-Modified
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            START_DATE (str): 起始日期 (格式: YYYY-MM-DD)
+            END_DATE (str): 结束日期 (格式: YYYY-MM-DD)
+
+        Returns:
+            dict: {"path": str, "mtime": float, "mtime_ns": int, "size": int}, 没有覆盖的缓存时返回 None
+        """
+        if not self._use_cache_first():
+            return None
+        if self.ohlcv_store is not None and self.ohlcv_store.covers(STOCK_CODE, START_DATE, END_DATE):
+            path = self.ohlcv_store.commit_path(STOCK_CODE)
         else:
-            logger.info("跳过缓存，直接使用API数据驱动")
-            used_api_get_data = True
-        if used_api_get_data:
-            logger.info(f"使用数据驱动: {self.data_driver} 获取数据")
-            data_driver = self.data_driver
-            if data_driver == "yahoo_finance":
+            cache_file_name = self.cache_index.find(STOCK_CODE, START_DATE, END_DATE)
+            if cache_file_name is None:
+                return None
+            path = os.path.join(self.cache_dir, cache_file_name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return {"path": path, "mtime": stat.st_mtime, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    def _on_cache_saved(self, STOCK_CODE: str, file_path: str, df: pd.DataFrame):
+        """数据驱动保存缓存文件后的回调: 更新缓存索引, 追加到 memmap 存储, 并更新在线指标状态
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            file_path (str): 新保存的缓存文件路径
+            df (pd.DataFrame): 保存的数据
+        """
+        if self.cache_index.add(file_path):
+            logger.info("缓存索引已登记 %s: %s", STOCK_CODE, os.path.basename(file_path))
+        else:
+            logger.warning("缓存文件名无法登记到索引: %s", file_path)
+        # 新数据已落盘, 该股票在内存缓存中的旧数据全部失效
+        self.frame_cache.invalidate(STOCK_CODE)
+        if self.ohlcv_store is not None:
+            self.ohlcv_store.append(STOCK_CODE, df)
+        if self.online_indicators:
+            self._update_online_indicators(STOCK_CODE, df)
+
+    @property
+    def indicator_store(self):
+        """在线指标状态存储 (第一次使用时创建)"""
+        if self._indicator_store is None:
+            # superrich.data 依赖 data_fetchers, 在这里延迟导入避免循环导入
+            from superrich.data.online_indicators import IndicatorStateStore
+            self._indicator_store = IndicatorStateStore(self.cache_dir)
+        return self._indicator_store
+
+    def _update_online_indicators(self, STOCK_CODE: str, df: pd.DataFrame):
+        """只把晚于状态 last_date 的新K线喂给在线指标, 失败不影响数据保存"""
+        from superrich.data.online_indicators import update_ticker_indicators
+        try:
+            with metrics.span("data_factory.online_indicators"):
+                update_ticker_indicators(STOCK_CODE, df, self.indicator_store)
+        except Exception as e:
+            logger.error("更新 %s 的在线指标时出错: %s", STOCK_CODE, e)
+
+    def _use_cache_first(self) -> bool:
+        """是否优先使用缓存数据"""
+        return self.first_data_drive == "data_cache" and self.cache_config.get("enabled", False)
+
+    def _GET_STOCK_DATA_IF_CACHED(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, columns: list = None) -> pd.DataFrame:
+        """缓存覆盖请求的日期范围时读取缓存数据
+
+        Returns:
+            pd.DataFrame: 缓存数据, 没有覆盖的缓存时返回 None
+        """
+        with metrics.span("data_factory.cache"):
+            if self.ohlcv_store is not None and self.ohlcv_store.covers(STOCK_CODE, START_DATE, END_DATE):
+                logger.info("memmap 存储覆盖请求的日期范围，直接返回日期窗口视图")
+                metrics.inc("cache_hit", source="memmap")
+                return self.GET_STOCK_DATA_FROM_MEMMAP(STOCK_CODE, START_DATE, END_DATE, columns=columns)
+            # 通过缓存索引查找覆盖日期范围的缓存文件
+            with metrics.span("data_factory.cache_index_find"):
+                cache_file_name = self.cache_index.find(STOCK_CODE, START_DATE, END_DATE)
+            if cache_file_name is not None:
+                logger.info("找到有效缓存 %s，使用缓存数据", cache_file_name)
+                metrics.inc("cache_hit", source="file")
+                return self.GET_STOCK_DATA_FROM_CACHE(STOCK_CODE, START_DATE, END_DATE, columns=columns)
+            metrics.inc("cache_miss")
+            return None
+
+    def _GET_STOCK_DATA_FROM_DRIVER(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
+        """使用配置的数据驱动获取数据, 相同 (驱动, 股票, 日期范围) 的并发请求合并为一次上游请求
+
+        并发调用方拿到的是同一个 DataFrame 对象, 不要原地修改。
+        """
+        key = (self.data_driver, STOCK_CODE, START_DATE, END_DATE)
+        return self._single_flight.do(key, self._FETCH_FROM_DRIVER, STOCK_CODE, START_DATE, END_DATE)
+
+    def _FETCH_FROM_DRIVER(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
+        """按配置的数据驱动分发请求"""
+        logger.info("使用数据驱动: %s 获取数据", self.data_driver)
+        data_driver = self.data_driver
+        metrics.inc("driver_fetch", driver=data_driver)
+        if data_driver == "yahoo_finance":
+            with metrics.span("data_factory.driver", driver=data_driver):
                 return self.GET_STOCK_DATA_FROM_yahoo_finance(STOCK_CODE, START_DATE, END_DATE)
-            elif data_driver == "alpha_vantage":
+        elif data_driver == "alpha_vantage":
+            with metrics.span("data_factory.driver", driver=data_driver):
                 return self.GET_STOCK_DATA_FROM_alpha_vantage(STOCK_CODE, START_DATE, END_DATE)
-            else:
-                logger.error(f"未知的数据驱动: {data_driver}, 无法获取数据;可以支持的配置有: {self.data_drivers}")
-                return None
         else:
-            logger.error("不使用缓存且不使用API数据驱动，无法获取数据")
+            logger.error("未知的数据驱动: %s, 无法获取数据;可以支持的配置有: %s", data_driver, self.data_drivers)
+            return None
+
+    def GET_STOCK_DATA(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, columns: list = None) -> pd.DataFrame:
+        with metrics.span("data_factory.get_stock_data"):
+            return self._GET_STOCK_DATA(STOCK_CODE, START_DATE, END_DATE, columns=columns)
+
+    def _GET_STOCK_DATA(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, columns: list = None) -> pd.DataFrame:
+        logger.info("请求股票数据: %s, 从 %s 到 %s", STOCK_CODE, START_DATE, END_DATE)
+        logger.info("先检查数据优先级: %s", self.first_data_drive)
+        if self._use_cache_first():
+            logger.info("优先使用缓存数据")
+            cached_data = self._GET_STOCK_DATA_IF_CACHED(STOCK_CODE, START_DATE, END_DATE, columns=columns)
+            if cached_data is not None:
+                return cached_data
+            logger.warning("未找到有效缓存，使用API数据驱动")
+        else:
+            logger.info("跳过缓存，直接使用API数据驱动")
+        return self._GET_STOCK_DATA_FROM_DRIVER(STOCK_CODE, START_DATE, END_DATE)
+
+    async def GET_STOCK_DATA_ASYNC(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, columns: list = None, executor=None) -> pd.DataFrame:
+        """GET_STOCK_DATA 的异步版本: 缓存读取和上游请求在 executor 中执行, 不阻塞事件循环
+
+        缓存未命中时与其它线程/协程中相同 (驱动, 股票, 日期范围) 的请求合并, 等待期间不占用线程。
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            START_DATE (str): 起始日期 (格式: YYYY-MM-DD)
+            END_DATE (str): 结束日期 (格式: YYYY-MM-DD)
+            columns (list, optional): 只读取这些列 (不含 date)
+            executor (Executor, optional): 执行阻塞 I/O 的线程池, None 表示事件循环默认线程池
+
+        Returns:
+            pd.DataFrame: 股票数据
+        """
+        loop = asyncio.get_running_loop()
+        if self._use_cache_first():
+            cached_data = await loop.run_in_executor(
+                executor, self._GET_STOCK_DATA_IF_CACHED, STOCK_CODE, START_DATE, END_DATE, columns
+            )
+            if cached_data is not None:
+                return cached_data
+            logger.warning("%s 未找到有效缓存，使用API数据驱动", STOCK_CODE)
+        key = (self.data_driver, STOCK_CODE, START_DATE, END_DATE)
+        return await self._single_flight.do_async(
+            key, self._FETCH_FROM_DRIVER, STOCK_CODE, START_DATE, END_DATE, executor=executor
+        )
+
+    def GET_STOCK_DATA_BATCH(self, STOCK_CODES: list, START_DATE: str, END_DATE: str, max_workers: int = None, output: str = "dict") -> tuple:
+        """批量获取多只股票的数据: 缓存命中的直接返回, 未命中的用有界线程池并发请求数据驱动
+
+        未命中的请求由 API Key 调度器分配到余量最多的 Key, 使请求分散到 get_alpha_vantage_api_keys 读取的所有 Key 上。
+
+        Args:
+            STOCK_CODES (list): 股票代码列表
+            START_DATE (str): 起始日期 (格式: YYYY-MM-DD)
+            END_DATE (str): 结束日期 (格式: YYYY-MM-DD)
+            max_workers (int, optional): 线程池大小, None 表示读取 data_source.batch.max_workers
+            output (str, optional): dict 返回 {股票代码: DataFrame}; panel 返回带 symbol 列的长表. Defaults to "dict".
+
+        Returns:
+            tuple: (数据, 状态), 状态为 {股票代码: {"status": "cache" / "fetched" / "failed", "elapsed_ms": float, "rows": int, "error": str}}
+        """
+        symbols = list(dict.fromkeys(STOCK_CODES))
+        logger.info("批量请求 %s 只股票数据, 从 %s 到 %s", len(symbols), START_DATE, END_DATE)
+        results = {}
+        report = {}
+
+        def record(symbol, status, started, df=None, error=None):
+            results[symbol] = df
+            report[symbol] = {
+                "status": status,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                "rows": 0 if df is None else len(df),
+                "error": error,
+            }
+
+        # 1. 缓存命中的直接返回
+        misses = []
+        for symbol in symbols:
+            started = time.perf_counter()
+            cached_data = None
+            if self._use_cache_first():
+                try:
+                    cached_data = self._GET_STOCK_DATA_IF_CACHED(symbol, START_DATE, END_DATE)
+                except Exception as e:
+                    logger.error("读取 %s 缓存时出错: %s", symbol, e)
+            if cached_data is not None and not cached_data.empty:
+                record(symbol, "cache", started, cached_data)
+            else:
+                misses.append(symbol)
+
+        # 2. 未命中的并发请求数据驱动
+        if misses:
+            batch_config = self.config.get("batch", {})
+            if max_workers is None:
+                max_workers = batch_config.get("max_workers", 4)
+            max_workers = max(1, min(max_workers, len(misses)))
+            logger.info("缓存命中 %s 只, 未命中 %s 只, 使用 %s 个线程请求数据", len(symbols) - len(misses), len(misses), max_workers)
+
+            def fetch(symbol):
+                started = time.perf_counter()
+                try:
+                    df = self._GET_STOCK_DATA_FROM_DRIVER(symbol, START_DATE, END_DATE)
+                    if df is None or df.empty:
+                        return symbol, "failed", started, None, "数据驱动没有返回数据"
+                    return symbol, "fetched", started, df, None
+                except Exception as e:
+                    return symbol, "failed", started, None, str(e)
+
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stock-batch") as executor:
+                futures = [executor.submit(fetch, symbol) for symbol in misses]
+                for future in as_completed(futures):
+                    record(*future.result())
+
+        failed = [symbol for symbol, item in report.items() if item["status"] == "failed"]
+        if failed:
+            logger.warning("批量请求中 %s 只股票获取失败: %s", len(failed), failed)
+
+        if output == "panel":
+            frames = []
+            for symbol in symbols:
+                df = results.get(symbol)
+                if df is None or df.empty:
+                    continue
+                if "date" not in df.columns:
+                    df = df.reset_index()
+                frames.append(df.assign(symbol=symbol))
+            panel = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            if not panel.empty:
+                panel = panel[["symbol"] + [c for c in panel.columns if c != "symbol"]]
+            return panel, report
+        return {symbol: results.get(symbol) for symbol in symbols}, report
+
+    def latest_cached_window(self, STOCK_CODE: str, history_days: int) -> tuple:
+        """以最新缓存文件的最后一根K线为终点、向前 history_days 天的日期窗口
+
+        缓存文件按最后一根K线命名, 以今天为终点的窗口在周末、节假日或收盘前都不会被缓存覆盖。
+
+        Returns:
+            tuple: (start_date, end_date), 没有缓存时返回 None
+        """
+        latest = self.cache_index.latest(STOCK_CODE)
+        if latest is None:
             return None
+        cache_start, cache_end, _ = latest
+        window_start = (datetime.strptime(cache_end, "%Y-%m-%d") - timedelta(days=history_days)).strftime("%Y-%m-%d")
+        return max(cache_start, window_start), cache_end
+
+    def GET_LATEST_HISTORY_BATCH(self, STOCK_CODES: list, history_days: int, max_workers: int = None, max_cache_age_days: int = None) -> dict:
+        """批量获取每只股票最近 history_days 天的历史数据
+
+        有缓存的股票以缓存的最后一根K线为终点直接读取缓存, 不请求上游也不重写缓存;
+        没有缓存, 或最后一根K线早于 max_cache_age_days 天前的股票, 以今天为终点通过数据驱动批量获取 (按 refresh_mode 增量刷新)。
+
+        Args:
+            STOCK_CODES (list): 股票代码
+            history_days (int): 历史窗口天数 (自然日)
+            max_workers (int, optional): 数据驱动的线程数
+            max_cache_age_days (int, optional): 缓存最后一根K线的最长时效 (自然日), None 表示缓存永不过期
+
+        Returns:
+            dict: {股票代码: 数据}, 获取失败的股票不在结果中
+        """
+        frames, misses = {}, []
+        stale_before = None
+        if max_cache_age_days is not None:
+            stale_before = (datetime.now() - timedelta(days=max_cache_age_days)).strftime("%Y-%m-%d")
+        for symbol in dict.fromkeys(STOCK_CODES):
+            window = self.latest_cached_window(symbol, history_days)
+            if window is not None and stale_before is not None and window[1] < stale_before:
+                logger.info("%s 缓存最后一根K线 %s 超过 %s 天，重新获取", symbol, window[1], max_cache_age_days)
+                misses.append(symbol)
+                continue
+            df = self._GET_STOCK_DATA_IF_CACHED(symbol, *window) if window is not None else None
+            if df is None or df.empty:
+                misses.append(symbol)
+            else:
+                frames[symbol] = df
+        if misses:
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=history_days)
+            fetched, _ = self.GET_STOCK_DATA_BATCH(
+                misses, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"), max_workers=max_workers
+            )
+            for symbol, df in fetched.items():
+                if df is None or df.empty:
+                    continue
+                if stale_before is not None:
+                    last_date = pd.Timestamp((df["date"] if "date" in df.columns else df.index).max()).strftime("%Y-%m-%d")
+                    if last_date < stale_before:
+                        logger.warning("%s 刷新后最后一根K线仍为 %s, 超过 %s 天, 不使用", symbol, last_date, max_cache_age_days)
+                        continue
+                frames[symbol] = df
+        return frames
     
     
     def GET_STOCK_DATA_FROM_CACHE_V0(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
@@ -252,57 +582,235 @@ class DataFactory:
         cache_file_path = self._cache_file_path(STOCK_CODE, START_DATE, END_DATE)
         cache_file_path = "data_cache/AAPL_1999-11-01_2025-08-28.csv"
         if not os.path.exists(cache_file_path):
-            logger.error(f"缓存文件不存在: {cache_file_path}")
+            logger.error("缓存文件不存在: %s", cache_file_path)
             return pd.DataFrame()
         try:
             df = pd.read_csv(cache_file_path)
             if df.empty:
-                logger.warning(f"缓存文件为空: {cache_file_path}")
+                logger.warning("缓存文件为空: %s", cache_file_path)
                 return pd.DataFrame()
-            logger.info(f"成功从缓存文件读取数据: {cache_file_path}, 共 {len(df)} 行")
+            logger.info("成功从缓存文件读取数据: %s, 共 %s 行", cache_file_path, len(df))
             return df
         except Exception as e:
-            logger.error(f"读取缓存文件时出错: {e}")
+            logger.error("读取缓存文件时出错: %s", e)
             return pd.DataFrame()
         
-    def GET_STOCK_DATA_FROM_CACHE(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
+    def GET_STOCK_DATA_FROM_CACHE(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, columns: list = None) -> pd.DataFrame:
+        """从缓存获取指定股票的历史数据
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            START_DATE (str): 起始日期 (格式: YYYY-MM-DD)
+            END_DATE (str): 结束日期 (格式: YYYY-MM-DD)
+            columns (list, optional): 只读取这些列 (不含 date), None 表示全部列
+
+        Returns:
+            pd.DataFrame: 以 date 为 DatetimeIndex 的数据
+        """
         log_info = f"从缓存获取 {STOCK_CODE} 在 {START_DATE} 到 {END_DATE} 之间的数据"
         logger.info(log_info)
 
-        cache_file_path = self._cache_file_path(STOCK_CODE, START_DATE, END_DATE)
-        cache_file_path = "data_cache/AAPL_1999-11-01_2025-08-28.csv"
-
-        if not os.path.exists(cache_file_path):
-            logger.error(f"缓存文件不存在: {cache_file_path}")
+        cache_file_name = self.cache_index.find(STOCK_CODE, START_DATE, END_DATE)
+        if cache_file_name is None:
+            logger.error("没有覆盖 %s 到 %s 的 %s 缓存文件", START_DATE, END_DATE, STOCK_CODE)
             return pd.DataFrame()
+        cache_file_path = os.path.join(self.cache_dir, cache_file_name)
+
+        frame_key = (STOCK_CODE, cache_file_name, None if columns is None else tuple(columns))
+        df = self.frame_cache.get(frame_key)
+        if df is not None:
+            logger.info("内存缓存命中: %s, 共 %s 行", cache_file_name, len(df))
+            metrics.inc("frame_cache_hit")
+            return df
 
         try:
-            # ✅ 读取时直接解析日期并设为索引
-            df = pd.read_csv(cache_file_path, parse_dates=["date"], index_col="date")
+            # ✅ 由缓存后端读取, 直接返回以 date 为 DatetimeIndex 的数据 (磁盘读取 + 解析)
+            with metrics.span("data_factory.cache_read", format=self.cache_backend.name):
+                df = self.cache_backend.read(cache_file_path, columns=columns)
 
             if df.empty:
-                logger.warning(f"缓存文件为空: {cache_file_path}")
+                logger.warning("缓存文件为空: %s", cache_file_path)
                 return pd.DataFrame()
 
-            # 确认索引是 DatetimeIndex
-            if not isinstance(df.index, pd.DatetimeIndex):
-                df.index = pd.to_datetime(df.index)
-
-            logger.info(f"成功从缓存文件读取数据: {cache_file_path}, 共 {len(df)} 行")
-            return df
+            logger.info("成功从缓存文件读取数据: %s, 共 %s 行", cache_file_path, len(df))
+            if self.ohlcv_store is not None and columns is None:
+                # 用已有的文件缓存回填 memmap 存储, 之后的请求直接走 memmap
+                self.ohlcv_store.append(STOCK_CODE, df)
+            self.frame_cache.put(frame_key, df)
+            return df.copy(deep=False)
 
         except Exception as e:
-            logger.error(f"读取缓存文件时出错: {e}")
+            logger.error("读取缓存文件时出错: %s", e)
             return pd.DataFrame()
 
     
-    def GET_STOCK_DATA_FROM_alpha_vantage(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
+    def GET_STOCK_DATA_FROM_MEMMAP(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, columns: list = None, last_n: int = None) -> pd.DataFrame:
+        """从 memmap 存储读取日期窗口 (二分查找定位, 返回只读视图, 不复制)
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            START_DATE (str): 起始日期 (格式: YYYY-MM-DD)
+            END_DATE (str): 结束日期 (格式: YYYY-MM-DD)
+            columns (list, optional): 只返回这些列 (不含 date), None 表示全部列
+            last_n (int, optional): 只取窗口内最后 N 个交易日
+
+        Returns:
+            pd.DataFrame: 以 date 为 DatetimeIndex 的只读数据, 需要修改时请先 .copy()
+        """
+        if self.ohlcv_store is None:
+            logger.error("未启用 memmap 存储引擎 (data_cache.storage_engine)")
+            return pd.DataFrame()
+        try:
+            df = self.ohlcv_store.read_window(STOCK_CODE, START_DATE, END_DATE, columns=columns, last_n=last_n)
+        except ValueError as e:
+            logger.error("从 memmap 存储读取 %s 时出错: %s", STOCK_CODE, e)
+            return pd.DataFrame()
+        logger.info("从 memmap 存储读取 %s %s 到 %s, 共 %s 行", STOCK_CODE, START_DATE, END_DATE, len(df))
+        return df
+
+    def _get_alpha_vantage_fetcher(self, api_key: str):
+        """获取 (或创建) 指定 API Key 的数据驱动, 同一个 Key 只创建一次, 所有驱动共享连接池会话
+
+        Args:
+            api_key (str): Alpha Vantage API Key
+
+        Returns:
+            AlphaVantageFetcher: 数据驱动
+        """
+        with self._fetchers_lock:
+            fetcher = self._alpha_vantage_fetchers.get(api_key)
+            if fetcher is None:
+                http_config = self.alpha_vantage_http_config
+                fetcher = create_driver(
+                    "alpha_vantage",
+                    api_key=api_key,
+                    cache_dir=self.cache_dir,
+                    cache_backend=self.cache_backend,
+                    on_saved=self._on_cache_saved,
+                    session=get_shared_session(
+                        "Alpha Vantage",
+                        retry_attempts=http_config["retry_attempts"],
+                        backoff_factor=http_config["backoff_factor"],
+                        pool_maxsize=http_config["pool_maxsize"],
+                    ),
+                    base_url=http_config["base_url"],
+                    timeout=http_config["timeout"],
+                )
+                self._alpha_vantage_fetchers[api_key] = fetcher
+            return fetcher
+
+    def _can_refresh_incrementally(self, STOCK_CODE: str, START_DATE: str = None) -> bool:
+        """判断是否可以增量刷新: 需要已有缓存, 且请求的起始日期不早于缓存起点
+
+        Args:
+            STOCK_CODE (str): 股票代码
+            START_DATE (str, optional): 请求的起始日期
+        """
+        latest = self.cache_index.latest(STOCK_CODE)
+        if latest is None:
+            logger.info("%s 没有可用缓存，无法增量刷新", STOCK_CODE)
+            return False
+        if START_DATE and START_DATE < latest[0]:
+            logger.info("%s 请求起始日期 %s 早于缓存起点 %s，需要全量下载", STOCK_CODE, START_DATE, latest[0])
+            return False
+        return True
+
+    def _read_latest_cache(self, STOCK_CODE: str) -> tuple:
+        """读取增量刷新的基础数据 (最新的缓存文件), 不消耗 API 额度
+
+        Returns:
+            tuple: (cache_index.latest 条目, date 为普通列的缓存数据); 没有缓存或无法读取时返回 None
+        """
+        latest = self.cache_index.latest(STOCK_CODE)
+        if latest is None:
+            return None
+        old_file_path = os.path.join(self.cache_dir, latest[2])
+        try:
+            cached = self.cache_backend.read(old_file_path).reset_index()
+        except Exception as e:
+            logger.error("读取缓存文件 %s 时出错: %s", old_file_path, e)
+            return None
+        if cached.empty:
+            return None
+        return latest, cached
+
+    def _incremental_refresh(self, alpha_vantage_fetcher, STOCK_CODE: str, base: tuple) -> pd.DataFrame:
+        """增量刷新: 只请求最近约 100 个交易日 (compact), 与最新的缓存合并去重后重写缓存
+
+        Args:
+            alpha_vantage_fetcher (AlphaVantageFetcher): 数据驱动
+            STOCK_CODE (str): 股票代码
+            base (tuple): _read_latest_cache 的返回值
+
+        Returns:
+            pd.DataFrame: 合并后的完整数据; compact 请求失败 (数据驱动出错时返回空表) 时返回原缓存数据;
+                compact 数据与缓存无法衔接时返回 None, 由调用方回退到全量下载
+        """
+        (_, old_end_date, old_file_name), cached = base
+        old_file_path = os.path.join(self.cache_dir, old_file_name)
+
+        tail = alpha_vantage_fetcher.GET_COMPACT_STOCK_DATA(STOCK_CODE)
+        if tail is None or tail.empty:
+            logger.warning("%s 的 compact 数据为空，刷新失败，返回原缓存 (截至 %s)", STOCK_CODE, old_end_date)
+            return cached
+
+        last_cached_date = cached["date"].max()
+        if tail["date"].min() > last_cached_date:
+            # compact 数据与缓存没有重叠, 中间可能缺少交易日
+            logger.warning("%s 缓存最后日期 %s 早于 compact 数据起点，回退到全量下载", STOCK_CODE, last_cached_date.date())
+            return None
+
+        new_rows = int((tail["date"] > last_cached_date).sum())
+        if new_rows == 0:
+            logger.info("%s 缓存已是最新 (%s)，无需重写", STOCK_CODE, old_end_date)
+            return cached
+
+        # 新数据覆盖重叠日期上的旧值
+        merged = pd.concat([cached, tail[cached.columns.intersection(tail.columns)]], ignore_index=True)
+        merged = merged.drop_duplicates(subset="date", keep="last").sort_values("date").reset_index(drop=True)
+        logger.info("%s 增量刷新: 新增 %s 行，共 %s 行", STOCK_CODE, new_rows, len(merged))
+
+        save_status = alpha_vantage_fetcher.save(STOCK_CODE, merged)
+        if not save_status:
+            logger.warning("%s 增量数据保存失败，保留原缓存 %s", STOCK_CODE, old_file_name)
+            return merged
+        new_file_name = alpha_vantage_fetcher.gen_cache_file_name(
+            STOCK_CODE, alpha_vantage_fetcher.get_date_info_from_df(merged), self.cache_backend.extension
+        )
+        if new_file_name != old_file_name:
+            # 新文件已登记到索引, 删除被替代的旧文件
+            self.cache_index.remove(old_file_name)
+            try:
+                os.remove(old_file_path)
+            except OSError as e:
+                logger.warning("删除旧缓存文件 %s 失败: %s", old_file_path, e)
+        return merged
+
+    def REFRESH_STOCK_DATA(self, STOCK_CODE: str) -> pd.DataFrame:
+        """增量刷新指定股票的缓存到最新交易日
+
+        Args:
+            STOCK_CODE (str): 股票代码
+
+        Returns:
+            pd.DataFrame: 刷新后的完整数据, 失败时返回 None
+        """
+        latest = self.cache_index.latest(STOCK_CODE)
+        start_date = latest[0] if latest else None
+        end_date = datetime.now().strftime("%Y-%m-%d")
+        if self.data_driver != "alpha_vantage":
+            logger.error("数据驱动 %s 不支持增量刷新", self.data_driver)
+            return None
+        return self.GET_STOCK_DATA_FROM_alpha_vantage(STOCK_CODE, start_date, end_date, incremental=True)
+
+    def GET_STOCK_DATA_FROM_alpha_vantage(self, STOCK_CODE: str, START_DATE: str, END_DATE: str, incremental: bool = None) -> pd.DataFrame:
         """获取指定股票在指定日期范围内的历史数据 by Alpha Vantage
 
         Args:
             STOCK_CODE (str): 股票代码
             START_DATE (str): 起始日期 (格式: YYYY-MM-DD)
             END_DATE (str): 结束日期 (格式: YYYY-MM-DD)
+            incremental (bool, optional): 是否增量刷新已有缓存, None 表示读取 data_cache.refresh_mode
 
         Returns:
             pd.DataFrame: 包含日期、开盘价、最高价、最低价、收盘价和成交量的 DataFrame。
@@ -310,25 +818,47 @@ class DataFactory:
         
         log_info = f"从 Alpha Vantage 获取 {STOCK_CODE} 在 {START_DATE} 到 {END_DATE} 之间的数据"
         logger.info(log_info)
+        if incremental is None:
+            incremental = self.cache_config.get("refresh_mode", "full") == "incremental"
+        incremental = incremental and self._can_refresh_incrementally(STOCK_CODE, START_DATE)
+        # 先读取增量刷新的基础缓存, 缓存无法读取时直接全量下载, 不为 compact 请求额外占用额度
+        base = self._read_latest_cache(STOCK_CODE) if incremental else None
+        incremental = base is not None
         
-        for api_key in self.alpha_vantage_api_keys:
-            if not api_key:
-                continue
-            logger.info(f"使用 Alpha Vantage API Key: {api_key[-6:]} 获取数据")
+        # 只有额度用尽时才换 Key 重试, 每个 Key 最多一次, 增量刷新回退到全量下载时多一次
+        for _ in range(len(self.api_key_scheduler) + 1):
+            # 由调度器分配余量最多的 Key, 所有 Key 暂时没有余量时排队等待
+            api_key = self.api_key_scheduler.acquire(timeout=self.api_key_wait_seconds)
+            if api_key is None:
+                logger.error("没有可用的 Alpha Vantage API Key 额度，无法获取 %s 的数据", STOCK_CODE)
+                return None
+            logger.info("使用 Alpha Vantage API Key: %s 获取数据", api_key[-6:])
             try:
-                alpha_vantage_fetcher = AlphaVantageFetcher(api_key=api_key)
+                alpha_vantage_fetcher = self._get_alpha_vantage_fetcher(api_key)
+                if incremental:
+                    stock_data = self._incremental_refresh(alpha_vantage_fetcher, STOCK_CODE, base)
+                    if stock_data is not None:
+                        return stock_data
+                    # 只有 compact 数据与缓存无法衔接时才会到这里, compact 请求已消耗一次额度, 重新排队获取 Key 做全量下载
+                    incremental = False
+                    continue
                 stock_data = alpha_vantage_fetcher.GET_FULL_STOCK_DATA(STOCK_CODE)
                 need_save = True
                 if need_save:
                     save_status = alpha_vantage_fetcher.save(STOCK_CODE, stock_data)
                     if save_status:
-                        logger.info(f"数据保存成功")
+                        logger.info("数据保存成功")
                     else:
-                        logger.warning(f"数据保存失败")
+                        logger.warning("数据保存失败")
                 return stock_data
-            except Exception as e:
-                logger.error(f"使用 API Key {api_key[-6:]} 获取数据时出错: {e}")
+            except AlphaVantageRateLimitError as e:
+                logger.warning("API Key %s 额度已用尽，切换其它 Key: %s", api_key[-6:], e)
+                self.api_key_scheduler.report_exhausted(api_key)
                 continue
+            except Exception as e:
+                # 网络或数据错误换 Key 也不会好转, 不再占用其它 Key 的额度; 有缓存时返回原缓存
+                logger.error("使用 API Key %s 获取 %s 的数据时出错: %s", api_key[-6:], STOCK_CODE, e)
+                return base[1] if base is not None else None
         return None
     
     def GET_STOCK_DATA_FROM_yahoo_finance(self, STOCK_CODE: str, START_DATE: str, END_DATE: str) -> pd.DataFrame:
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据驱动注册表: 驱动名 (与配置 data_source.data_drivers 一致) -> 驱动类所在模块
+
+驱动模块在第一次使用时才导入, 例如 data_driver 为 alpha_vantage 时不会导入 yfinance。
+"""
+
+import importlib
+import threading
+
+
+# 驱动名 -> (模块路径, 类名)
+DRIVER_REGISTRY = {
+    "alpha_vantage": ("data_fetchers.alpha_vantage_fetcher", "AlphaVantageFetcher"),
+    "alpha_vantage_async": ("data_fetchers.async_alpha_vantage_fetcher", "AsyncAlphaVantageFetcher"),
+    "yahoo_finance": ("data_fetchers.yahoo_fetcher", "YahooFetcher"),
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def register_driver(name: str, module_path: str, class_name: str):
+    """注册 (或覆盖) 一个数据驱动"""
+    with _lock:
+        DRIVER_REGISTRY[name] = (module_path, class_name)
+        _loaded.pop(name, None)
+
+
+def get_driver_class(name: str) -> type:
+    """获取驱动类, 第一次调用时导入对应模块
+
+    Raises:
+        KeyError: 驱动未注册
+    """
+    with _lock:
+        driver_class = _loaded.get(name)
+        if driver_class is None:
+            if name not in DRIVER_REGISTRY:
+                raise KeyError(f"未注册的数据驱动: {name}, 可选: {list(DRIVER_REGISTRY)}")
+            module_path, class_name = DRIVER_REGISTRY[name]
+            driver_class = getattr(importlib.import_module(module_path), class_name)
+            _loaded[name] = driver_class
+        return driver_class
+
+
+def create_driver(name: str, **kwargs):
+    """按驱动名创建驱动实例"""
+    return get_driver_class(name)(**kwargs)
+
+
+def registered_drivers(data_drivers: list = None) -> list:
+    """已注册的驱动名; 指定 data_drivers 时只返回其中已注册的"""
+    if data_drivers is None:
+        return list(DRIVER_REGISTRY)
+    return [name for name in data_drivers if name in DRIVER_REGISTRY]
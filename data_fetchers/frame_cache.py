@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+from utils.logger_manager import get_logger
+
+
+logger = get_logger()
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """DataFrame 占用的内存字节数 (包含索引)"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class FrameLRUCache:
+    """按总字节数限制的进程内 DataFrame LRU 缓存
+
+    键的第一个元素约定为股票代码, 便于在数据驱动保存新数据时按股票失效。
+    命中时返回浅拷贝, 调用方替换索引或列不会影响缓存, 但不要原地修改数值。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = OrderedDict()  # key -> (df, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: tuple) -> pd.DataFrame:
+        """查找缓存, 命中时移动到最近使用的位置
+
+        Returns:
+            pd.DataFrame: 缓存的 DataFrame 浅拷贝, 未命中返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy(deep=False)
+
+    def put(self, key: tuple, df: pd.DataFrame) -> bool:
+        """放入缓存, 超出字节上限时淘汰最久未使用的条目
+
+        Returns:
+            bool: 是否放入 (单个 DataFrame 超过上限时不缓存)
+        """
+        if not self.enabled or df is None:
+            return False
+        nbytes = frame_nbytes(df)
+        if nbytes > self.max_bytes:
+            logger.info("DataFrame 大小 %s 字节超过内存缓存上限 %s, 不缓存", nbytes, self.max_bytes)
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (df, nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+                self.evictions += 1
+        return True
+
+    def invalidate(self, ticker: str) -> int:
+        """失效指定股票的全部缓存条目
+
+        Returns:
+            int: 失效的条目数
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == ticker]
+            for key in keys:
+                self._total_bytes -= self._entries.pop(key)[1]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """命中/未命中/淘汰计数和当前占用"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
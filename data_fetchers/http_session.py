@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.logger_manager import get_logger
+
+
+logger = get_logger()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# 需要重试的 HTTP 状态码 (限流和服务端错误)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def get_driver_http_config(config: dict, driver_name: str) -> dict:
+    """读取 data_driven_configeration 中指定数据驱动的 HTTP 配置
+
+    Args:
+        config (dict): 完整配置字典
+        driver_name (str): 数据驱动名称, 例如 "Alpha Vantage"
+
+    Returns:
+        dict: {"base_url", "timeout", "retry_attempts", "backoff_factor", "pool_maxsize"}
+    """
+    driver_config = config.get("data_driven_configeration", {}).get(driver_name, {})
+    return {
+        "base_url": driver_config.get("base_url"),
+        "timeout": driver_config.get("timeout", 30),
+        "retry_attempts": driver_config.get("retry_attempts", 3),
+        "backoff_factor": driver_config.get("backoff_factor", 0.5),
+        "pool_maxsize": driver_config.get("pool_maxsize", 10),
+    }
+
+
+def get_shared_session(name: str, retry_attempts: int = 3, backoff_factor: float = 0.5, pool_maxsize: int = 10) -> requests.Session:
+    """获取按名称共享的 requests.Session (连接池 + keep-alive + 重试退避)
+
+    同一个名称在进程内只创建一次, 所有数据驱动实例复用同一个连接池,
+    避免每次请求都重新建立 TCP 和 TLS 连接。
+
+    Args:
+        name (str): 会话名称, 一般为数据驱动名称
+        retry_attempts (int, optional): 连接错误和 429/5xx 的最大重试次数. Defaults to 3.
+        backoff_factor (float, optional): 指数退避系数 (秒). Defaults to 0.5.
+        pool_maxsize (int, optional): 每个主机的最大连接数. Defaults to 10.
+
+    Returns:
+        requests.Session: 共享会话
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is not None:
+            return session
+
+        retry = Retry(
+            total=retry_attempts,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _sessions[name] = session
+        logger.info("创建共享 HTTP 会话 [%s]: 重试 %s 次, 连接池 %s", name, retry_attempts, pool_maxsize)
+        return session
+
+
+def close_shared_sessions():
+    """关闭所有共享会话 (应用退出时调用)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from utils.logger_manager import get_logger
+
+
+logger = get_logger()
+
+# 每只股票一个目录, 每列一个定长二进制文件 (小端 8 字节)
+DATE_COLUMN = "date"
+VALUE_COLUMNS = ["open", "high", "low", "close", "volume"]
+_DTYPES = {DATE_COLUMN: np.dtype("<i8")}
+_DTYPES.update({col: np.dtype("<f8") for col in VALUE_COLUMNS})
+
+
+class MemmapOHLCVStore:
+    """基于 numpy.memmap 的只追加 OHLCV 存储
+
+    目录结构: <root_dir>/<TICKER>/date.bin, open.bin, ... volume.bin
+    date 列保存 int64 纳秒时间戳并保持升序, 读取日期窗口时在 date 列上二分查找,
+    返回的数组都是 memmap 的只读视图, 不需要解析, 也不复制数据。
+    """
+
+    def __init__(self, root_dir: str = "data_cache/ohlcv"):
+        self.root_dir = root_dir
+        self._lock = threading.RLock()
+        # ticker -> (行数, {列名: memmap})
+        self._maps = {}
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _column_path(self, ticker: str, column: str) -> str:
+        return os.path.join(self.root_dir, ticker, f"{column}.bin")
+
+    def commit_path(self, ticker: str) -> str:
+        """date 列文件路径; 每次追加最后写入该文件, 其修改时间即数据版本"""
+        return self._column_path(ticker, DATE_COLUMN)
+
+    def tickers(self) -> list:
+        """获取存储中的全部股票代码"""
+        return sorted(d for d in os.listdir(self.root_dir) if os.path.isdir(os.path.join(self.root_dir, d)))
+
+    def length(self, ticker: str) -> int:
+        """获取指定股票已提交的行数
+
+        追加时先写数值列, 最后写 date 列, 因此取所有列行数的最小值即可忽略写了一半的行。
+        """
+        lengths = []
+        for column, dtype in _DTYPES.items():
+            path = self._column_path(ticker, column)
+            if not os.path.exists(path):
+                return 0
+            lengths.append(os.path.getsize(path) // dtype.itemsize)
+        return min(lengths)
+
+    def _open(self, ticker: str) -> tuple:
+        """打开 (或复用) 指定股票的 memmap, 文件增长后重新映射"""
+        n_rows = self.length(ticker)
+        with self._lock:
+            cached = self._maps.get(ticker)
+            if cached is not None and cached[0] == n_rows:
+                return cached
+            if n_rows == 0:
+                maps = {column: np.empty(0, dtype=dtype) for column, dtype in _DTYPES.items()}
+            else:
+                maps = {
+                    column: np.memmap(self._column_path(ticker, column), dtype=dtype, mode="r", shape=(n_rows,))
+                    for column, dtype in _DTYPES.items()
+                }
+            self._maps[ticker] = (n_rows, maps)
+            return self._maps[ticker]
+
+    def date_range(self, ticker: str) -> tuple:
+        """获取指定股票存储的日期范围
+
+        Returns:
+            tuple: (start_date, end_date) 格式为 (YYYY-MM-DD, YYYY-MM-DD), 没有数据时返回 None
+        """
+        n_rows, maps = self._open(ticker)
+        if n_rows == 0:
+            return None
+        dates = maps[DATE_COLUMN]
+        start = np.datetime64(int(dates[0]), "ns").astype("datetime64[D]")
+        end = np.datetime64(int(dates[-1]), "ns").astype("datetime64[D]")
+        return str(start), str(end)
+
+    def covers(self, ticker: str, start_date: str, end_date: str) -> bool:
+        """判断存储是否覆盖 [start_date, end_date]"""
+        date_range = self.date_range(ticker)
+        return date_range is not None and date_range[0] <= start_date and date_range[1] >= end_date
+
+    def append(self, ticker: str, df: pd.DataFrame) -> int:
+        """追加数据, 只写入晚于已有最后日期的行
+
+        新数据必须与已有数据重叠 (包含不晚于已存储最后日期的行), 由数据源本身保证两段之间没有缺少的交易日;
+        不重叠时无法判断中间是否缺少交易日 (工作日历不含交易所假日), 而 covers() 只比较首尾日期, 无法发现缺口,
+        因此拒绝追加并返回 0。数据驱动保存的是合并后的完整数据, 总会与已存储的数据重叠。
+
+        Args:
+            ticker (str): 股票代码
+            df (pd.DataFrame): date 列或 DatetimeIndex 的 OHLCV 数据
+
+        Returns:
+            int: 实际追加的行数
+        """
+        if df is None or df.empty:
+            return 0
+        if DATE_COLUMN in df.columns:
+            dates = pd.to_datetime(df[DATE_COLUMN]).values
+        else:
+            dates = pd.to_datetime(df.index).values
+        dates = dates.astype("datetime64[ns]").view("i8")
+        order = np.argsort(dates, kind="stable")
+        dates = dates[order]
+
+        with self._lock:
+            n_rows, maps = self._open(ticker)
+            if n_rows:
+                last_date = maps[DATE_COLUMN][-1]
+                if dates[0] > last_date:
+                    logger.warning(
+                        "[MemmapStore] %s 新数据起始日期 %s 晚于已存储的最后日期 %s, 无法确认中间没有缺口, 拒绝追加",
+                        ticker, self._day(dates[0]), self._day(last_date),
+                    )
+                    return 0
+                keep = dates > last_date
+            else:
+                keep = np.ones(len(dates), dtype=bool)
+            # 同一批数据中的重复日期只保留最后一条
+            keep[:-1] &= dates[:-1] != dates[1:]
+            if not keep.any():
+                return 0
+
+            os.makedirs(os.path.join(self.root_dir, ticker), exist_ok=True)
+            # 丢弃上次中断留下的半行, 保证各列长度一致
+            for column, dtype in _DTYPES.items():
+                path = self._column_path(ticker, column)
+                if os.path.exists(path) and os.path.getsize(path) != n_rows * dtype.itemsize:
+                    with open(path, "r+b") as f:
+                        f.truncate(n_rows * dtype.itemsize)
+            for column in VALUE_COLUMNS:
+                values = df[column].to_numpy(dtype=np.float64)[order][keep] if column in df.columns \
+                    else np.full(int(keep.sum()), np.nan)
+                with open(self._column_path(ticker, column), "ab") as f:
+                    values.astype(_DTYPES[column]).tofile(f)
+            # date 列最后写入, 作为提交标记
+            with open(self._column_path(ticker, DATE_COLUMN), "ab") as f:
+                dates[keep].astype(_DTYPES[DATE_COLUMN]).tofile(f)
+
+            appended = int(keep.sum())
+            logger.info("[MemmapStore] %s 追加 %s 行, 共 %s 行", ticker, appended, n_rows + appended)
+            return appended
+
+    @staticmethod
+    def _day(value: int) -> np.datetime64:
+        return np.datetime64(int(value), "ns").astype("datetime64[D]")
+
+    def _window_bounds(self, dates: np.ndarray, start_date: str = None, end_date: str = None) -> tuple:
+        """在升序的 date 列上二分查找窗口 [start_date, end_date] 的下标范围"""
+        lo = 0 if start_date is None else int(np.searchsorted(dates, pd.Timestamp(start_date).value, side="left"))
+        hi = len(dates) if end_date is None else int(np.searchsorted(dates, pd.Timestamp(end_date).value, side="right"))
+        return lo, max(lo, hi)
+
+    def read_columns(self, ticker: str, start_date: str = None, end_date: str = None, columns: list = None, last_n: int = None) -> tuple:
+        """读取日期窗口内的列视图
+
+        Args:
+            ticker (str): 股票代码
+            start_date (str, optional): 起始日期 (YYYY-MM-DD)
+            end_date (str, optional): 结束日期 (YYYY-MM-DD), 包含当天
+            columns (list, optional): 需要的列, None 表示全部
+            last_n (int, optional): 只取窗口内最后 N 行
+
+        Returns:
+            tuple: (dates, {列名: 数组}), 均为 memmap 只读视图; dates 为 datetime64[ns]
+
+        Raises:
+            ValueError: columns 中有存储不支持的列
+        """
+        n_rows, maps = self._open(ticker)
+        lo, hi = self._window_bounds(maps[DATE_COLUMN], start_date, end_date)
+        if last_n is not None:
+            lo = max(lo, hi - last_n)
+        names = VALUE_COLUMNS if columns is None else [c for c in columns if c != DATE_COLUMN]
+        unknown = [name for name in names if name not in maps]
+        if unknown:
+            raise ValueError(f"memmap 存储不支持的列: {unknown}, 可选: {VALUE_COLUMNS}")
+        dates = maps[DATE_COLUMN][lo:hi].view("datetime64[ns]")
+        return dates, {name: maps[name][lo:hi] for name in names}
+
+    def read_window(self, ticker: str, start_date: str = None, end_date: str = None, columns: list = None, last_n: int = None) -> pd.DataFrame:
+        """读取日期窗口, 返回以 date 为 DatetimeIndex 的 DataFrame
+
+        每列单独成块 (copy=False), 因此 DataFrame 直接引用 memmap 视图, 不复制数据。
+        返回的数据是只读的, 需要修改时请先 .copy()。
+        """
+        dates, data = self.read_columns(ticker, start_date, end_date, columns=columns, last_n=last_n)
+        index = pd.DatetimeIndex(dates, name=DATE_COLUMN, copy=False)
+        return pd.DataFrame(data, index=index, copy=False)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+一次性迁移工具: 将 data_cache 下已有的 CSV 缓存转换为配置的缓存格式
+
+用法:
+    python -m data_fetchers.migrate_cache --config config/config.json --format npz [--delete-source] [--dry-run]
+"""
+
+import os
+import argparse
+
+from utils.file_reader import FileReader
+from utils.logger_manager import init_logger_from_dict, get_logger
+
+
+def migrate_cache(cache_dir: str, target_format: str, delete_source: bool = False, dry_run: bool = False) -> dict:
+    """将缓存目录中的 CSV 文件转换为目标格式
+
+    Args:
+        cache_dir (str): 缓存目录
+        target_format (str): 目标缓存格式 (parquet / feather / npz)
+        delete_source (bool, optional): 转换并校验成功后删除原 CSV. Defaults to False.
+        dry_run (bool, optional): 只打印计划, 不写文件. Defaults to False.
+
+    Returns:
+        dict: 统计信息 {"converted": int, "skipped": int, "failed": int}
+    """
+    from data_fetchers.cache_backends import CsvCacheBackend, get_cache_backend
+
+    logger = get_logger()
+    stats = {"converted": 0, "skipped": 0, "failed": 0}
+
+    source_backend = CsvCacheBackend()
+    target_backend = get_cache_backend({"format": target_format})
+    if target_backend.name == source_backend.name:
+        logger.error("目标格式 %s 不可用或与源格式相同, 不做迁移", target_format)
+        return stats
+
+    if not os.path.isdir(cache_dir):
+        logger.warning("缓存目录 %s 不存在", cache_dir)
+        return stats
+
+    csv_files = sorted(f for f in os.listdir(cache_dir) if f.endswith(".csv"))
+    logger.info("找到 %s 个 CSV 缓存文件, 目标格式: %s", len(csv_files), target_backend.name)
+
+    for file_name in csv_files:
+        source_path = os.path.join(cache_dir, file_name)
+        target_path = os.path.join(cache_dir, os.path.splitext(file_name)[0] + "." + target_backend.extension)
+        if os.path.exists(target_path):
+            logger.info("目标文件已存在, 跳过: %s", target_path)
+            stats["skipped"] += 1
+            continue
+        if dry_run:
+            logger.info("[dry-run] %s -> %s", source_path, target_path)
+            stats["skipped"] += 1
+            continue
+        try:
+            df = source_backend.read(source_path)
+            target_backend.write(df, target_path)
+            # 校验行数和日期范围一致
+            check_df = target_backend.read(target_path)
+            if len(check_df) != len(df) or (len(df) and check_df.index[-1] != df.index[-1]):
+                raise ValueError(f"校验失败: {len(df)} 行 -> {len(check_df)} 行")
+            stats["converted"] += 1
+            logger.info("已转换: %s -> %s (%s 行)", source_path, target_path, len(df))
+            if delete_source:
+                os.remove(source_path)
+        except Exception as e:
+            stats["failed"] += 1
+            logger.error("转换 %s 失败: %s", source_path, e)
+            if os.path.exists(target_path):
+                os.remove(target_path)
+
+    logger.info("迁移完成: %s", stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将 CSV 缓存迁移为列式缓存格式")
+    parser.add_argument("--config", default="config/config.json", help="配置文件路径")
+    parser.add_argument("--format", default=None, help="目标格式, 默认读取 data_source.data_cache.format")
+    parser.add_argument("--cache-dir", default=None, help="缓存目录, 默认读取 data_source.data_cache.cache_dir")
+    parser.add_argument("--delete-source", action="store_true", help="转换成功后删除 CSV 文件")
+    parser.add_argument("--dry-run", action="store_true", help="只打印计划, 不写文件")
+    args = parser.parse_args()
+
+    config = FileReader.load_config(path=args.config)
+    init_logger_from_dict(config_dict=config)
+
+    cache_config = config.get("data_source", {}).get("data_cache", {})
+    target_format = args.format or cache_config.get("format", "csv")
+    cache_dir = args.cache_dir or cache_config.get("cache_dir", "data_cache")
+    migrate_cache(cache_dir, target_format, delete_source=args.delete_source, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,7 @@ class YahooFetcher(BaseFetcher):
             如果没有数据，则返回空 DataFrame。
         """
         
-        self.logger.info(f"[YahooFinance] Fetching {years} years of data for {ticker}...")
+        self.logger.info("[YahooFinance] Fetching %s years of data for %s...", years, ticker)
 
         # end = datetime.today()
         # start = end - timedelta(days=years * 365)
@@ -35,13 +35,13 @@ class YahooFetcher(BaseFetcher):
         end = get_target_end_date()
         start = get_target_start_date(years)
         
-        self.logger.info(f"[YahooFinance] Start date: {start}, End date: {end}")
+        self.logger.info("[YahooFinance] Start date: %s, End date: %s", start, end)
         
         stock = yf.Ticker(ticker)
         hist = stock.history(start=start, end=end)
 
         if hist.empty:
-            self.logger.warning(f"[YahooFinance] No data found for {ticker}.")
+            self.logger.warning("[YahooFinance] No data found for %s.", ticker)
             return pd.DataFrame()
 
         hist.reset_index(inplace=True)
@@ -55,5 +55,5 @@ class YahooFetcher(BaseFetcher):
         })
         hist = hist[["date", "open", "high", "low", "close", "volume"]]
 
-        self.logger.info(f"[YahooFinance] Got {len(hist)} rows for {ticker}.")
+        self.logger.info("[YahooFinance] Got %s rows for %s.", len(hist), ticker)
         return hist
@@ -1,18 +1,245 @@
-from fastapi import FastAPI
-# from superrich.data.fetcher import get_stock_price_history
-# from superrich.predict.predictor import predict_future
+import os
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from utils.file_reader import FileReader
+from utils.logger_manager import init_logger_from_dict, get_logger, shutdown_logger
+from utils import metrics
+from superrich.data.encoders import arrow_available, iter_ndjson, to_arrow_ipc, to_columnar_json
+from superrich.data.fetcher import get_stock_price_history
+from superrich.predict.predictor import Predictor
+from superrich.scheduler import PrecomputeScheduler, PrecomputeStore, run_daily
+
+CONFIG_PATH = os.environ.get("SUPERRICH_CONFIG", "config/config.json")
+
+# 支持的历史数据响应格式
+HISTORY_MEDIA_TYPES = {
+    "columnar": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+# columns 参数可选的列 (与缓存文件中的列一致, date 总是返回)
+HISTORY_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+
+
+def _warm_up(data_factory, api_config: dict):
+    """预热: 构建缓存索引, 并把 warmup_symbols 的缓存数据读入内存缓存"""
+    logger = get_logger()
+    data_factory.cache_index.build()
+    symbols = api_config.get("warmup_symbols", [])
+    warmed = 0
+    for symbol in symbols:
+        latest = data_factory.cache_index.latest(symbol)
+        if latest is None:
+            logger.warning("预热跳过 %s: 没有缓存", symbol)
+            continue
+        data_factory.GET_STOCK_DATA_FROM_CACHE(symbol, latest[0], latest[1])
+        warmed += 1
+    logger.info("预热完成: %s/%s 只股票", warmed, len(symbols))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期: 加载一次配置和日志, 创建长期存活的 DataFactory 与有界线程池/进程池"""
+    config = FileReader.load_config(path=CONFIG_PATH)
+    init_logger_from_dict(config_dict=config)
+    logger = get_logger()
+    # data_fetchers 模块导入时需要已初始化的 logger
+    from data_fetchers.data_factory import DataFactory
+    from data_fetchers.http_session import close_shared_sessions
+
+    api_config = config.get("api", {})
+    metrics.set_enabled(config.get("metrics", {}).get("enabled", True))
+    app.state.config = config
+    app.state.data_factory = DataFactory(config=config)
+    app.state.predictor = Predictor.from_config(config, data_factory=app.state.data_factory)
+    scheduler_config = config.get("scheduler", {})
+    app.state.precompute_store = PrecomputeStore(scheduler_config.get("output_dir", "data_cache/precomputed"))
+    app.state.request_timeout = api_config.get("request_timeout_seconds", 30)
+    # 阻塞 I/O (读缓存 / 请求上游) 和响应编码都在有界线程池中执行;
+    # 编码不放进程池: 把整个 DataFrame pickle 给子进程的开销与编码本身相当, orjson / pyarrow 编码时会释放 GIL
+    app.state.io_executor = ThreadPoolExecutor(
+        max_workers=api_config.get("io_workers", 8), thread_name_prefix="superrich-io"
+    )
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(app.state.io_executor, _warm_up, app.state.data_factory, api_config)
+    precompute_task = None
+    if scheduler_config.get("run_in_app", False):
+        scheduler = PrecomputeScheduler(config, data_factory=app.state.data_factory)
+        precompute_task = asyncio.create_task(run_daily(scheduler))
+    logger.info("SuperRich API 启动完成")
+    try:
+        yield
+    finally:
+        if precompute_task is not None:
+            precompute_task.cancel()
+        app.state.io_executor.shutdown(wait=False, cancel_futures=True)
+        close_shared_sessions()
+        logger.info("SuperRich API 已关闭")
+        shutdown_logger()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    """按处理函数记录请求耗时 (用函数名而不是路径作为标签, 避免股票代码撑大标签基数)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    endpoint = request.scope.get("endpoint")
+    handler = getattr(endpoint, "__name__", "unmatched")
+    metrics.SPAN_SECONDS.observe(time.perf_counter() - start, span="http", handler=handler)
+    metrics.inc("http_response", handler=handler, status=response.status_code)
+    return response
+
+
+async def run_io(request: Request, fn, *args):
+    """在有界 I/O 线程池中执行阻塞函数, 超时返回 504"""
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(request.app.state.io_executor, fn, *args)
+    try:
+        return await asyncio.wait_for(future, timeout=request.app.state.request_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="请求处理超时")
+
+
+def _history_etag(entry: dict, symbol: str, start_date: str, end_date: str, fmt: str, columns: Optional[str]) -> str:
+    """由缓存条目版本 (路径 / 修改时间 / 大小) 和请求参数生成 ETag"""
+    raw = f"{entry['path']}|{entry['mtime_ns']}|{entry['size']}|{symbol}|{start_date}|{end_date}|{fmt}|{columns}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+
+def _cache_headers(entry: Optional[dict], etag: Optional[str]) -> dict:
+    headers = {"Cache-Control": "no-cache"}
+    if entry is not None:
+        headers["ETag"] = etag
+        headers["Last-Modified"] = formatdate(entry["mtime"], usegmt=True)
+    return headers
+
+
+def _is_not_modified(request: Request, entry: dict, etag: str) -> bool:
+    """If-None-Match 优先, 其次 If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(entry["mtime"]) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
 
-app = FastAPI()
 
 @app.get("/api/stock/{symbol}/history")
-def stock_history(symbol: str, start_date: str, end_date: str):
-    # df = get_stock_price_history(symbol, start_date, end_date)
-    # return df.to_dict(orient="records")
-    pass
+async def stock_history(
+    request: Request,
+    symbol: str,
+    start_date: str,
+    end_date: str,
+    fmt: str = Query("columnar", alias="format"),
+    columns: Optional[str] = None,
+):
+    """历史行情: format 可选 columnar (列式 JSON) / ndjson (分块流式) / arrow (Arrow IPC stream)
+
+    columns 为逗号分隔的列名, 只返回这些列; 响应带 ETag / Last-Modified, 缓存未变化时返回 304。
+    """
+    if fmt not in HISTORY_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format 可选: {list(HISTORY_MEDIA_TYPES)}")
+    if fmt == "arrow" and not arrow_available():
+        raise HTTPException(status_code=406, detail="服务端未安装 pyarrow, 不支持 arrow 格式")
+
+    data_factory = request.app.state.data_factory
+    if not data_factory.check_date_windows(start_date, end_date):
+        raise HTTPException(status_code=400, detail="日期范围不合法")
+    column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    if column_list is not None:
+        unknown = [c for c in column_list if c not in HISTORY_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"不支持的列: {unknown}, 可选: {list(HISTORY_COLUMNS)}")
+
+    # 先用缓存条目版本判断是否未修改, 命中时不读取数据
+    entry = await run_io(request, data_factory.GET_CACHE_ENTRY_INFO, symbol, start_date, end_date)
+    if entry is not None:
+        etag = _history_etag(entry, symbol, start_date, end_date, fmt, columns)
+        if _is_not_modified(request, entry, etag):
+            return Response(status_code=304, headers=_cache_headers(entry, etag))
+
+    df = await run_io(request, get_stock_price_history, symbol, start_date, end_date, data_factory, column_list)
+    if df.empty:
+        raise HTTPException(status_code=404, detail=f"没有 {symbol} 在 {start_date} 到 {end_date} 的数据")
+
+    # 冷启动时数据刚由数据驱动写入缓存, 重新获取缓存条目
+    if entry is None:
+        entry = await run_io(request, data_factory.GET_CACHE_ENTRY_INFO, symbol, start_date, end_date)
+    etag = _history_etag(entry, symbol, start_date, end_date, fmt, columns) if entry is not None else None
+    headers = _cache_headers(entry, etag)
+    media_type = HISTORY_MEDIA_TYPES[fmt]
+
+    if fmt == "ndjson":
+        # 同步生成器由 Starlette 在线程池中逐块迭代, 不阻塞事件循环
+        return StreamingResponse(iter_ndjson(df), media_type=media_type, headers=headers)
+    if fmt == "arrow":
+        content = await run_io(request, to_arrow_ipc, df)
+    else:
+        content = await run_io(request, to_columnar_json, df, symbol)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+def _load_precomputed(request: Request, symbol: str) -> Optional[dict]:
+    """读取夜间预计算结果, 超过 scheduler.max_age_hours 的视为过期"""
+    result = request.app.state.precompute_store.load(symbol)
+    if result is None:
+        return None
+    max_age = request.app.state.config.get("scheduler", {}).get("max_age_hours", 36)
+    if datetime.strptime(result["as_of"], "%Y-%m-%d %H:%M:%S") < datetime.now() - timedelta(hours=max_age):
+        return None
+    return result
+
+
+@app.get("/api/stock/{symbol}/indicators")
+async def stock_indicators(request: Request, symbol: str):
+    """夜间预计算的最新技术指标"""
+    result = await run_io(request, _load_precomputed, request, symbol)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"{symbol} 没有预计算的指标")
+    return {key: result[key] for key in ("symbol", "as_of", "last_bar", "indicators")}
+
 
 @app.get("/api/stock/{symbol}/predict")
-def stock_predict(symbol: str, days: int = 5):
-    # df = get_stock_price_history(symbol, "2023-01-01", "2025-01-01")  # 简化示例
-    # pred = predict_future(df, days=days)
-    # return pred.to_dict(orient="records")
-    pass
+async def stock_predict(request: Request, symbol: str, days: int = 5):
+    """预测未来 days 个交易日的收盘价, 模型按 (股票, 最后K线日期, 参数) 缓存, 没有新数据时不重新拟合"""
+    max_days = request.app.state.config.get("predict", {}).get("max_days", 60)
+    if days < 1 or days > max_days:
+        raise HTTPException(status_code=400, detail=f"days 取值范围为 1 到 {max_days}")
+    # 优先返回夜间预计算的结果
+    precomputed = await run_io(request, _load_precomputed, request, symbol)
+    if precomputed is not None and precomputed["prediction"] and len(precomputed["prediction"]["date"]) >= days:
+        prediction = precomputed["prediction"]
+        columns = [c for c in prediction if c != "date"]
+        return {
+            "symbol": symbol,
+            "columns": columns,
+            "date": prediction["date"][:days],
+            "data": {c: prediction[c][:days] for c in columns},
+        }
+    pred = await run_io(request, request.app.state.predictor.predict, symbol, days)
+    if pred.empty:
+        raise HTTPException(status_code=404, detail=f"{symbol} 没有足够的历史数据用于预测")
+    return Response(content=to_columnar_json(pred, symbol), media_type=HISTORY_MEDIA_TYPES["columnar"])
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """本进程的耗时直方图和计数器 (Prometheus 文本格式)"""
+    return Response(content=metrics.render_prometheus(), media_type=metrics.CONTENT_TYPE)
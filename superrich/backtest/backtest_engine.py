@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from superrich.data.processor import IndicatorEngine, _ffill, build_price_panel
+
+
+TRADING_DAYS = 252
+
+
+def param_grid(**values) -> list:
+    """参数网格: param_grid(fast=[5, 10], slow=[20, 50]) -> [{"fast": 5, "slow": 20}, ...]"""
+    keys = list(values.keys())
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(values[k] for k in keys))]
+
+
+def sma_cross_position(engine: IndicatorEngine, fast: int, slow: int) -> np.ndarray:
+    """均线交叉: 快线在慢线之上持多, 否则空仓"""
+    return (engine.sma(fast) > engine.sma(slow)).astype(np.float64)
+
+
+def momentum_position(engine: IndicatorEngine, lookback: int) -> np.ndarray:
+    """动量: 过去 lookback 天收益为正时持多"""
+    close = engine.close
+    past = np.full_like(close, np.nan)
+    past[lookback:] = close[:-lookback]
+    return (close > past).astype(np.float64)
+
+
+# 策略名 -> (持仓函数, 参数是否有效)
+STRATEGIES = {
+    "sma_cross": (sma_cross_position, lambda p: p["fast"] < p["slow"]),
+    "momentum": (momentum_position, lambda p: p["lookback"] > 0),
+}
+
+
+def listed_close(close: np.ndarray) -> tuple:
+    """在每只股票的上市区间 (第一个到最后一个有效收盘价) 内向前填充收盘价
+
+    并集日期的价格块中, 某只股票个别日期缺失时沿用前一天的收盘价, 缺口两侧的真实涨跌计入缺口后的第一天;
+    上市前和最后一个有效价之后保持 NaN。
+
+    Returns:
+        tuple: (填充后的收盘价 (T, N), 有效收益率日 (T, N) bool: 当天和前一天都在上市区间内)
+    """
+    valid = ~np.isnan(close)
+    n_rows = close.shape[0]
+    first = np.argmax(valid, axis=0)
+    last = n_rows - 1 - np.argmax(valid[::-1], axis=0)
+    rows = np.arange(n_rows)[:, None]
+    listed = valid.any(axis=0) & (rows >= first) & (rows <= last)
+    filled = np.where(listed, _ffill(close), np.nan)
+    active = np.zeros_like(listed)
+    active[1:] = listed[1:] & listed[:-1]
+    return filled, active
+
+
+def _block_stats(positions: np.ndarray, returns: np.ndarray, active: np.ndarray, cost: float) -> dict:
+    """对 (G, T, N) 持仓块一次计算收益、回撤等统计, 返回每项 (G, N)
+
+    持仓在信号出现后的下一根K线生效; 每次换仓按 cost * |持仓变化| 扣费。
+    只统计 active 为 True 的日期, 天数、年化和夏普按每只股票自己的有效区间计算。
+    """
+    held = np.zeros_like(positions)
+    held[:, 1:] = positions[:, :-1]
+    turnover = np.abs(np.diff(held, axis=1, prepend=0.0))
+    pnl = np.where(active[None, :, :], held * returns[None, :, :] - cost * turnover, 0.0)
+    trades = ((turnover > 0) & active[None, :, :]).sum(axis=1)
+    del turnover
+
+    equity = np.cumprod(1.0 + pnl, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    max_drawdown = (1.0 - equity / peak).max(axis=1)
+
+    n_days = np.maximum(active.sum(axis=0), 1)
+    mean = pnl.sum(axis=1) / n_days
+    std = np.sqrt(np.maximum((pnl ** 2).sum(axis=1) / n_days - mean ** 2, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), np.nan)
+    total_return = equity[:, -1, :] - 1.0
+    return {
+        "total_return": total_return,
+        "annual_return": np.power(np.maximum(1.0 + total_return, 0.0), TRADING_DAYS / n_days) - 1.0,
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdown,
+        "trades": trades,
+        "exposure": np.where(active[None, :, :], held, 0.0).sum(axis=1) / n_days,
+    }
+
+
+def run_backtest_block(close: np.ndarray, strategy: str, grid: list, cost: float = 0.0, block_mb: float = 256) -> list:
+    """在一组股票上跑完整个参数网格
+
+    共用同一个 IndicatorEngine, 不同参数的均线只计算一次; 参数按块处理, 每块 (G, T, N) 不超过 block_mb。
+
+    Args:
+        close (np.ndarray): (T, N) 收盘价
+        strategy (str): STRATEGIES 中的策略名
+        grid (list): 参数列表
+        cost (float, optional): 单边换仓成本 (比例). Defaults to 0.0.
+        block_mb (float, optional): 每块持仓数组的内存上限. Defaults to 256.
+
+    Returns:
+        list: [(参数, {统计名: (N,)})]
+    """
+    position_fn, is_valid = STRATEGIES[strategy]
+    grid = [params for params in grid if is_valid(params)]
+    close, active = listed_close(close)
+    engine = IndicatorEngine(close)
+    with np.errstate(invalid="ignore"):
+        returns = np.nan_to_num(close[1:] / close[:-1] - 1.0, nan=0.0)
+    returns = np.concatenate([np.zeros((1, close.shape[1])), returns])
+
+    per_param = max(close.shape[0] * close.shape[1] * 8 * 4, 1)
+    block_size = max(1, int(block_mb * 1024 * 1024) // per_param)
+    results = []
+    for start in range(0, len(grid), block_size):
+        block = grid[start:start + block_size]
+        positions = np.stack([position_fn(engine, **params) for params in block])
+        stats = _block_stats(positions, returns, active, cost)
+        for g, params in enumerate(block):
+            results.append((params, {name: values[g] for name, values in stats.items()}))
+    return results
+
+
+def _run_shard(close: np.ndarray, tickers: list, strategy: str, grid: list, cost: float, block_mb: float) -> pd.DataFrame:
+    rows = []
+    for params, stats in run_backtest_block(close, strategy, grid, cost, block_mb):
+        for j, ticker in enumerate(tickers):
+            row = dict(params)
+            row["symbol"] = ticker
+            row.update({name: values[j] for name, values in stats.items()})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def backtest(frames: dict, strategy: str, grid: list, cost: float = 0.0, workers: int = 1, shard_size: int = 200, block_mb: float = 256) -> pd.DataFrame:
+    """在股票池和参数网格上批量回测
+
+    Args:
+        frames (dict): {股票代码: DataFrame}, 例如 DataFactory.GET_STOCK_DATA_BATCH 的结果
+        strategy (str): 策略名, 见 STRATEGIES
+        grid (list): 参数列表, 见 param_grid
+        cost (float, optional): 单边换仓成本. Defaults to 0.0.
+        workers (int, optional): 进程数, 大于 1 时按股票分片并行. Defaults to 1.
+        shard_size (int, optional): 每片股票数. Defaults to 200.
+        block_mb (float, optional): 每块持仓数组的内存上限. Defaults to 256.
+
+    Returns:
+        pd.DataFrame: 每行一个 (参数, 股票), 列为参数、symbol 和 total_return / annual_return / sharpe / max_drawdown / trades / exposure
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"不支持的策略: {strategy}, 可选 {list(STRATEGIES)}")
+    panel = build_price_panel(frames, fields=("close",))
+    if not panel.tickers:
+        return pd.DataFrame()
+    close = panel["close"]
+    shards = [
+        (close[:, i:i + shard_size], panel.tickers[i:i + shard_size])
+        for i in range(0, len(panel.tickers), shard_size)
+    ]
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(_run_shard, c, t, strategy, grid, cost, block_mb) for c, t in shards]
+            tables = [future.result() for future in futures]
+    else:
+        tables = [_run_shard(c, t, strategy, grid, cost, block_mb) for c, t in shards]
+    return pd.concat(tables, ignore_index=True)
+
+
+def summarize(results: pd.DataFrame, by: list = None) -> pd.DataFrame:
+    """按参数汇总全部股票的回测结果 (中位数), 按夏普比率降序"""
+    if results.empty:
+        return results
+    if by is None:
+        by = [c for c in results.columns if c not in ("symbol", "total_return", "annual_return", "sharpe", "max_drawdown", "trades", "exposure")]
+    table = results.groupby(by)[["total_return", "annual_return", "sharpe", "max_drawdown", "trades", "exposure"]].median()
+    return table.sort_values("sharpe", ascending=False)
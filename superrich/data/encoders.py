@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson 可选, 没有安装时退回标准库 json
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _date_strings(index: pd.DatetimeIndex) -> np.ndarray:
+    """向量化地把 DatetimeIndex 转为 YYYY-MM-DD 字符串数组"""
+    return np.datetime_as_string(index.values.astype("datetime64[D]"), unit="D")
+
+
+def _column_values(series: pd.Series) -> list:
+    """数值列转为列表, NaN 转为 null"""
+    values = series.to_numpy(dtype=np.float64)
+    if np.isnan(values).any():
+        return [None if np.isnan(v) else float(v) for v in values]
+    return values.tolist()
+
+
+def to_columnar_json(df: pd.DataFrame, symbol: str) -> bytes:
+    """编码为紧凑的列式 JSON
+
+    格式: {"symbol": "AAPL", "columns": ["open", ...], "date": ["2024-01-02", ...], "data": {"open": [...], ...}}
+
+    Args:
+        df (pd.DataFrame): 以 date 为 DatetimeIndex 的数据
+        symbol (str): 股票代码
+
+    Returns:
+        bytes: UTF-8 JSON
+    """
+    columns = [str(c) for c in df.columns]
+    payload = {
+        "symbol": symbol,
+        "columns": columns,
+        "date": _date_strings(df.index).tolist(),
+        "data": {name: _column_values(df[col]) for name, col in zip(columns, df.columns)},
+    }
+    return _dumps(payload)
+
+
+def iter_ndjson(df: pd.DataFrame, chunk_rows: int = 2000):
+    """按块生成 NDJSON, 每行一个 {"date": ..., "open": ...} 对象, 适合 StreamingResponse
+
+    Args:
+        df (pd.DataFrame): 以 date 为 DatetimeIndex 的数据
+        chunk_rows (int, optional): 每块行数. Defaults to 2000.
+
+    Yields:
+        bytes: 一块 NDJSON (以换行结尾)
+    """
+    columns = [str(c) for c in df.columns]
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        dates = _date_strings(chunk.index).tolist()
+        values = [_column_values(chunk[col]) for col in chunk.columns]
+        lines = []
+        for i, date in enumerate(dates):
+            record = {"date": date}
+            for name, column in zip(columns, values):
+                record[name] = column[i]
+            lines.append(_dumps(record))
+        yield b"\n".join(lines) + b"\n"
+
+
+def to_arrow_ipc(df: pd.DataFrame) -> bytes:
+    """编码为 Arrow IPC stream (需要 pyarrow)
+
+    Args:
+        df (pd.DataFrame): 以 date 为 DatetimeIndex 的数据
+
+    Returns:
+        bytes: Arrow IPC stream
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
@@ -1,8 +1,50 @@
-# def get_stock_price_history(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
-#     """
-#     获取某个股票在指定日期区间的历史股价
-#     """
-#     pass
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+
+
+def normalize_stock_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """统一为以 date 为 DatetimeIndex、按日期升序的 DataFrame
+
+    缓存读取的数据以 date 为索引, 数据驱动返回的数据带 date 列, 这里统一成前者。
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if "date" in df.columns:
+        df = df.set_index("date")
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index)
+    df.index.name = "date"
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
+
+def get_stock_price_history(symbol: str, start_date: str, end_date: str, data_factory, columns: list = None) -> pd.DataFrame:
+    """
+    获取某个股票在指定日期区间的历史股价
+
+    Args:
+        symbol (str): 股票代码
+        start_date (str): 起始日期 (YYYY-MM-DD)
+        end_date (str): 结束日期 (YYYY-MM-DD)
+        data_factory (DataFactory): 数据工厂
+        columns (list, optional): 只返回这些列 (不含 date)
+
+    Returns:
+        pd.DataFrame: 以 date 为 DatetimeIndex 的数据, 只包含 [start_date, end_date] 内的交易日
+    """
+    df = normalize_stock_frame(data_factory.GET_STOCK_DATA(symbol, start_date, end_date, columns=columns))
+    if df.empty:
+        return df
+    lo = df.index.searchsorted(pd.Timestamp(start_date), side="left")
+    hi = df.index.searchsorted(pd.Timestamp(end_date), side="right")
+    df = df.iloc[lo:hi]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
 
 # def get_company_info(symbol: str) -> dict:
 #     """
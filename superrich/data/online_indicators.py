@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils.logger_manager import get_logger
+from superrich.data.fetcher import normalize_stock_frame
+from superrich.data.processor import DEFAULT_INDICATORS, IndicatorEngine, build_price_panel
+
+
+NAN = float("nan")
+
+
+class _RecursiveAverageState:
+    """单只股票的递推平均状态, 与 processor._recursive_average 的规则一致
+
+    前 window 个有效值取简单平均作为初值, 之后 s = alpha * x + (1 - alpha) * s。
+    """
+
+    def __init__(self, window: int, alpha: float):
+        self.window = window
+        self.alpha = alpha
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            return NAN
+        self.count += 1
+        if self.count <= self.window:
+            self.seed_sum += x
+            if self.count == self.window:
+                self.value = self.seed_sum / self.window
+        else:
+            self.value = self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value if self.count >= self.window else NAN
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "seed_sum": self.seed_sum, "value": self.value}
+
+    def load(self, state: dict):
+        self.count = state["count"]
+        self.seed_sum = state["seed_sum"]
+        self.value = state["value"]
+
+
+class _RollingWindowState:
+    """固定窗口的均值 / 方差 (滑动窗口 Welford), 只保留最近 window 个值"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: float):
+        if len(self.values) < self.window:
+            n = len(self.values) + 1
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values[0]
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        self.values.append(x)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def std(self, ddof: int = 0) -> float:
+        if not self.full:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (self.window - ddof))
+
+    def to_dict(self) -> dict:
+        return {"values": list(self.values), "mean": self.mean, "m2": self.m2}
+
+    def load(self, state: dict):
+        self.values = deque(state["values"], maxlen=self.window)
+        self.mean = state["mean"]
+        self.m2 = state["m2"]
+
+
+class OnlineSMA:
+    def __init__(self, window: int = 20):
+        self.rolling = _RollingWindowState(window)
+
+    def update(self, bar: dict) -> float:
+        self.rolling.update(bar["close"])
+        return self.rolling.mean if self.rolling.full else NAN
+
+    def to_dict(self) -> dict:
+        return {"rolling": self.rolling.to_dict()}
+
+    def load(self, state: dict):
+        self.rolling.load(state["rolling"])
+
+
+class OnlineBollinger:
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        self.num_std = num_std
+        self.rolling = _RollingWindowState(window)
+
+    def update(self, bar: dict) -> tuple:
+        self.rolling.update(bar["close"])
+        if not self.rolling.full:
+            return NAN, NAN, NAN
+        middle = self.rolling.mean
+        width = self.num_std * self.rolling.std()
+        return middle, middle + width, middle - width
+
+    def to_dict(self) -> dict:
+        return {"rolling": self.rolling.to_dict()}
+
+    def load(self, state: dict):
+        self.rolling.load(state["rolling"])
+
+
+class OnlineEMA:
+    def __init__(self, window: int = 12):
+        self.average = _RecursiveAverageState(window, 2.0 / (window + 1))
+
+    def update(self, bar: dict) -> float:
+        return self.average.update(bar["close"])
+
+    def to_dict(self) -> dict:
+        return {"average": self.average.to_dict()}
+
+    def load(self, state: dict):
+        self.average.load(state["average"])
+
+
+class OnlineMACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = _RecursiveAverageState(fast, 2.0 / (fast + 1))
+        self.slow = _RecursiveAverageState(slow, 2.0 / (slow + 1))
+        self.signal = _RecursiveAverageState(signal, 2.0 / (signal + 1))
+
+    def update(self, bar: dict) -> tuple:
+        line = self.fast.update(bar["close"]) - self.slow.update(bar["close"])
+        signal_line = self.signal.update(line)
+        return line, signal_line, line - signal_line
+
+    def to_dict(self) -> dict:
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    def load(self, state: dict):
+        self.fast.load(state["fast"])
+        self.slow.load(state["slow"])
+        self.signal.load(state["signal"])
+
+
+class OnlineRSI:
+    def __init__(self, window: int = 14):
+        self.prev_close = NAN
+        self.gain = _RecursiveAverageState(window, 1.0 / window)
+        self.loss = _RecursiveAverageState(window, 1.0 / window)
+
+    def update(self, bar: dict) -> float:
+        change = bar["close"] - self.prev_close
+        self.prev_close = bar["close"]
+        avg_gain = self.gain.update(max(change, 0.0) if not math.isnan(change) else NAN)
+        avg_loss = self.loss.update(max(-change, 0.0) if not math.isnan(change) else NAN)
+        if math.isnan(avg_gain):
+            return NAN
+        if avg_loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def to_dict(self) -> dict:
+        return {"prev_close": self.prev_close, "gain": self.gain.to_dict(), "loss": self.loss.to_dict()}
+
+    def load(self, state: dict):
+        self.prev_close = state["prev_close"]
+        self.gain.load(state["gain"])
+        self.loss.load(state["loss"])
+
+
+class OnlineATR:
+    def __init__(self, window: int = 14):
+        self.prev_close = NAN
+        self.average = _RecursiveAverageState(window, 1.0 / window)
+
+    def update(self, bar: dict) -> float:
+        high, low = bar["high"], bar["low"]
+        tr = high - low
+        if not math.isnan(self.prev_close):
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = bar["close"]
+        return self.average.update(tr)
+
+    def to_dict(self) -> dict:
+        return {"prev_close": self.prev_close, "average": self.average.to_dict()}
+
+    def load(self, state: dict):
+        self.prev_close = state["prev_close"]
+        self.average.load(state["average"])
+
+
+# 指标名 -> 在线版本, 指标名与 IndicatorEngine 的方法名一致
+ONLINE_INDICATORS = {
+    "sma": OnlineSMA,
+    "ema": OnlineEMA,
+    "bollinger": OnlineBollinger,
+    "macd": OnlineMACD,
+    "rsi": OnlineRSI,
+    "atr": OnlineATR,
+}
+
+
+class OnlineIndicatorSet:
+    """单只股票的一组在线指标
+
+    每追加一根K线, 各指标以 O(1) 更新; 状态可序列化, 与缓存文件放在一起,
+    下次刷新后只需喂入新增的K线。收盘价为 NaN 的K线会被跳过。
+    """
+
+    def __init__(self, ticker: str, specs: dict = None):
+        self.ticker = ticker
+        self.specs = specs if specs is not None else DEFAULT_INDICATORS
+        self.indicators = {
+            name: ONLINE_INDICATORS[indicator](**params) for name, (indicator, params) in self.specs.items()
+        }
+        self.last_date = None
+        self.bars = 0
+        self.values = {}
+
+    def update(self, date: str, bar: dict) -> dict:
+        """喂入一根K线
+
+        Args:
+            date (str): K线日期 (YYYY-MM-DD), 不晚于 last_date 的K线会被忽略
+            bar (dict): {"close": ..., "high": ..., "low": ...}
+
+        Returns:
+            dict: {结果名: 最新值}
+        """
+        if self.last_date is not None and date <= self.last_date:
+            return self.values
+        if math.isnan(bar["close"]):
+            return self.values
+        self.values = {name: indicator.update(bar) for name, indicator in self.indicators.items()}
+        self.last_date = date
+        self.bars += 1
+        return self.values
+
+    def update_frame(self, df: pd.DataFrame) -> int:
+        """依次喂入 DataFrame 中晚于 last_date 的K线
+
+        Returns:
+            int: 实际处理的K线数
+        """
+        df = normalize_stock_frame(df)
+        if df.empty:
+            return 0
+        dates = np.datetime_as_string(df.index.values.astype("datetime64[D]"), unit="D")
+        start = 0 if self.last_date is None else int(np.searchsorted(dates, self.last_date, side="right"))
+        close = df["close"].to_numpy(dtype=np.float64)
+        high = df["high"].to_numpy(dtype=np.float64) if "high" in df.columns else close
+        low = df["low"].to_numpy(dtype=np.float64) if "low" in df.columns else close
+        before = self.bars
+        for i in range(start, len(dates)):
+            self.update(str(dates[i]), {"close": float(close[i]), "high": float(high[i]), "low": float(low[i])})
+        return self.bars - before
+
+    def to_dict(self) -> dict:
+        return {
+            "ticker": self.ticker,
+            "specs": {name: [indicator, params] for name, (indicator, params) in self.specs.items()},
+            "last_date": self.last_date,
+            "bars": self.bars,
+            "values": self.values,
+            "state": {name: indicator.to_dict() for name, indicator in self.indicators.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OnlineIndicatorSet":
+        specs = {name: (indicator, params) for name, (indicator, params) in data["specs"].items()}
+        obj = cls(data["ticker"], specs)
+        for name, indicator in obj.indicators.items():
+            indicator.load(data["state"][name])
+        obj.last_date = data["last_date"]
+        obj.bars = data["bars"]
+        obj.values = {name: tuple(v) if isinstance(v, list) else v for name, v in data["values"].items()}
+        return obj
+
+
+class IndicatorStateStore:
+    """在线指标状态的持久化, 与缓存文件放在同一目录: <cache_dir>/<TICKER>.indicators.json"""
+
+    def __init__(self, cache_dir: str = "data_cache"):
+        self.cache_dir = cache_dir
+
+    def state_path(self, ticker: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker}.indicators.json")
+
+    def load(self, ticker: str, specs: dict = None) -> OnlineIndicatorSet:
+        """读取状态; 文件不存在、损坏或指标配置已变化时返回 None"""
+        path = self.state_path(ticker)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                indicator_set = OnlineIndicatorSet.from_dict(json.load(f))
+        except Exception as e:
+            get_logger().error("读取指标状态文件 %s 时出错: %s", path, e)
+            return None
+        if specs is not None and indicator_set.specs != specs:
+            get_logger().info("%s 指标配置已变化, 需要全量重算", ticker)
+            return None
+        return indicator_set
+
+    def save(self, indicator_set: OnlineIndicatorSet):
+        path = self.state_path(indicator_set.ticker)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(indicator_set.to_dict(), f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            get_logger().error("保存指标状态文件 %s 时出错: %s", path, e)
+
+
+def batch_latest_values(df: pd.DataFrame, specs: dict = None) -> dict:
+    """用 IndicatorEngine 全量计算, 返回最后一根K线的指标值"""
+    specs = specs if specs is not None else DEFAULT_INDICATORS
+    panel = build_price_panel({"_": df})
+    results = IndicatorEngine.from_panel(panel).compute(specs)
+    latest = {}
+    for name, values in results.items():
+        if isinstance(values, tuple):
+            latest[name] = tuple(float(v[-1, 0]) for v in values)
+        else:
+            latest[name] = float(values[-1, 0])
+    return latest
+
+
+def check_parity(online_values: dict, batch_values: dict, rtol: float = 1e-6, atol: float = 1e-8) -> dict:
+    """比较在线结果与全量结果
+
+    Returns:
+        dict: {结果名: (在线值, 全量值)}, 只包含不一致的指标, 为空表示一致
+    """
+    mismatched = {}
+    for name, expected in batch_values.items():
+        actual = online_values.get(name)
+        if actual is None or not np.allclose(actual, expected, rtol=rtol, atol=atol, equal_nan=True):
+            mismatched[name] = (actual, expected)
+    return mismatched
+
+
+def update_ticker_indicators(ticker: str, df: pd.DataFrame, store: IndicatorStateStore, specs: dict = None, verify: bool = False) -> dict:
+    """用刷新后的数据更新某只股票的在线指标并保存状态
+
+    有状态时只处理 last_date 之后的新K线, 没有状态时从头构建。
+
+    Args:
+        ticker (str): 股票代码
+        df (pd.DataFrame): 该股票的完整历史 (或至少包含新增K线)
+        store (IndicatorStateStore): 状态存储
+        specs (dict, optional): 指标配置. Defaults to DEFAULT_INDICATORS.
+        verify (bool, optional): 校验模式, 同时做一次全量计算并比较最新值. Defaults to False.
+
+    Returns:
+        dict: {结果名: 最新值}
+    """
+    logger = get_logger()
+    specs = specs if specs is not None else DEFAULT_INDICATORS
+    indicator_set = store.load(ticker, specs)
+    if indicator_set is None:
+        indicator_set = OnlineIndicatorSet(ticker, specs)
+    processed = indicator_set.update_frame(df)
+    if processed:
+        store.save(indicator_set)
+    logger.info("%s 在线指标更新 %s 根K线, 最新日期 %s", ticker, processed, indicator_set.last_date)
+
+    if verify:
+        mismatched = check_parity(indicator_set.values, batch_latest_values(df, specs))
+        if mismatched:
+            logger.warning("%s 在线指标与全量计算不一致: %s", ticker, mismatched)
+        else:
+            logger.info("%s 在线指标与全量计算一致", ticker)
+    return indicator_set.values
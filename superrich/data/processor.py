@@ -1,6 +1,10 @@
-# #!/bin/python env python3
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
 
-# import pandas as pd
+import numpy as np
+import pandas as pd
+
+from superrich.data.fetcher import normalize_stock_frame
 
 
 # def clean_price_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -8,3 +12,270 @@
 #     清理缺失值、异常值等
 #     """
 #     pass
+
+
+PANEL_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class PricePanel:
+    """按 (日期 × 股票) 对齐的二维价格块
+
+    Attributes:
+        dates (pd.DatetimeIndex): 所有股票交易日的并集, 升序
+        tickers (list): 股票代码, 与列一一对应
+        fields (dict): {字段名: ndarray (T, N)}, 某只股票当天没有数据时为 NaN
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, tickers: list, fields: dict):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.fields = fields
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.fields[field]
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self.dates), len(self.tickers))
+
+    def to_frame(self, values: np.ndarray) -> pd.DataFrame:
+        """将 (T, N) 结果转为 日期 × 股票 的 DataFrame"""
+        return pd.DataFrame(values, index=self.dates, columns=self.tickers)
+
+
+def build_price_panel(frames: dict, fields: tuple = PANEL_FIELDS) -> PricePanel:
+    """将 DataFactory 返回的多只股票数据对齐为二维块
+
+    Args:
+        frames (dict): {股票代码: DataFrame}, 例如 GET_STOCK_DATA_BATCH 的结果; None 或空表会被跳过
+        fields (tuple, optional): 需要的字段. Defaults to PANEL_FIELDS.
+
+    Returns:
+        PricePanel: 对齐后的价格块
+    """
+    normalized = {}
+    for ticker, df in frames.items():
+        df = normalize_stock_frame(df)
+        if not df.empty:
+            normalized[ticker] = df
+    tickers = list(normalized.keys())
+    if not tickers:
+        return PricePanel(pd.DatetimeIndex([], name="date"), [], {field: np.empty((0, 0)) for field in fields})
+
+    dates = normalized[tickers[0]].index
+    for ticker in tickers[1:]:
+        dates = dates.union(normalized[ticker].index)
+
+    blocks = {}
+    for field in fields:
+        block = np.full((len(dates), len(tickers)), np.nan)
+        for j, ticker in enumerate(tickers):
+            df = normalized[ticker]
+            if field in df.columns:
+                rows = dates.get_indexer(df.index)
+                block[rows, j] = df[field].to_numpy(dtype=np.float64)
+        blocks[field] = block
+    return PricePanel(dates, tickers, blocks)
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """沿时间轴 (axis 0) 向前填充 NaN"""
+    mask = np.isnan(values)
+    index = np.where(~mask, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = values[index, np.arange(values.shape[1])[None, :]]
+    return filled
+
+
+def _shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """沿时间轴后移 periods 行, 前面补 NaN"""
+    out = np.full_like(values, np.nan)
+    if periods < values.shape[0]:
+        out[periods:] = values[:-periods]
+    return out
+
+
+def _recursive_average(values: np.ndarray, window: int, alpha: float) -> np.ndarray:
+    """对所有股票同时做递推平均 (EMA / Wilder 平滑)
+
+    每只股票用前 window 个有效值的简单平均作为初值, 之后 s = alpha * x + (1 - alpha) * s;
+    NaN 输入不更新状态, 输出也为 NaN; 有效值不足 window 个之前输出 NaN (预热期)。
+    循环只在时间轴上, 每一步对全部股票向量化计算。
+    """
+    n_rows, n_cols = values.shape
+    out = np.full((n_rows, n_cols), np.nan)
+    state = np.full(n_cols, np.nan)
+    seed_sum = np.zeros(n_cols)
+    count = np.zeros(n_cols, dtype=np.int64)
+    for t in range(n_rows):
+        x = values[t]
+        valid = ~np.isnan(x)
+        if not valid.any():
+            continue
+        count[valid] += 1
+        seeding = valid & (count <= window)
+        seed_sum[seeding] += x[seeding]
+        seeded = valid & (count == window)
+        state[seeded] = seed_sum[seeded] / window
+        update = valid & (count > window)
+        state[update] = alpha * x[update] + (1.0 - alpha) * state[update]
+        ready = valid & (count >= window)
+        out[t, ready] = state[ready]
+    return out
+
+
+class IndicatorEngine:
+    """多股票向量化技术指标引擎
+
+    输入为 (日期 × 股票) 的二维块, 每个指标对所有股票一次计算完成。
+    滚动和 / 滚动平方和 / EMA / Wilder 平均等中间结果按参数缓存, 多个指标共用,
+    例如 SMA(20) 与 Bollinger(20) 共用同一个滚动和。
+    窗口内含 NaN 或处于预热期的位置输出 NaN。
+    """
+
+    def __init__(self, close: np.ndarray, high: np.ndarray = None, low: np.ndarray = None):
+        self.close = np.asarray(close, dtype=np.float64)
+        self.high = None if high is None else np.asarray(high, dtype=np.float64)
+        self.low = None if low is None else np.asarray(low, dtype=np.float64)
+        self._memo = {}
+
+    @classmethod
+    def from_panel(cls, panel: PricePanel) -> "IndicatorEngine":
+        return cls(panel["close"], panel.fields.get("high"), panel.fields.get("low"))
+
+    def _cached(self, key: tuple, compute):
+        value = self._memo.get(key)
+        if value is None:
+            value = compute()
+            self._memo[key] = value
+        return value
+
+    def clear_cache(self):
+        self._memo.clear()
+
+    # ---------- 共享中间结果 ----------
+
+    def _cumulative(self, power: int) -> tuple:
+        """x^power 的累计和 (NaN 视为 0) 与有效值个数的累计和, 首行补 0"""
+        def compute():
+            x = self.close if power == 1 else self.close ** power
+            valid = ~np.isnan(x)
+            zero_row = np.zeros((1, x.shape[1]))
+            cum_values = np.concatenate([zero_row, np.cumsum(np.where(valid, x, 0.0), axis=0)])
+            cum_valid = np.concatenate([zero_row, np.cumsum(valid, axis=0)])
+            return cum_values, cum_valid
+        return self._cached(("cumsum", power), compute)
+
+    def rolling_sum(self, window: int, power: int = 1) -> np.ndarray:
+        """滚动窗口内 x^power 的和, 窗口未满或含 NaN 时为 NaN"""
+        def compute():
+            cum_values, cum_valid = self._cumulative(power)
+            n_rows = self.close.shape[0]
+            out = np.full(self.close.shape, np.nan)
+            if window <= n_rows:
+                sums = cum_values[window:] - cum_values[:-window]
+                counts = cum_valid[window:] - cum_valid[:-window]
+                out[window - 1:] = np.where(counts == window, sums, np.nan)
+            return out
+        return self._cached(("rolling_sum", window, power), compute)
+
+    def true_range(self) -> np.ndarray:
+        """真实波幅 max(high - low, |high - 前收|, |low - 前收|)"""
+        if self.high is None or self.low is None:
+            raise ValueError("计算 ATR 需要 high 和 low")
+
+        def compute():
+            prev_close = _shift(_ffill(self.close))
+            high_low = self.high - self.low
+            # fmax 忽略 NaN: 没有前收 (第一根K线) 时退化为 high - low
+            tr = np.fmax(high_low, np.fmax(np.abs(self.high - prev_close), np.abs(self.low - prev_close)))
+            return np.where(np.isnan(high_low), np.nan, tr)
+        return self._cached(("true_range",), compute)
+
+    def price_change(self) -> np.ndarray:
+        """相对上一个有效收盘价的涨跌额; 当天没有数据时为 NaN"""
+        def compute():
+            return self.close - _shift(_ffill(self.close))
+        return self._cached(("price_change",), compute)
+
+    # ---------- 指标 ----------
+
+    def sma(self, window: int = 20) -> np.ndarray:
+        """简单移动平均"""
+        return self._cached(("sma", window), lambda: self.rolling_sum(window) / window)
+
+    def rolling_std(self, window: int = 20, ddof: int = 0) -> np.ndarray:
+        """滚动标准差, 由滚动和与滚动平方和计算"""
+        def compute():
+            sums = self.rolling_sum(window)
+            squares = self.rolling_sum(window, power=2)
+            variance = (squares - sums * sums / window) / (window - ddof)
+            return np.sqrt(np.maximum(variance, 0.0))
+        return self._cached(("rolling_std", window, ddof), compute)
+
+    def bollinger(self, window: int = 20, num_std: float = 2.0) -> tuple:
+        """布林带
+
+        Returns:
+            tuple: (中轨, 上轨, 下轨)
+        """
+        middle = self.sma(window)
+        width = num_std * self.rolling_std(window)
+        return middle, middle + width, middle - width
+
+    def ema(self, window: int = 12) -> np.ndarray:
+        """指数移动平均 (alpha = 2 / (window + 1), 以前 window 个值的 SMA 为初值)"""
+        return self._cached(("ema", window), lambda: _recursive_average(self.close, window, 2.0 / (window + 1)))
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple:
+        """MACD
+
+        Returns:
+            tuple: (MACD 线, 信号线, 柱)
+        """
+        def compute():
+            line = self.ema(fast) - self.ema(slow)
+            signal_line = _recursive_average(line, signal, 2.0 / (signal + 1))
+            return line, signal_line, line - signal_line
+        return self._cached(("macd", fast, slow, signal), compute)
+
+    def rsi(self, window: int = 14) -> np.ndarray:
+        """相对强弱指数 (Wilder 平滑)"""
+        def compute():
+            change = self.price_change()
+            gains = np.where(np.isnan(change), np.nan, np.maximum(change, 0.0))
+            losses = np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0))
+            avg_gain = _recursive_average(gains, window, 1.0 / window)
+            avg_loss = _recursive_average(losses, window, 1.0 / window)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rs = avg_gain / avg_loss
+                out = 100.0 - 100.0 / (1.0 + rs)
+            out = np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, out)
+            return out
+        return self._cached(("rsi", window), compute)
+
+    def atr(self, window: int = 14) -> np.ndarray:
+        """平均真实波幅 (Wilder 平滑)"""
+        return self._cached(("atr", window), lambda: _recursive_average(self.true_range(), window, 1.0 / window))
+
+    def compute(self, specs: dict) -> dict:
+        """按配置批量计算指标
+
+        Args:
+            specs (dict): {结果名: (指标名, 参数 dict)}, 例如 {"sma_20": ("sma", {"window": 20})}
+
+        Returns:
+            dict: {结果名: ndarray (T, N) 或 tuple}
+        """
+        return {name: getattr(self, indicator)(**params) for name, (indicator, params) in specs.items()}
+
+
+DEFAULT_INDICATORS = {
+    "sma_20": ("sma", {"window": 20}),
+    "ema_12": ("ema", {"window": 12}),
+    "ema_26": ("ema", {"window": 26}),
+    "rsi_14": ("rsi", {"window": 14}),
+    "atr_14": ("atr", {"window": 14}),
+    "bollinger_20": ("bollinger", {"window": 20, "num_std": 2.0}),
+    "macd": ("macd", {"fast": 12, "slow": 26, "signal": 9}),
+}
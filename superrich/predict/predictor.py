@@ -1,5 +1,295 @@
-# def predict_future(df: pd.DataFrame, days: int = 5) -> pd.DataFrame:
-#     """
-#     根据历史股价，预测未来 N 天走势
-#     """
-#     pass
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.logger_manager import get_logger
+from superrich.data.fetcher import normalize_stock_frame
+
+
+class ARModelParams:
+    """对数收益率 AR(p) 模型参数
+
+    Attributes:
+        lags (int): 自回归阶数 p
+        lookback (int): 拟合使用的最近收益率个数
+        ridge (float): 正规方程的岭项, 防止奇异
+    """
+
+    def __init__(self, lags: int = 5, lookback: int = 250, ridge: float = 1e-6):
+        self.lags = lags
+        self.lookback = lookback
+        self.ridge = ridge
+
+    @classmethod
+    def from_config(cls, predict_config: dict) -> "ARModelParams":
+        return cls(
+            lags=predict_config.get("lags", 5),
+            lookback=predict_config.get("lookback", 250),
+            ridge=predict_config.get("ridge", 1e-6),
+        )
+
+    def key(self) -> tuple:
+        return ("ar", self.lags, self.lookback, self.ridge)
+
+    def min_bars(self) -> int:
+        """至少需要的K线数: lags 个滞后项 + lags 个样本 + 1 根计算收益率"""
+        return 2 * self.lags + 2
+
+
+class FittedModel:
+    """已拟合的模型: 系数 (截距在前), 残差标准差, 以及预测所需的最近状态"""
+
+    __slots__ = ("coef", "sigma", "last_returns", "last_close", "last_date")
+
+    def __init__(self, coef: np.ndarray, sigma: float, last_returns: np.ndarray, last_close: float, last_date: pd.Timestamp):
+        self.coef = coef
+        self.sigma = sigma
+        self.last_returns = last_returns
+        self.last_close = last_close
+        self.last_date = last_date
+
+
+def _log_returns(df: pd.DataFrame, lookback: int) -> np.ndarray:
+    """最近 lookback 个对数收益率 (跳过缺失的收盘价)"""
+    close = df["close"].to_numpy(dtype=np.float64)
+    close = close[~np.isnan(close)]
+    return np.diff(np.log(close))[-lookback:]
+
+
+def _design(returns: np.ndarray, lags: int) -> tuple:
+    """由一组等长收益率序列构造批量设计矩阵
+
+    Args:
+        returns (np.ndarray): (S, n) 收益率
+        lags (int): 滞后阶数
+
+    Returns:
+        tuple: X (S, n - lags, lags + 1) 第 0 列为截距, y (S, n - lags)
+    """
+    n_series, n_obs = returns.shape
+    windows = np.lib.stride_tricks.sliding_window_view(returns, lags, axis=1)[:, :-1, ::-1]
+    X = np.concatenate([np.ones((n_series, n_obs - lags, 1)), windows], axis=2)
+    return X, returns[:, lags:]
+
+
+def fit_batch(returns: np.ndarray, params: ARModelParams) -> tuple:
+    """一次拟合多条等长序列: 叠加正规方程后批量求解
+
+    Returns:
+        tuple: (coef (S, lags + 1), sigma (S,))
+    """
+    X, y = _design(returns, params.lags)
+    XtX = np.einsum("snp,snq->spq", X, X)
+    Xty = np.einsum("snp,sn->sp", X, y)
+    XtX += params.ridge * np.eye(params.lags + 1)
+    coef = np.linalg.solve(XtX, Xty[..., None])[..., 0]
+    residuals = y - np.einsum("snp,sp->sn", X, coef)
+    dof = max(y.shape[1] - params.lags - 1, 1)
+    sigma = np.sqrt((residuals ** 2).sum(axis=1) / dof)
+    return coef, sigma
+
+
+def forecast_batch(models: list, days: int) -> tuple:
+    """对多个已拟合模型一次性递推预测
+
+    Returns:
+        tuple: (预测对数收益率 (S, days), 预测收盘价 (S, days), 对数价格标准差 (S, days))
+    """
+    coef = np.stack([m.coef for m in models])
+    state = np.stack([m.last_returns for m in models]).copy()  # (S, lags), 最近的在前
+    sigma = np.array([m.sigma for m in models])
+    last_close = np.array([m.last_close for m in models])
+    predicted = np.empty((len(models), days))
+    for step in range(days):
+        r = coef[:, 0] + np.einsum("sp,sp->s", coef[:, 1:], state)
+        predicted[:, step] = r
+        state[:, 1:] = state[:, :-1]
+        state[:, 0] = r
+    prices = last_close[:, None] * np.exp(np.cumsum(predicted, axis=1))
+    spread = sigma[:, None] * np.sqrt(np.arange(1, days + 1))[None, :]
+    return predicted, prices, spread
+
+
+def _to_prediction_frame(model: FittedModel, returns: np.ndarray, prices: np.ndarray, spread: np.ndarray) -> pd.DataFrame:
+    dates = pd.bdate_range(model.last_date + pd.offsets.BDay(1), periods=len(prices), name="date")
+    return pd.DataFrame({
+        "predicted_return": returns,
+        "predicted_close": prices,
+        "lower": prices * np.exp(-1.96 * spread),
+        "upper": prices * np.exp(1.96 * spread),
+    }, index=dates)
+
+
+class ModelCache:
+    """已拟合模型的 LRU 缓存, 键为 (股票代码, 最后一根K线日期, 模型参数)
+
+    有新K线时最后日期变化, 自然不会命中旧模型。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> FittedModel:
+        with self._lock:
+            model = self._entries.get(key)
+            if model is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return model
+
+    def put(self, key: tuple, model: FittedModel):
+        with self._lock:
+            self._entries[key] = model
+            self._entries.move_to_end(key)
+            # 同一股票旧日期的模型不会再被使用
+            for stale in [k for k in self._entries if k[0] == key[0] and k[1] != key[1]]:
+                del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class Predictor:
+    """股价预测服务: 模型按 (股票, 最后K线日期, 参数) 缓存, 只有新数据到来时才重新拟合"""
+
+    def __init__(
+        self, data_factory=None, params: ARModelParams = None, history_days: int = 730, max_models: int = 1024, max_cache_age_days: int = 5
+    ):
+        self.data_factory = data_factory
+        self.params = params if params is not None else ARModelParams()
+        self.history_days = history_days
+        self.max_cache_age_days = max_cache_age_days
+        self.model_cache = ModelCache(max_models)
+
+    @classmethod
+    def from_config(cls, config: dict, data_factory=None) -> "Predictor":
+        predict_config = config.get("predict", {})
+        return cls(
+            data_factory=data_factory,
+            params=ARModelParams.from_config(predict_config),
+            history_days=predict_config.get("history_days", 730),
+            max_models=predict_config.get("max_models", 1024),
+            max_cache_age_days=predict_config.get("max_cache_age_days", 5),
+        )
+
+    def _cache_key(self, ticker: str, last_date: pd.Timestamp) -> tuple:
+        return (ticker, last_date, self.params.key())
+
+    def _fit_models(self, frames: dict) -> dict:
+        """为 {股票: 数据} 拟合模型; 等长的收益率序列分为一组, 每组一次批量求解"""
+        prepared = {}
+        for ticker, df in frames.items():
+            returns = _log_returns(df, self.params.lookback)
+            if len(returns) < self.params.min_bars() - 1:
+                get_logger().warning("%s 数据不足 (%s 个收益率), 无法预测", ticker, len(returns))
+                continue
+            prepared[ticker] = (df, returns)
+
+        groups = {}
+        for ticker, (_, returns) in prepared.items():
+            groups.setdefault(len(returns), []).append(ticker)
+
+        models = {}
+        for tickers in groups.values():
+            coef, sigma = fit_batch(np.stack([prepared[t][1] for t in tickers]), self.params)
+            for i, ticker in enumerate(tickers):
+                df, returns = prepared[ticker]
+                close = df["close"].dropna()
+                models[ticker] = FittedModel(
+                    coef=coef[i],
+                    sigma=float(sigma[i]),
+                    last_returns=returns[-self.params.lags:][::-1].copy(),
+                    last_close=float(close.iloc[-1]),
+                    last_date=close.index[-1],
+                )
+        return models
+
+    def predict_frames(self, frames: dict, days: int = 5) -> dict:
+        """对已有数据的多只股票做预测
+
+        Args:
+            frames (dict): {股票代码: DataFrame}
+            days (int, optional): 预测交易日数. Defaults to 5.
+
+        Returns:
+            dict: {股票代码: 预测 DataFrame}, 数据不足的股票不在结果中
+        """
+        models = {}
+        to_fit = {}
+        for ticker, df in frames.items():
+            df = normalize_stock_frame(df)
+            if df.empty:
+                continue
+            key = self._cache_key(ticker, df.index[-1])
+            model = self.model_cache.get(key)
+            if model is not None:
+                models[ticker] = model
+            else:
+                to_fit[ticker] = df
+        if to_fit:
+            fitted = self._fit_models(to_fit)
+            for ticker, model in fitted.items():
+                self.model_cache.put(self._cache_key(ticker, to_fit[ticker].index[-1]), model)
+            models.update(fitted)
+        if not models:
+            return {}
+
+        tickers = list(models.keys())
+        ordered = [models[t] for t in tickers]
+        returns, prices, spread = forecast_batch(ordered, days)
+        return {
+            ticker: _to_prediction_frame(ordered[i], returns[i], prices[i], spread[i])
+            for i, ticker in enumerate(tickers)
+        }
+
+    def predict_many(self, symbols: list, days: int = 5) -> dict:
+        """批量预测: 一次批量获取历史数据, 未缓存的模型一次批量拟合, 所有股票一次向量化预测
+
+        历史窗口以缓存的最后一根K线为终点, 缓存未超过 max_cache_age_days 的股票不会请求上游;
+        没有新K线时模型缓存命中, 不重新拟合。
+
+        Returns:
+            dict: {股票代码: 预测 DataFrame}
+        """
+        if self.data_factory is None:
+            raise ValueError("predict_many 需要 data_factory")
+        frames = self.data_factory.GET_LATEST_HISTORY_BATCH(
+            symbols, self.history_days, max_cache_age_days=self.max_cache_age_days
+        )
+        return self.predict_frames(frames, days)
+
+    def predict(self, symbol: str, days: int = 5) -> pd.DataFrame:
+        """预测单只股票, 没有足够数据时返回空 DataFrame"""
+        return self.predict_many([symbol], days).get(symbol, pd.DataFrame())
+
+
+def predict_future(df: pd.DataFrame, days: int = 5) -> pd.DataFrame:
+    """
+    根据历史股价，预测未来 N 天走势
+
+    Args:
+        df (pd.DataFrame): 历史数据, 需要 close 列
+        days (int, optional): 预测交易日数. Defaults to 5.
+
+    Returns:
+        pd.DataFrame: 以 date 为索引, 列为 predicted_return / predicted_close / lower / upper
+    """
+    df = normalize_stock_frame(df)
+    params = ARModelParams()
+    if df.empty or len(_log_returns(df, params.lookback)) < params.min_bars() - 1:
+        return pd.DataFrame()
+    return Predictor(params=params).predict_frames({"_": df}, days)["_"]
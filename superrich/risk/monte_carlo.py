@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from superrich.data.processor import build_price_panel
+from superrich.risk.risk_engine import returns_matrix
+
+
+def _histogram_edges(center: np.ndarray, scale: np.ndarray, bins: int, width: float = 8.0) -> np.ndarray:
+    """每只股票一组等宽分箱边界 (N, bins + 1), 覆盖 center ± width * scale"""
+    scale = np.where(scale > 0, scale, 1e-6)
+    steps = np.linspace(-width, width, bins + 1)
+    return center[:, None] + scale[:, None] * steps[None, :]
+
+
+def _simulate_chunk(kind: str, model: dict, n_paths: int, horizon: int, seed, edges: np.ndarray, drawdown_threshold: float) -> dict:
+    """生成一块路径并返回可合并的汇总量 (在子进程中运行)
+
+    路径为 (n_paths, horizon, N) 的对数收益率块, 计算完汇总量后即丢弃。
+    各步尽量原地计算, 峰值只有两份 (n_paths, horizon, N) float64 (路径 + 历史最高), 与 _chunk_sizes 的估算一致。
+    """
+    rng = np.random.default_rng(seed)
+    if kind == "gbm":
+        drift = model["mu"] - 0.5 * model["sigma"] ** 2
+        increments = rng.standard_normal((n_paths, horizon, len(drift)))
+        increments *= model["sigma"]
+        increments += drift
+    elif kind == "bootstrap":
+        rows = rng.integers(0, len(model["returns"]), size=(n_paths, horizon))
+        # 整行抽样, 保留同一天各股票之间的相关性
+        increments = model["returns"][rows]
+    else:
+        raise ValueError(f"不支持的模拟方法: {kind}")
+
+    log_paths = np.cumsum(increments, axis=1, out=increments)
+    terminal = log_paths[:, -1, :].copy()
+
+    # 最大回撤: 1 - exp(当前对数价格 - 历史最高对数价格), 起点对数价格为 0
+    running_max = np.maximum.accumulate(log_paths, axis=1)
+    np.maximum(running_max, 0.0, out=running_max)
+    np.subtract(log_paths, running_max, out=running_max)
+    max_drawdown = 1.0 - np.exp(running_max.min(axis=1))
+    del increments, log_paths, running_max
+
+    n_tickers = terminal.shape[1]
+    bins = edges.shape[1] - 1
+    lo = edges[:, 0]
+    width = edges[:, 1] - edges[:, 0]
+    index = np.clip(((terminal - lo) / width).astype(np.int64), 0, bins - 1)
+    flat = index + np.arange(n_tickers)[None, :] * bins
+    hist = np.bincount(flat.ravel(), minlength=n_tickers * bins).reshape(n_tickers, bins)
+
+    return {
+        "count": n_paths,
+        "hist": hist,
+        "sum": terminal.sum(axis=0),
+        "sumsq": (terminal ** 2).sum(axis=0),
+        "loss": (terminal < 0).sum(axis=0),
+        "drawdown": (max_drawdown >= drawdown_threshold).sum(axis=0),
+        "max_drawdown_sum": max_drawdown.sum(axis=0),
+    }
+
+
+def _merge(total: dict, part: dict) -> dict:
+    if total is None:
+        return part
+    return {key: total[key] + part[key] for key in total}
+
+
+def _histogram_quantiles(hist: np.ndarray, edges: np.ndarray, qs: list) -> np.ndarray:
+    """由分箱计数估计分位数 (箱内线性插值), 返回 (N, len(qs))"""
+    cum = np.cumsum(hist, axis=1)
+    total = cum[:, -1:]
+    out = np.empty((hist.shape[0], len(qs)))
+    for k, q in enumerate(qs):
+        target = q * total
+        idx = np.minimum((cum < target).sum(axis=1), hist.shape[1] - 1)
+        rows = np.arange(hist.shape[0])
+        before = np.where(idx > 0, cum[rows, np.maximum(idx - 1, 0)], 0)
+        inside = np.maximum(hist[rows, idx], 1)
+        frac = np.clip((target[:, 0] - before) / inside, 0.0, 1.0)
+        out[:, k] = edges[rows, idx] + frac * (edges[rows, idx + 1] - edges[rows, idx])
+    return out
+
+
+class MonteCarloSimulator:
+    """多进程蒙特卡洛价格路径模拟 (GBM / 历史收益率自助抽样)
+
+    路径按块生成, 每块大小受 chunk_mb 限制; 每块只返回分箱直方图、求和等可合并的汇总量,
+    因此内存占用与路径总数无关。每块的随机种子由 SeedSequence(seed).spawn 派生,
+    结果与进程数无关, 可以复现。
+    """
+
+    def __init__(self, n_paths: int = 10000, horizon: int = 20, chunk_mb: float = 64, workers: int = 1, seed: int = None,
+                 bins: int = 512, drawdown_threshold: float = 0.2, quantiles: tuple = (0.05, 0.5, 0.95)):
+        self.n_paths = n_paths
+        self.horizon = horizon
+        self.chunk_bytes = int(chunk_mb * 1024 * 1024)
+        self.workers = workers
+        self.seed = seed
+        self.bins = bins
+        self.drawdown_threshold = drawdown_threshold
+        self.quantiles = tuple(quantiles)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "MonteCarloSimulator":
+        mc_config = config.get("monte_carlo", {})
+        return cls(
+            n_paths=mc_config.get("n_paths", 10000),
+            horizon=mc_config.get("horizon", 20),
+            chunk_mb=mc_config.get("chunk_mb", 64),
+            workers=mc_config.get("workers", 1),
+            seed=mc_config.get("seed"),
+            bins=mc_config.get("bins", 512),
+            drawdown_threshold=mc_config.get("drawdown_threshold", 0.2),
+        )
+
+    def _chunk_sizes(self, n_tickers: int) -> list:
+        # _simulate_chunk 峰值为两份 (n_paths, horizon, N) float64: 路径 (原地累加) 和历史最高 (原地求回撤)
+        per_path = max(self.horizon * n_tickers * 8 * 2, 1)
+        chunk_paths = max(1, min(self.n_paths, self.chunk_bytes // per_path))
+        sizes = [chunk_paths] * (self.n_paths // chunk_paths)
+        if self.n_paths % chunk_paths:
+            sizes.append(self.n_paths % chunk_paths)
+        return sizes
+
+    def _run(self, kind: str, model: dict, n_tickers: int, edges: np.ndarray) -> dict:
+        sizes = self._chunk_sizes(n_tickers)
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        args = [(kind, model, size, self.horizon, seed, edges, self.drawdown_threshold) for size, seed in zip(sizes, seeds)]
+        total = None
+        if self.workers is None or self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                for part in executor.map(_simulate_chunk, *zip(*args)):
+                    total = _merge(total, part)
+        else:
+            for arg in args:
+                total = _merge(total, _simulate_chunk(*arg))
+        return total
+
+    def _summary(self, total: dict, s0: np.ndarray, edges: np.ndarray, tickers: list) -> pd.DataFrame:
+        count = total["count"]
+        mean = total["sum"] / count
+        std = np.sqrt(np.maximum(total["sumsq"] / count - mean ** 2, 0.0))
+        summary = {
+            "s0": s0,
+            "mean_log_return": mean,
+            "std_log_return": std,
+            "prob_loss": total["loss"] / count,
+            "prob_drawdown": total["drawdown"] / count,
+            "mean_max_drawdown": total["max_drawdown_sum"] / count,
+        }
+        quantiles = _histogram_quantiles(total["hist"], edges, list(self.quantiles))
+        for k, q in enumerate(self.quantiles):
+            summary[f"price_q{int(round(q * 100)):02d}"] = s0 * np.exp(quantiles[:, k])
+        return pd.DataFrame(summary, index=pd.Index(tickers, name="symbol"))
+
+    def simulate_gbm(self, s0: np.ndarray, mu: np.ndarray, sigma: np.ndarray, tickers: list) -> pd.DataFrame:
+        """几何布朗运动
+
+        Args:
+            s0 (np.ndarray): (N,) 初始价格
+            mu (np.ndarray): (N,) 每日对数收益率均值 + sigma^2 / 2 (即简单收益率的漂移)
+            sigma (np.ndarray): (N,) 每日波动率
+            tickers (list): 股票代码
+
+        Returns:
+            pd.DataFrame: 每只股票一行的汇总
+        """
+        mu, sigma, s0 = (np.asarray(x, dtype=np.float64) for x in (mu, sigma, s0))
+        center = (mu - 0.5 * sigma ** 2) * self.horizon
+        edges = _histogram_edges(center, sigma * np.sqrt(self.horizon), self.bins)
+        total = self._run("gbm", {"mu": mu, "sigma": sigma}, len(tickers), edges)
+        return self._summary(total, s0, edges, tickers)
+
+    def simulate_bootstrap(self, returns: np.ndarray, s0: np.ndarray, tickers: list) -> pd.DataFrame:
+        """从历史对数收益率 (T, N) 中按天整行有放回抽样"""
+        returns = np.nan_to_num(np.asarray(returns, dtype=np.float64), nan=0.0)
+        s0 = np.asarray(s0, dtype=np.float64)
+        center = returns.mean(axis=0) * self.horizon
+        edges = _histogram_edges(center, returns.std(axis=0) * np.sqrt(self.horizon), self.bins)
+        total = self._run("bootstrap", {"returns": returns}, len(tickers), edges)
+        return self._summary(total, s0, edges, tickers)
+
+    def simulate_frames(self, frames: dict, method: str = "gbm") -> pd.DataFrame:
+        """由 DataFactory 数据估计参数并模拟, s0 取每只股票最后一个收盘价"""
+        panel = build_price_panel(frames, fields=("close",))
+        returns = returns_matrix(panel)
+        close = pd.DataFrame(panel["close"]).ffill().to_numpy()
+        s0 = close[-1]
+        if method == "bootstrap":
+            return self.simulate_bootstrap(returns, s0, panel.tickers)
+        sigma = np.nanstd(returns, axis=0, ddof=1)
+        mu = np.nanmean(returns, axis=0) + 0.5 * sigma ** 2
+        return self.simulate_gbm(s0, mu, sigma, panel.tickers)
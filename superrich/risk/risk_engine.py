@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import warnings
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from superrich.data.fetcher import normalize_stock_frame
+from superrich.data.processor import PricePanel, build_price_panel
+
+
+def returns_matrix(panel: PricePanel, log: bool = True) -> np.ndarray:
+    """由价格块计算收益率矩阵
+
+    Args:
+        panel (PricePanel): build_price_panel 的结果
+        log (bool, optional): True 为对数收益率, False 为简单收益率. Defaults to True.
+
+    Returns:
+        np.ndarray: (T - 1, N), 当天或前一天缺失的位置为 NaN
+    """
+    close = panel["close"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if log:
+            return np.diff(np.log(close), axis=0)
+        return close[1:] / close[:-1] - 1.0
+
+
+def _demeaned(returns: np.ndarray, weights: np.ndarray = None) -> tuple:
+    """去均值并把 NaN 置 0 (缺失的收益率视为等于均值, 不贡献协方差)
+
+    Returns:
+        tuple: (均值 (N,), 去均值后的矩阵 (T, N))
+    """
+    valid = ~np.isnan(returns)
+    filled = np.where(valid, returns, 0.0)
+    if weights is None:
+        counts = np.maximum(valid.sum(axis=0), 1)
+        mean = filled.sum(axis=0) / counts
+    else:
+        w = weights[:, None] * valid
+        mean = (w * filled).sum(axis=0) / np.maximum(w.sum(axis=0), 1e-300)
+    return mean, np.where(valid, returns - mean, 0.0)
+
+
+def _pairwise_counts(returns: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+    """每对股票同时有收益率的观测数 (或权重和), (N, N)
+
+    并集日期的价格块中, 上市较晚的股票前面都是 NaN; 协方差必须按两只股票共同有效的观测归一化,
+    否则按总行数归一化会把这些股票的方差和协方差压小, 低估参数法 VaR。
+    """
+    valid = (~np.isnan(returns)).astype(np.float64)
+    if weights is None:
+        return valid.T @ valid
+    return (valid * weights[:, None]).T @ valid
+
+
+def sample_covariance(returns: np.ndarray) -> tuple:
+    """样本协方差 (成对有效观测归一化), 两次矩阵乘法
+
+    Returns:
+        tuple: (均值 (N,), 协方差 (N, N)); 没有至少两个共同观测的股票对协方差为 0
+    """
+    mean, centered = _demeaned(returns)
+    counts = _pairwise_counts(returns)
+    cov = np.where(counts >= 2, centered.T @ centered / np.maximum(counts - 1, 1), 0.0)
+    return mean, cov
+
+
+def iter_rolling_covariance(returns: np.ndarray, window: int, step: int = 1):
+    """滚动窗口协方差, 每个窗口一次矩阵乘法
+
+    N 较大时 (N, N) 矩阵很占内存, 因此逐个窗口生成, 不一次保存全部。
+
+    Yields:
+        tuple: (窗口最后一行的下标, 均值 (N,), 协方差 (N, N))
+    """
+    for end in range(window, len(returns) + 1, step):
+        mean, cov = sample_covariance(returns[end - window:end])
+        yield end - 1, mean, cov
+
+
+def ewma_covariance(returns: np.ndarray, halflife: float = None, lam: float = 0.94) -> tuple:
+    """指数加权协方差 (RiskMetrics)
+
+    Args:
+        returns (np.ndarray): (T, N) 收益率
+        halflife (float, optional): 半衰期 (交易日), 指定时覆盖 lam
+        lam (float, optional): 衰减系数. Defaults to 0.94.
+
+    Returns:
+        tuple: (加权均值 (N,), 协方差 (N, N))
+    """
+    if halflife is not None:
+        lam = 0.5 ** (1.0 / halflife)
+    n_rows = len(returns)
+    weights = (1.0 - lam) * lam ** np.arange(n_rows - 1, -1, -1, dtype=np.float64)
+    weights /= weights.sum()
+    mean, centered = _demeaned(returns, weights)
+    scaled = centered * np.sqrt(weights)[:, None]
+    # 按每对股票共同有效日期上的权重和重新归一化
+    pair_weights = _pairwise_counts(returns, weights)
+    cov = np.where(pair_weights > 0, scaled.T @ scaled / np.maximum(pair_weights, 1e-300), 0.0)
+    return mean, cov
+
+
+class RiskEngine:
+    """组合风险: 协方差只计算一次, 所有组合共用
+
+    组合权重为 (P, N) 矩阵, 每种方法对全部组合一次矩阵运算完成。
+    VaR / CVaR 以正数表示损失 (收益率单位)。
+    """
+
+    def __init__(self, returns: np.ndarray, tickers: list, method: str = "sample", window: int = None, halflife: float = None, lam: float = 0.94):
+        """
+        Args:
+            returns (np.ndarray): (T, N) 收益率
+            tickers (list): 股票代码
+            method (str, optional): sample / ewma. Defaults to "sample".
+            window (int, optional): 只使用最近 window 个收益率
+            halflife (float, optional): ewma 半衰期
+            lam (float, optional): ewma 衰减系数
+        """
+        if window is not None:
+            returns = returns[-window:]
+        self.returns = returns
+        self.tickers = list(tickers)
+        self._ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        if method == "ewma":
+            self.mean, self.cov = ewma_covariance(returns, halflife=halflife, lam=lam)
+        elif method == "sample":
+            self.mean, self.cov = sample_covariance(returns)
+        else:
+            raise ValueError(f"不支持的协方差方法: {method}")
+
+    @classmethod
+    def from_frames(cls, frames: dict, log: bool = True, **kwargs) -> "RiskEngine":
+        panel = build_price_panel(frames, fields=("close",))
+        return cls(returns_matrix(panel, log=log), panel.tickers, **kwargs)
+
+    def weight_matrix(self, portfolios: dict) -> tuple:
+        """把 {组合名: {股票代码: 权重}} 转为 (P, N) 权重矩阵, 不在数据中的股票被忽略
+
+        Returns:
+            tuple: (组合名列表, 权重矩阵)
+        """
+        names = list(portfolios.keys())
+        weights = np.zeros((len(names), len(self.tickers)))
+        for i, name in enumerate(names):
+            for ticker, weight in portfolios[name].items():
+                j = self._ticker_pos.get(ticker)
+                if j is not None:
+                    weights[i, j] = weight
+        return names, weights
+
+    def portfolio_moments(self, weights: np.ndarray) -> tuple:
+        """组合的期望收益和波动率
+
+        Returns:
+            tuple: (均值 (P,), 标准差 (P,))
+        """
+        mu = weights @ self.mean
+        variance = np.einsum("pn,pn->p", weights @ self.cov, weights)
+        return mu, np.sqrt(np.maximum(variance, 0.0))
+
+    def parametric_var(self, weights: np.ndarray, confidence: float = 0.95, horizon: int = 1) -> tuple:
+        """正态假设下的 VaR / CVaR
+
+        Returns:
+            tuple: (VaR (P,), CVaR (P,))
+        """
+        normal = NormalDist()
+        z = normal.inv_cdf(1.0 - confidence)
+        mu, sigma = self.portfolio_moments(weights)
+        mu, sigma = mu * horizon, sigma * np.sqrt(horizon)
+        var = -(mu + z * sigma)
+        cvar = -(mu - sigma * normal.pdf(z) / (1.0 - confidence))
+        return var, cvar
+
+    def portfolio_returns(self, weights: np.ndarray) -> np.ndarray:
+        """历史组合收益率 (T, P)
+
+        组合中任一持仓 (权重非 0) 当天缺少收益率时该组合当天为 NaN, 不把缺失按 0% 计入历史分布。
+        """
+        pnl = np.nan_to_num(self.returns, nan=0.0) @ weights.T
+        missing = np.isnan(self.returns).astype(np.float64) @ (weights != 0).T.astype(np.float64)
+        pnl[missing > 0] = np.nan
+        return pnl
+
+    def historical_var(self, weights: np.ndarray, confidence: float = 0.95, horizon: int = 1) -> tuple:
+        """历史模拟法 VaR / CVaR, 多日按 sqrt(horizon) 缩放
+
+        Returns:
+            tuple: (VaR (P,), CVaR (P,))
+        """
+        pnl = self.portfolio_returns(weights)
+        valid = ~np.isnan(pnl)
+        if len(pnl) == 0 or not valid.any():
+            nan = np.full(weights.shape[0], np.nan)
+            return nan, nan
+        with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+            # 只在该组合所有持仓都有数据的日期上取分位数; 没有有效日期的组合结果为 NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            cutoff = np.nanquantile(pnl, 1.0 - confidence, axis=0)
+            tail = valid & (pnl <= cutoff)
+        cvar = -(np.where(tail, pnl, 0.0).sum(axis=0) / np.maximum(tail.sum(axis=0), 1))
+        cvar[np.isnan(cutoff)] = np.nan
+        scale = np.sqrt(horizon)
+        return -cutoff * scale, cvar * scale
+
+    def report(self, portfolios: dict, confidence: float = 0.95, horizon: int = 1) -> pd.DataFrame:
+        """所有组合的风险汇总
+
+        Returns:
+            pd.DataFrame: 以组合名为索引, 列为 mean / volatility / var_hist / cvar_hist / var_param / cvar_param
+        """
+        names, weights = self.weight_matrix(portfolios)
+        mu, sigma = self.portfolio_moments(weights)
+        var_hist, cvar_hist = self.historical_var(weights, confidence, horizon)
+        var_param, cvar_param = self.parametric_var(weights, confidence, horizon)
+        return pd.DataFrame({
+            "mean": mu,
+            "volatility": sigma,
+            "var_hist": var_hist,
+            "cvar_hist": cvar_hist,
+            "var_param": var_param,
+            "cvar_param": cvar_param,
+        }, index=pd.Index(names, name="portfolio"))
+
+
+def portfolio_risk_report(data_factory, portfolios: dict, start_date: str, end_date: str, confidence: float = 0.95, horizon: int = 1, **kwargs) -> pd.DataFrame:
+    """获取所有组合涉及的股票数据, 计算一次协方差, 输出全部组合的风险汇总
+
+    Args:
+        data_factory (DataFactory): 数据工厂
+        portfolios (dict): {组合名: {股票代码: 权重}}
+        start_date (str): 起始日期 (YYYY-MM-DD)
+        end_date (str): 结束日期 (YYYY-MM-DD)
+        confidence (float, optional): 置信度. Defaults to 0.95.
+        horizon (int, optional): 持有期 (交易日). Defaults to 1.
+        **kwargs: 传给 RiskEngine, 例如 method="ewma", halflife=30
+
+    Returns:
+        pd.DataFrame: RiskEngine.report 的结果
+    """
+    tickers = list(dict.fromkeys(t for weights in portfolios.values() for t in weights))
+    frames, _ = data_factory.GET_STOCK_DATA_BATCH(tickers, start_date, end_date)
+    # 缓存文件可能比请求的窗口更长, 截取到 [start_date, end_date]
+    frames = {t: normalize_stock_frame(df).loc[start_date:end_date] for t, df in frames.items() if df is not None}
+    engine = RiskEngine.from_frames(frames, **kwargs)
+    return engine.report(portfolios, confidence=confidence, horizon=horizon)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+夜间预计算: 刷新自选股缓存, 预先计算技术指标和预测结果, API 直接读取
+
+用法:
+    python -m superrich.scheduler --config config/config.json [--symbols AAPL,MSFT] [--restart]
+
+也可以在 scheduler.run_in_app 为 true 时由 app lifespan 按 run_at 每天运行。
+中途崩溃后再次运行同一天的任务, 会根据检查点跳过已完成的股票。
+"""
+
+import os
+import json
+import time
+import argparse
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from utils.file_reader import FileReader
+from utils.logger_manager import init_logger_from_dict, init_worker_logger, get_logger, worker_log_queue
+from superrich.data.processor import DEFAULT_INDICATORS
+from superrich.data.online_indicators import IndicatorStateStore, update_ticker_indicators
+from superrich.predict.predictor import ARModelParams, Predictor
+
+
+STAGES = ("refresh", "compute")
+
+
+def _atomic_write_json(path: str, data: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _json_float(value: float):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+class PrecomputeStore:
+    """预计算结果: 每只股票一个 JSON 文件 <output_dir>/<TICKER>.json"""
+
+    def __init__(self, output_dir: str = "data_cache/precomputed"):
+        self.output_dir = output_dir
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.output_dir, f"{symbol}.json")
+
+    def save(self, symbol: str, result: dict):
+        _atomic_write_json(self.path(symbol), result)
+
+    def load(self, symbol: str) -> dict:
+        """读取预计算结果, 没有时返回 None"""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            get_logger().error(f"读取预计算结果 {path} 时出错: {e}")
+            return None
+
+
+class Checkpoint:
+    """断点续跑: 记录当天每个阶段已完成的股票"""
+
+    def __init__(self, path: str, run_id: str):
+        self.path = path
+        self.run_id = run_id
+        self.done = {stage: set() for stage in STAGES}
+        self.finished = False
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception as e:
+            get_logger().error(f"读取检查点 {self.path} 时出错: {e}")
+            return
+        if state.get("run_id") != self.run_id:
+            return
+        for stage in STAGES:
+            self.done[stage] = set(state.get("done", {}).get(stage, []))
+        self.finished = state.get("finished", False)
+        get_logger().info(f"从检查点恢复 {self.run_id}: " + ", ".join(f"{s} 已完成 {len(self.done[s])}" for s in STAGES))
+
+    def mark(self, stage: str, symbols: list):
+        self.done[stage].update(symbols)
+        self.save()
+
+    def save(self):
+        _atomic_write_json(self.path, {
+            "run_id": self.run_id,
+            "done": {stage: sorted(symbols) for stage, symbols in self.done.items()},
+            "finished": self.finished,
+        })
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _last_bar(df) -> str:
+    """数据最后一根K线的日期 (YYYY-MM-DD)"""
+    index = df["date"] if "date" in df.columns else df.index
+    return str(np.datetime64(index.max(), "D"))
+
+
+def compute_chunk(frames: dict, specs: dict, params: dict, days: int, as_of: str, indicator_dir: str) -> dict:
+    """为一组股票计算最新指标和预测 (可在子进程中运行)
+
+    指标读取刷新阶段保存的在线指标状态, 状态落后于数据时只喂入新增的K线 (没有状态时从头构建并保存);
+    预测用 Predictor 一次批量拟合和预测。
+
+    Returns:
+        dict: {股票代码: 预计算结果}
+    """
+    indicator_store = IndicatorStateStore(indicator_dir)
+    predictor = Predictor(params=ARModelParams(**params))
+    predictions = predictor.predict_frames(frames, days)
+
+    results = {}
+    for ticker, df in frames.items():
+        indicator_set = indicator_store.load(ticker, specs)
+        if indicator_set is None or indicator_set.last_date is None or indicator_set.last_date < _last_bar(df):
+            values = update_ticker_indicators(ticker, df, indicator_store, specs)
+            indicator_set = indicator_store.load(ticker, specs)
+        else:
+            values = indicator_set.values
+        if indicator_set is None or indicator_set.last_date is None:
+            continue
+        latest = {}
+        for name, value in values.items():
+            if isinstance(value, tuple):
+                latest[name] = [_json_float(v) for v in value]
+            else:
+                latest[name] = _json_float(value)
+        result = {
+            "symbol": ticker,
+            "as_of": as_of,
+            "last_bar": indicator_set.last_date,
+            "indicators": latest,
+            "prediction": None,
+        }
+        pred = predictions.get(ticker)
+        if pred is not None:
+            result["prediction"] = {
+                "date": [str(d.date()) for d in pred.index],
+                **{col: [_json_float(v) for v in pred[col].to_numpy()] for col in pred.columns},
+            }
+        results[ticker] = result
+    return results
+
+
+class PrecomputeScheduler:
+    """夜间预计算任务
+
+    阶段:
+        refresh: 通过 DataFactory 刷新缓存 (有缓存的增量刷新, 没有缓存的批量获取), 保存时同时更新在线指标状态
+        compute: 按块读取在线指标状态并批量预测, 多块并行, 结果写入 PrecomputeStore
+    """
+
+    def __init__(self, config: dict, data_factory=None):
+        self.config = config
+        self.scheduler_config = config.get("scheduler", {})
+        self.predict_config = config.get("predict", {})
+        if data_factory is None:
+            # data_fetchers 模块导入时需要已初始化的 logger
+            from data_fetchers.data_factory import DataFactory
+            data_factory = DataFactory(config=config)
+        self.data_factory = data_factory
+        self.store = PrecomputeStore(self.scheduler_config.get("output_dir", "data_cache/precomputed"))
+        self.checkpoint_path = self.scheduler_config.get("checkpoint_path", "data_cache/precompute_checkpoint.json")
+        self.chunk_size = self.scheduler_config.get("chunk_size", 100)
+        self.refresh_workers = self.scheduler_config.get("refresh_workers", 4)
+        self.compute_workers = self.scheduler_config.get("compute_workers", 2)
+        self.predict_days = self.scheduler_config.get("predict_days", 5)
+        self.history_days = self.predict_config.get("history_days", 730)
+        # 在线指标状态与缓存文件放在同一目录, 由 DataFactory 保存新数据时更新
+        self.indicator_dir = data_factory.cache_dir
+
+    def watchlist(self) -> list:
+        symbols = list(self.scheduler_config.get("watchlist", []))
+        watchlist_file = self.scheduler_config.get("watchlist_file")
+        if watchlist_file and os.path.exists(watchlist_file):
+            with open(watchlist_file, "r", encoding="utf-8") as f:
+                symbols.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        return list(dict.fromkeys(symbols))
+
+    def _history_window(self) -> tuple:
+        """以今天为终点的窗口, 只用于首次下载没有缓存的股票"""
+        end_date = date.today()
+        start_date = end_date - timedelta(days=self.history_days)
+        return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+    def _refresh_one(self, symbol: str, start_date: str, end_date: str) -> bool:
+        if self.data_factory.cache_index.latest(symbol) is not None:
+            df = self.data_factory.REFRESH_STOCK_DATA(symbol)
+        else:
+            df = self.data_factory.GET_STOCK_DATA(symbol, start_date, end_date)
+        return df is not None and not df.empty
+
+    def run_refresh(self, symbols: list, checkpoint: Checkpoint) -> dict:
+        logger = get_logger()
+        start_date, end_date = self._history_window()
+        pending = [s for s in symbols if s not in checkpoint.done["refresh"]]
+        stats = {"symbols": 0, "failed": 0, "skipped": len(symbols) - len(pending)}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.refresh_workers), thread_name_prefix="precompute-refresh") as executor:
+            for chunk in _chunks(pending, self.chunk_size):
+                futures = {executor.submit(self._refresh_one, s, start_date, end_date): s for s in chunk}
+                done = []
+                for future in as_completed(futures):
+                    symbol = futures[future]
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        logger.error(f"刷新 {symbol} 时出错: {e}")
+                        ok = False
+                    stats["symbols"] += 1
+                    if ok:
+                        done.append(symbol)
+                    else:
+                        stats["failed"] += 1
+                # 失败的股票不写入检查点, 续跑时重试
+                checkpoint.mark("refresh", done)
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def run_compute(self, symbols: list, checkpoint: Checkpoint) -> dict:
+        logger = get_logger()
+        pending = [s for s in symbols if s not in checkpoint.done["compute"]]
+        stats = {"symbols": 0, "failed": 0, "skipped": len(symbols) - len(pending)}
+        params = {
+            "lags": self.predict_config.get("lags", 5),
+            "lookback": self.predict_config.get("lookback", 250),
+            "ridge": self.predict_config.get("ridge", 1e-6),
+        }
+        as_of = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(
+            max_workers=max(1, self.compute_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker_logger,
+            initargs=(self.config, worker_log_queue()),
+        ) as executor:
+            futures = {}
+            # 读缓存在主进程中完成, 子进程只做计算; 窗口以刷新阶段写入的缓存最后一根K线为终点, 不会再请求上游
+            for chunk in _chunks(pending, self.chunk_size):
+                frames = self.data_factory.GET_LATEST_HISTORY_BATCH(chunk, self.history_days)
+                stats["failed"] += len(chunk) - len(frames)
+                stats["symbols"] += len(chunk) - len(frames)
+                if frames:
+                    futures[executor.submit(
+                        compute_chunk, frames, DEFAULT_INDICATORS, params, self.predict_days, as_of, self.indicator_dir
+                    )] = list(frames)
+            for future in as_completed(futures):
+                chunk = futures[future]
+                stats["symbols"] += len(chunk)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"计算 {len(chunk)} 只股票的指标和预测时出错: {e}")
+                    stats["failed"] += len(chunk)
+                    continue
+                for symbol, result in results.items():
+                    self.store.save(symbol, result)
+                stats["failed"] += len(chunk) - len(results)
+                checkpoint.mark("compute", list(results))
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def run(self, symbols: list = None, restart: bool = False) -> dict:
+        """运行一次预计算
+
+        Args:
+            symbols (list, optional): 股票列表, None 表示读取 scheduler.watchlist
+            restart (bool, optional): 忽略当天检查点从头开始. Defaults to False.
+
+        Returns:
+            dict: 每个阶段的统计 {阶段: {"symbols", "failed", "skipped", "seconds", "symbols_per_second"}}
+        """
+        logger = get_logger()
+        symbols = self.watchlist() if symbols is None else list(dict.fromkeys(symbols))
+        checkpoint = Checkpoint(self.checkpoint_path, date.today().strftime("%Y-%m-%d"))
+        if not restart:
+            checkpoint.load()
+        if checkpoint.finished:
+            logger.info(f"{checkpoint.run_id} 的预计算已完成, 跳过")
+            return {}
+
+        logger.info(f"开始预计算 {len(symbols)} 只股票")
+        report = {}
+        for stage, runner in (("refresh", self.run_refresh), ("compute", self.run_compute)):
+            stats = runner(symbols, checkpoint)
+            stats["symbols_per_second"] = round(stats["symbols"] / stats["seconds"], 3) if stats["seconds"] else None
+            report[stage] = stats
+            logger.info(f"预计算阶段 {stage}: {stats}")
+
+        checkpoint.finished = len(checkpoint.done["compute"]) == len(symbols)
+        checkpoint.save()
+        return report
+
+
+def _seconds_until(run_at: str) -> float:
+    """距离下一次 HH:MM 的秒数"""
+    now = datetime.now()
+    hour, minute = (int(x) for x in run_at.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def run_daily(scheduler: PrecomputeScheduler, executor=None):
+    """每天 scheduler.run_at 运行一次预计算, 供 app lifespan 作为后台任务使用"""
+    logger = get_logger()
+    run_at = scheduler.scheduler_config.get("run_at", "02:00")
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(_seconds_until(run_at))
+        try:
+            await loop.run_in_executor(executor, scheduler.run)
+        except Exception as e:
+            logger.error(f"预计算任务出错: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="夜间预计算自选股的指标和预测")
+    parser.add_argument("--config", default="config/config.json", help="配置文件路径")
+    parser.add_argument("--symbols", default=None, help="逗号分隔的股票代码, 默认读取 scheduler.watchlist")
+    parser.add_argument("--restart", action="store_true", help="忽略当天检查点, 从头开始")
+    args = parser.parse_args()
+
+    config = FileReader.load_config(path=args.config)
+    init_logger_from_dict(config_dict=config)
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] if args.symbols else None
+    report = PrecomputeScheduler(config).run(symbols, restart=args.restart)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from superrich.backtest.backtest_engine import TRADING_DAYS, backtest, listed_close, param_grid
+
+
+def _frame(dates: pd.DatetimeIndex, close: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({"date": dates, "close": close})
+
+
+def _frames():
+    dates = pd.bdate_range("2020-01-01", periods=300)
+    aaa = _frame(dates, 100.0 * 1.001 ** np.arange(300))
+    # BBB 从第 100 个交易日开始上市, 第 150-152 行缺失
+    rows = np.r_[100:150, 153:300]
+    bbb = _frame(dates[rows], 50.0 * 1.002 ** rows)
+    return {"AAA": aaa, "BBB": bbb}, dates
+
+
+def test_listed_close_fills_gaps_only_inside_listing():
+    close = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [4.0, 3.0], [np.nan, np.nan]])
+    filled, active = listed_close(close)
+    np.testing.assert_array_equal(filled[:, 0], [np.nan, 2.0, 2.0, 4.0, np.nan])
+    np.testing.assert_array_equal(filled[:, 1], [1.0, 1.0, 1.0, 3.0, np.nan])
+    np.testing.assert_array_equal(active[:, 0], [False, False, True, True, False])
+    np.testing.assert_array_equal(active[:, 1], [False, True, True, True, False])
+
+
+def test_backtest_annualises_over_each_listed_span():
+    frames, _ = _frames()
+    results = backtest(frames, "momentum", param_grid(lookback=[1]))
+    assert sorted(results["symbol"]) == ["AAA", "BBB"]
+    by_symbol = results.set_index("symbol")
+
+    # 有效收益率日: AAA 299 天; BBB 上市后 199 天 (缺口由前值填充, 不减少天数)
+    for symbol, n_days in (("AAA", 299), ("BBB", 199)):
+        row = by_symbol.loc[symbol]
+        expected = (1.0 + row["total_return"]) ** (TRADING_DAYS / n_days) - 1.0
+        assert np.isclose(row["annual_return"], expected)
+        assert np.isfinite(row["sharpe"])
+        assert 0.0 < row["exposure"] <= 1.0
+
+    # 上市首日没有信号; 缺口期间收盘价沿用前值, 动量信号为 0, 空仓 3 天 (进场 / 离场 / 再进场共 3 次换仓)
+    bbb = by_symbol.loc["BBB"]
+    assert np.isclose(bbb["exposure"], (199 - 1 - 3) / 199)
+    assert bbb["trades"] == 3
+
+
+def test_backtest_sma_cross_grid_runs():
+    frames, _ = _frames()
+    results = backtest(frames, "sma_cross", param_grid(fast=[5], slow=[20]))
+    assert len(results) == 2
+    assert results[["total_return", "annual_return", "max_drawdown"]].notna().all().all()
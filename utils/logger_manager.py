@@ -3,11 +3,38 @@
 
 
 import logging
+import logging.handlers
+import atexit
+import queue
 import json
 import os
+import threading
+import multiprocessing
 from typing import Optional, Dict, Any
 
 _logger: Optional[logging.Logger] = None  # 全局 logger 对象
+_listener: Optional[logging.handlers.QueueListener] = None  # 队列模式下的后台写日志线程
+_handlers: list = []  # 主进程的控制台 / 文件 handler
+_worker_queue = None  # 进程池子进程的日志队列 (multiprocessing.Queue)
+_worker_listener: Optional[logging.handlers.QueueListener] = None  # 主进程中消费子进程日志的后台线程
+_worker_lock = threading.Lock()
+
+
+def _stop_listener():
+    """停止后台写日志线程, 写完队列中剩余的日志"""
+    global _listener, _worker_listener, _worker_queue
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_listener = None
+        _worker_queue = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(_stop_listener)
 
 
 def _setup_logger(config: Dict[str, Any]):
@@ -17,7 +44,7 @@ def _setup_logger(config: Dict[str, Any]):
     Args:
         config (dict): 日志配置字典
     """
-    global _logger
+    global _logger, _listener, _handlers
 
     log_config = config.get("logging", {})
 
@@ -27,27 +54,54 @@ def _setup_logger(config: Dict[str, Any]):
     log_level = log_config.get("level", "INFO").upper()
     log_format = log_config.get("format", "%(asctime)s - %(levelname)s - %(message)s")
     log_datefmt = log_config.get("datefmt", "%Y-%m-%d %H:%M:%S")
+    queue_mode = log_config.get("queue_mode", False)
+    max_bytes = log_config.get("max_bytes", 0)
+    backup_count = log_config.get("backup_count", 5)
 
     # 创建 logger
     logger = logging.getLogger("SuperRichLogger")
     logger.setLevel(getattr(logging, log_level, logging.INFO))
+    _stop_listener()
     logger.handlers.clear()  # 避免重复添加 handler
 
     formatter = logging.Formatter(fmt=log_format, datefmt=log_datefmt)
+    handlers = []
 
     # 控制台输出
     if enable_console:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    # spawn 子进程 (进程池 initializer) 退出时走 os._exit, 不执行 atexit, 因此子进程直接写, 不用队列;
+    # 进程池应使用 init_worker_logger 把日志交给主进程写, 这里只是没有传入队列时的回退
+    in_child_process = multiprocessing.parent_process() is not None
 
-    # 文件输出
-    if enable_file:
+    # 文件输出; 子进程不写文件: 与主进程共用同一路径时, 主进程轮转后子进程仍写已改名的旧文件,
+    # Windows 上子进程打开着文件还会使主进程的改名失败
+    if enable_file and not in_child_process:
         os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-        file_handler = logging.FileHandler(log_file_path, encoding="utf-8")
+        if max_bytes > 0:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+        else:
+            file_handler = logging.FileHandler(log_file_path, encoding="utf-8")
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-
+        handlers.append(file_handler)
+
+    if queue_mode and handlers and not in_child_process:
+        # QueueHandler.prepare 在调用方线程中完成消息插值 (record.getMessage), 放进队列;
+        # 按 format 格式化 (时间戳、文件名等) 和磁盘 I/O 在后台线程完成
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+
+    _handlers = handlers
     _logger = logger
     _logger.info("Logger initialized successfully.")
 
@@ -76,6 +130,47 @@ def init_logger_from_dict(config_dict: Dict[str, Any]):
     _setup_logger(config_dict)
 
 
+def worker_log_queue():
+    """获取进程池子进程的日志队列, 与配置一起作为 init_worker_logger 的 initargs 传给进程池
+
+    主进程中首次调用时创建队列, 并启动后台线程把子进程的日志写到主进程的控制台和文件 handler;
+    子进程中返回自己收到的队列, 没有时返回 None。
+    """
+    global _worker_queue, _worker_listener
+    if _logger is None:
+        raise RuntimeError("Logger not initialized. Call init_logger_from_file() or init_logger_from_dict() first.")
+    with _worker_lock:
+        if _worker_queue is None and multiprocessing.parent_process() is None:
+            _worker_queue = multiprocessing.get_context("spawn").Queue()
+            _worker_listener = logging.handlers.QueueListener(_worker_queue, *_handlers, respect_handler_level=True)
+            _worker_listener.start()
+        return _worker_queue
+
+
+def init_worker_logger(config_dict: Dict[str, Any], log_queue=None):
+    """进程池子进程的日志初始化 (用作 initializer)
+
+    日志记录放进 log_queue (worker_log_queue 的返回值), 由主进程写控制台和文件, 子进程不打开日志文件;
+    log_queue 为 None 时与 init_logger_from_dict 相同。子进程正常退出时 multiprocessing 会等队列中的记录发送完。
+    """
+    global _logger, _worker_queue
+    if log_queue is None:
+        init_logger_from_dict(config_dict)
+        return
+    log_level = config_dict.get("logging", {}).get("level", "INFO").upper()
+    logger = logging.getLogger("SuperRichLogger")
+    logger.setLevel(getattr(logging, log_level, logging.INFO))
+    logger.handlers.clear()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _worker_queue = log_queue
+    _logger = logger
+
+
+def shutdown_logger():
+    """停止队列模式的后台写日志线程 (应用退出时调用, 非队列模式下无操作)"""
+    _stop_listener()
+
+
 def get_logger() -> logging.Logger:
     """获取全局 logger 对象。"""
     if _logger is None:
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+进程内指标: 计数器和耗时直方图, 以 Prometheus 文本格式导出
+
+只依赖标准库; 每次记录只有一次 perf_counter、一次 bisect 和一把细粒度锁, 可以在生产环境常开。
+指标按进程聚合, 进程池子进程中记录的数据不会出现在 API 进程的 /metrics 中。
+"""
+
+import time
+import bisect
+import threading
+
+
+# 耗时直方图的默认桶 (秒), 覆盖内存缓存命中 (~10µs) 到上游 HTTP 请求 (~10s)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_enabled = True
+
+
+def set_enabled(enabled: bool):
+    """开启或关闭记录 (关闭后 span / inc / observe 不做任何事)"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增计数器, 按标签分组; 与 prometheus_client 一致, 导出名称 (HELP / TYPE / 样本) 带 _total 后缀"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.family = f"{name}_total"
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not _enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def collect(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.family}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class _HistogramChild:
+    __slots__ = ("lock", "counts", "total", "count")
+
+    def __init__(self, n_buckets: int):
+        self.lock = threading.Lock()
+        self.counts = [0] * (n_buckets + 1)  # 最后一个为 +Inf 桶
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """直方图, 按标签分组; 每个桶只记录落入该桶的次数, 导出时再累加"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.family = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def _child(self, key: tuple) -> _HistogramChild:
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, _HistogramChild(len(self.buckets)))
+        return child
+
+    def observe(self, value: float, **labels):
+        if not _enabled:
+            return
+        child = self._child(tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, value)
+        with child.lock:
+            child.counts[index] += 1
+            child.total += value
+            child.count += 1
+
+    def snapshot(self, **labels) -> dict:
+        """返回 {"count", "sum", "buckets": [(上界, 累计次数), ...]}, 没有记录时返回 None"""
+        child = self._children.get(tuple(sorted(labels.items())))
+        if child is None:
+            return None
+        with child.lock:
+            counts, total, count = list(child.counts), child.total, child.count
+        cumulative, running = [], 0
+        for upper, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append((upper, running))
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def collect(self) -> list:
+        with self._lock:
+            keys = sorted(self._children)
+        lines = []
+        for key in keys:
+            snap = self.snapshot(**dict(key))
+            for upper, running in snap["buckets"]:
+                labels = _format_labels(key + (("le", _format_value(upper)),))
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(snap['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {snap['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表: 按名称取得 (不存在时创建) 计数器和直方图"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name: str, *args):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, *args)
+        if not isinstance(metric, cls):
+            raise ValueError(f"指标 {name} 已注册为 {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str = "") -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def histogram(self, name: str, documentation: str = "", buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets)
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def render(self) -> str:
+        """Prometheus 文本格式 (0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for _, metric in metrics:
+            if metric.documentation:
+                lines.append(f"# HELP {metric.family} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.family} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SPAN_SECONDS = REGISTRY.histogram("superrich_span_seconds", "数据获取各步骤耗时 (秒)")
+EVENTS = REGISTRY.counter("superrich_events", "数据获取事件计数 (缓存命中 / 未命中 / 上游请求 / 错误)")
+
+
+class span:
+    """计时区间, 退出时把耗时记录到 superrich_span_seconds{span=name, ...}
+
+    用法:
+        with span("alpha_vantage.http_get"):
+            response = session.get(...)
+    """
+
+    __slots__ = ("name", "labels", "_start")
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            EVENTS.inc(event="error", span=self.name)
+        SPAN_SECONDS.observe(time.perf_counter() - self._start, span=self.name, **self.labels)
+        return False
+
+
+def inc(event: str, amount: float = 1, **labels):
+    """记录一次事件: superrich_events_total{event=event, ...}"""
+    EVENTS.inc(amount, event=event, **labels)
+
+
+def render_prometheus() -> str:
+    """导出全局注册表中的全部指标"""
+    return REGISTRY.render()
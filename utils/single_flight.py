@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """合并相同 key 的并发调用: 同一时刻只执行一次, 所有并发调用方共享结果或异常
+
+    线程调用 do(), asyncio 任务调用 do_async(); 两者共用同一个 concurrent.futures.Future,
+    因此线程和协程之间也能互相合并。调用结束后 key 立即移除, 之后的调用会重新执行。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _join(self, key) -> tuple:
+        """登记一次调用, 返回 (future, 是否为执行者)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = Future()
+            # 标记为运行中: 任何等待方取消等待都不会取消共享的 future
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _run(self, key, future: Future, fn, args, kwargs):
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def do(self, key, fn, *args, **kwargs):
+        """在当前线程执行 fn, 或等待正在执行的相同调用
+
+        Args:
+            key: 可哈希的调用标识
+            fn: 要执行的函数
+
+        Returns:
+            fn 的返回值 (并发调用方拿到的是同一个对象); fn 抛出的异常会抛给所有调用方
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        return future.result()
+
+    async def do_async(self, key, fn, *args, executor=None, **kwargs):
+        """在 executor 中执行阻塞函数 fn, 或等待正在执行的相同调用; 等待期间不占用线程
+
+        Args:
+            key: 可哈希的调用标识
+            fn: 要执行的阻塞函数
+            executor (Executor, optional): 执行 fn 的线程池, None 表示事件循环默认线程池
+
+        Returns:
+            fn 的返回值; fn 抛出的异常会抛给所有调用方
+        """
+        future, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(executor, self._run, key, future, fn, args, kwargs)
+        return await asyncio.wrap_future(future)
+
+    def in_flight(self) -> int:
+        """正在执行的调用数"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self._calls)}
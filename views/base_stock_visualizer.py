@@ -1,32 +1,23 @@
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import mplfinance as mpf
-from utils.logger_manager import get_logger
 import os
 import pandas as pd
 from typing import Optional
-import matplotlib.font_manager as fm
-from IPython.display import display
-
+from utils.logger_manager import get_logger
+from views.style.style_registry import get_style
 
-font_path = "/System/Library/Fonts/STHeiti Light.ttc"  # macOS 示例
-my_font = fm.FontProperties(fname=font_path)
 
 # 初始化日志
 logger = get_logger()
 
-import mplfinance as mpf
-import matplotlib.pyplot as plt
-import pandas as pd
-import os
-from typing import Optional
+# matplotlib / mplfinance 较重, 在第一次绘图时才导入; 中文字体样式见 views.style
+
 
 def plot_stock_chart(
     df: pd.DataFrame,
     title: str = "股票K线图",
     save_path: str = None,
-    style: Optional[mpf.make_mpf_style] = None,
+    style: Optional[dict] = None,
     figsize: tuple = (12, 8),
+    dpi: int = 300,
 ):
     """
     使用 mplfinance 绘制股票K线图，并返回图像对象。
@@ -34,7 +25,9 @@ def plot_stock_chart(
     - title: 图表标题
     - save_path: 保存路径（如果为 None，则不保存）
     - figsize: 图表大小
+    - dpi: 保存图片的分辨率; 批量渲染请使用 views.chart_pipeline, 按像素尺寸降采样并缓存
     """
+    import mplfinance as mpf
 
     # 自动尝试将 index 转为 DatetimeIndex
     if not isinstance(df.index, pd.DatetimeIndex):
@@ -55,7 +48,7 @@ def plot_stock_chart(
 
     # 选择默认样式
     if style is None:
-        style = mpf.make_mpf_style(base_mpf_style="yahoo")
+        style = get_style(base_style="yahoo")
 
     # 绘制
     fig, axlist = mpf.plot(
@@ -70,7 +63,7 @@ def plot_stock_chart(
 
     # 保存图片
     if save_path:
-        fig.savefig(save_path, dpi=300, bbox_inches="tight")
+        fig.savefig(save_path, dpi=dpi, bbox_inches="tight")
         logger.info(f"✅ 已保存图片到: {os.path.abspath(save_path)}")
 
     return fig
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+K线图渲染管线: 按目标像素宽度降采样, 渲染结果按 (数据, 样式, 尺寸) 哈希缓存, 批量渲染使用 Agg 后端的进程池
+"""
+
+import os
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.logger_manager import init_worker_logger, get_logger, worker_log_queue
+
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+CHART_FORMATS = ("png", "svg")
+
+
+def resample_ohlcv(df: pd.DataFrame, rule: str = "W") -> pd.DataFrame:
+    """按周 (W) 或月 (M) 聚合日线: 开盘取第一根, 最高取最大, 最低取最小, 收盘取最后一根, 成交量求和"""
+    rule = {"M": "ME", "W": "W-FRI"}.get(rule, rule)
+    aggregated = df[OHLCV_COLUMNS].resample(rule).agg({
+        "open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum",
+    })
+    return aggregated.dropna(subset=["close"])
+
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 降采样, 返回保留点的下标 (升序, 含首尾)
+
+    x 轴取等距的K线序号; 每个桶选出与上一个选中点和下一个桶均值构成三角形面积最大的点。
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo, next_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_lo:next_hi].mean() if next_hi > next_lo else x[-1]
+        next_y = y[next_lo:next_hi].mean() if next_hi > next_lo else y[-1]
+        area = np.abs((x[prev] - next_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (next_y - y[prev]))
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def aggregate_between(df: pd.DataFrame, starts: np.ndarray) -> pd.DataFrame:
+    """以 starts 为每组第一行的下标, 把相邻组之间的K线聚合为一根, 保留区间内的最高/最低价"""
+    starts = np.unique(starts)
+    ends = np.append(starts[1:], len(df)) - 1
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    volume = df["volume"].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        "open": df["open"].to_numpy(dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(high, starts),
+        "low": np.minimum.reduceat(low, starts),
+        "close": df["close"].to_numpy(dtype=np.float64)[ends],
+        "volume": np.add.reduceat(volume, starts),
+    }, index=df.index[ends])
+
+
+def downsample_for_width(df: pd.DataFrame, width_px: int, px_per_bar: int = 3, mode: str = "auto") -> pd.DataFrame:
+    """把K线数降到目标像素宽度能显示的数量
+
+    Args:
+        df (pd.DataFrame): 以 DatetimeIndex 为索引的日线 OHLCV
+        width_px (int): 图像宽度 (像素)
+        px_per_bar (int, optional): 每根K线至少占用的像素. Defaults to 3.
+        mode (str, optional): auto 依次尝试 日线 / 周线 / 月线, 仍然过多时用 LTTB;
+            也可指定 raw / weekly / monthly / lttb. Defaults to "auto".
+
+    Returns:
+        pd.DataFrame: 降采样后的 OHLCV
+    """
+    max_bars = max(width_px // max(px_per_bar, 1), 3)
+    if mode == "raw":
+        return df
+    if mode == "weekly":
+        return resample_ohlcv(df, "W")
+    if mode == "monthly":
+        return resample_ohlcv(df, "M")
+    if mode == "auto":
+        if len(df) <= max_bars:
+            return df
+        for rule in ("W", "M"):
+            resampled = resample_ohlcv(df, rule)
+            if len(resampled) <= max_bars:
+                return resampled
+        df = resample_ohlcv(df, "M")
+    elif mode != "lttb":
+        raise ValueError(f"不支持的降采样方式: {mode}")
+    if len(df) <= max_bars:
+        return df
+    # 以 LTTB 选出的收盘价转折点作为分组边界, 组内聚合为一根K线
+    return aggregate_between(df, lttb_indices(df["close"].to_numpy(dtype=np.float64), max_bars))
+
+
+def chart_cache_key(
+    df: pd.DataFrame, title: str, style: str, width_px: int, height_px: int, dpi: int, fmt: str, mode: str, px_per_bar: int
+) -> str:
+    """由数据内容、样式、尺寸和降采样参数计算缓存键"""
+    digest = hashlib.sha1()
+    digest.update(df.index.values.astype("datetime64[ns]").view("i8").tobytes())
+    digest.update(np.ascontiguousarray(df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)).tobytes())
+    digest.update(f"{title}|{style}|{width_px}x{height_px}@{dpi}|{fmt}|{mode}|{px_per_bar}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def evict_chart_cache(cache_dir: str, max_mb: float = 512, max_age_days: float = 30) -> int:
+    """清理K线图缓存: 先删除超过 max_age_days 未使用的图片, 再按最近使用时间从旧到新删除, 直到总大小不超过 max_mb
+
+    缓存命中时会更新文件修改时间, 因此修改时间即最近使用时间。
+
+    Args:
+        cache_dir (str): 图片缓存目录
+        max_mb (float, optional): 缓存总大小上限 (MB), 0 表示不限制. Defaults to 512.
+        max_age_days (float, optional): 最长保留天数, 0 表示不限制. Defaults to 30.
+
+    Returns:
+        int: 删除的文件数
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.rsplit(".", 1)[-1] in CHART_FORMATS:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    max_bytes = max_mb * 1024 * 1024
+    removed = 0
+    for mtime, size, path in entries:
+        expired = max_age_days and now - mtime > max_age_days * 86400
+        if not expired and (not max_mb or total <= max_bytes):
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        get_logger().info("K线图缓存清理: 删除 %s 个文件, 剩余 %.1f MB", removed, total / 1024 / 1024)
+    return removed
+
+
+def render_chart(
+    df: pd.DataFrame,
+    title: str = "股票K线图",
+    cache_dir: str = "data_cache/charts",
+    fmt: str = "png",
+    width_px: int = 1200,
+    height_px: int = 800,
+    dpi: int = 100,
+    style: str = "yahoo",
+    mode: str = "auto",
+    px_per_bar: int = 3,
+) -> str:
+    """渲染一张K线图, 已有相同内容的缓存时直接返回缓存路径
+
+    Args:
+        df (pd.DataFrame): 以 DatetimeIndex 为索引的日线 OHLCV
+        title (str, optional): 图表标题. Defaults to "股票K线图".
+        cache_dir (str, optional): 图片缓存目录. Defaults to "data_cache/charts".
+        fmt (str, optional): png / svg. Defaults to "png".
+        width_px (int, optional): 宽度 (像素). Defaults to 1200.
+        height_px (int, optional): 高度 (像素). Defaults to 800.
+        dpi (int, optional): 分辨率, figsize 由像素尺寸换算. Defaults to 100.
+        style (str, optional): mplfinance 内置样式名, 或 chinese 使用中文字体样式. Defaults to "yahoo".
+        mode (str, optional): 降采样方式, 见 downsample_for_width. Defaults to "auto".
+        px_per_bar (int, optional): 每根K线至少占用的像素. Defaults to 3.
+
+    Returns:
+        str: 图片文件路径
+    """
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"不支持的图片格式: {fmt}, 可选 {CHART_FORMATS}")
+    logger = get_logger()
+    df = df[OHLCV_COLUMNS]
+    key = chart_cache_key(df, title, style, width_px, height_px, dpi, fmt, mode, px_per_bar)
+    path = os.path.join(cache_dir, f"{key}.{fmt}")
+    if os.path.exists(path):
+        logger.info(f"K线图缓存命中: {path}")
+        # 更新修改时间, 清理缓存时按最近使用时间淘汰
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from views.base_stock_visualizer import plot_stock_chart
+    from views.style.style_registry import get_style
+
+    # 样式由注册表缓存, 同一进程内字体只解析一次
+    mpf_style = get_style(chinese=True) if style == "chinese" else get_style(base_style=style)
+    plot_df = downsample_for_width(df, width_px, px_per_bar=px_per_bar, mode=mode)
+    logger.info(f"渲染K线图 {title}: {len(df)} 根K线降采样为 {len(plot_df)} 根")
+    fig = plot_stock_chart(plot_df, title=title, style=mpf_style, figsize=(width_px / dpi, height_px / dpi))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fig.savefig(tmp_path, dpi=dpi, format=fmt)
+        os.replace(tmp_path, path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def _init_render_worker(config: dict, log_queue=None):
+    """渲染子进程初始化: 日志 (交给主进程写) + 无界面的 Agg 后端"""
+    init_worker_logger(config, log_queue)
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_job(job: dict) -> str:
+    df = job.pop("df")
+    return render_chart(df, **job)
+
+
+def render_charts(jobs: list, config: dict, workers: int = None) -> list:
+    """用进程池批量渲染K线图
+
+    Args:
+        jobs (list): 每项为 render_chart 的参数字典, 必须包含 df
+        config (dict): 完整配置, 子进程用它初始化日志; 也读取 charts 配置作为默认参数,
+            渲染完成后按 charts.max_cache_mb / max_age_days 清理缓存目录
+        workers (int, optional): 进程数, None 表示读取 charts.workers
+
+    Returns:
+        list: 与 jobs 一一对应的图片路径, 失败的为 None
+    """
+    logger = get_logger()
+    chart_config = config.get("charts", {})
+    defaults = {k: chart_config[k] for k in ("cache_dir", "fmt", "width_px", "height_px", "dpi", "style", "mode", "px_per_bar") if k in chart_config}
+    jobs = [{**defaults, **job} for job in jobs]
+    if workers is None:
+        workers = chart_config.get("workers", 2)
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(
+        max_workers=max(1, workers),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_render_worker,
+        initargs=(config, worker_log_queue()),
+    ) as executor:
+        futures = [executor.submit(_render_job, job) for job in jobs]
+        for i, future in enumerate(futures):
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.error(f"渲染第 {i} 张K线图时出错: {e}")
+    logger.info(f"批量渲染完成: {sum(r is not None for r in results)}/{len(jobs)} 张")
+    evict_chart_cache(
+        chart_config.get("cache_dir", "data_cache/charts"),
+        max_mb=chart_config.get("max_cache_mb", 512),
+        max_age_days=chart_config.get("max_age_days", 30),
+    )
+    return results
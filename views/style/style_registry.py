@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图表样式注册表: 每个进程只解析一次中文字体, mplfinance 样式按 (字体, 基础样式, rc) 缓存
+"""
+
+import os
+import glob
+import shutil
+import platform
+import threading
+import subprocess
+from functools import lru_cache
+
+from utils.logger_manager import get_logger
+
+
+# 各系统默认中文字体, 按优先级排列
+DEFAULT_FONT_PATHS = {
+    "Darwin": [
+        "/System/Library/Fonts/STHeiti Light.ttc",
+        "/System/Library/Fonts/PingFang.ttc",
+        "/Library/Fonts/Arial Unicode.ttf",
+    ],
+    "Windows": [
+        "C:/Windows/Fonts/simhei.ttf",
+        "C:/Windows/Fonts/msyh.ttc",
+    ],
+    "Linux": [
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    ],
+}
+
+# Linux 上 fontconfig 的字体目录, 默认路径都不存在时在这些目录中按文件名查找
+FONTCONFIG_DIRS = [
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "~/.local/share/fonts",
+    "~/.fonts",
+]
+CJK_FONT_PATTERNS = ["*wqy*", "*NotoSansCJK*", "*NotoSerifCJK*", "*SourceHanSans*", "*DroidSansFallback*", "*uming*", "*ukai*"]
+
+_styles = {}
+_styles_lock = threading.Lock()
+
+
+def _fc_list_cjk() -> list:
+    """通过 fc-list 查询支持中文的字体文件"""
+    if shutil.which("fc-list") is None:
+        return []
+    try:
+        output = subprocess.run(["fc-list", ":lang=zh", "file"], capture_output=True, text=True, timeout=5).stdout
+    except Exception:
+        return []
+    return sorted(line.split(":", 1)[0].strip() for line in output.splitlines() if line.strip())
+
+
+def _search_fontconfig_dirs() -> list:
+    found = []
+    for directory in FONTCONFIG_DIRS:
+        directory = os.path.expanduser(directory)
+        for pattern in CJK_FONT_PATTERNS:
+            found.extend(glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+    return sorted(path for path in found if path.lower().endswith((".ttf", ".ttc", ".otf")))
+
+
+def find_chinese_font_path() -> str:
+    """按系统查找可用的中文字体文件, 找不到时返回 None"""
+    system_name = platform.system()
+    for path in DEFAULT_FONT_PATHS.get(system_name, []):
+        if os.path.exists(path):
+            return path
+    if system_name == "Linux":
+        candidates = _fc_list_cjk() or _search_fontconfig_dirs()
+        if candidates:
+            return candidates[0]
+    return None
+
+
+@lru_cache(maxsize=None)
+def resolve_font(font_path: str = None) -> tuple:
+    """解析字体, 每个进程每个字体只解析一次
+
+    Args:
+        font_path (str, optional): 字体文件路径, None 表示自动查找中文字体
+
+    Returns:
+        tuple: (字体文件路径, 字体族名)
+
+    Raises:
+        FileNotFoundError: 找不到字体文件
+    """
+    import matplotlib.font_manager as fm
+
+    if font_path is None:
+        font_path = find_chinese_font_path()
+        if font_path is None:
+            raise FileNotFoundError(f"在 {platform.system()} 上未找到中文字体，请手动传入字体路径。")
+    if not os.path.exists(font_path):
+        raise FileNotFoundError(f"未找到字体文件: {font_path}，请手动传入字体路径。")
+
+    # 注册到 matplotlib 的字体管理器, 之后按族名即可使用
+    fm.fontManager.addfont(font_path)
+    font_name = fm.FontProperties(fname=font_path).get_name()
+    get_logger().info(f"使用字体 {font_name}: {font_path}")
+    return font_path, font_name
+
+
+def get_style(base_style: str = None, font_path: str = None, chinese: bool = False, rc: dict = None):
+    """获取 mplfinance 样式, 按 (字体, 基础样式, rc) 缓存
+
+    Args:
+        base_style (str, optional): mplfinance 内置样式名, 例如 yahoo
+        font_path (str, optional): 字体文件路径; 指定时等同于 chinese=True 并使用该字体
+        chinese (bool, optional): 使用中文字体. Defaults to False.
+        rc (dict, optional): 额外的 matplotlib rc 设置
+
+    Returns:
+        dict: 可直接用于 mpf.plot 的 style
+    """
+    font_name = None
+    if chinese or font_path is not None:
+        _, font_name = resolve_font(font_path)
+    rc_key = tuple(sorted((k, repr(v)) for k, v in (rc or {}).items()))
+    key = (font_name, base_style, rc_key)
+    with _styles_lock:
+        style = _styles.get(key)
+        if style is not None:
+            return style
+
+    import mplfinance as mpf
+
+    style_rc = dict(rc or {})
+    if font_name is not None:
+        style_rc.setdefault("font.family", font_name)
+        style_rc.setdefault("axes.unicode_minus", False)  # 避免负号显示问题
+    kwargs = {"rc": style_rc}
+    if base_style is not None:
+        kwargs["base_mpf_style"] = base_style
+    style = mpf.make_mpf_style(**kwargs)
+    with _styles_lock:
+        return _styles.setdefault(key, style)
+
+
+def clear_styles():
+    """清空缓存的样式和字体 (字体文件变化后使用)"""
+    with _styles_lock:
+        _styles.clear()
+    resolve_font.cache_clear()